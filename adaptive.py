@@ -0,0 +1,60 @@
+"""
+Adaptive number of repetitions per test_set entry.
+
+NUMERO runs every configuration the same number of times, which is too
+often for the stable ones and too seldom for the noisy ones. In adaptive
+mode a configuration is repeated until the 95% confidence interval of its
+average-minus-baseline latency is narrower than a target width, but at
+least min_reps and at most max_reps times.
+"""
+
+import math
+
+# two sided 95% t quantiles for 1..30 degrees of freedom, the normal one after that
+T95 = [12.706, 4.303, 3.182, 2.776, 2.571, 2.447, 2.365, 2.306, 2.262, 2.228,
+       2.201, 2.179, 2.160, 2.145, 2.131, 2.120, 2.110, 2.101, 2.093, 2.086,
+       2.080, 2.074, 2.069, 2.064, 2.060, 2.056, 2.052, 2.048, 2.045, 2.042]
+
+
+def t95(df):
+    return T95[df - 1] if df <= len(T95) else 1.96
+
+
+class Convergence:
+    def __init__(self, width, min_reps=3, max_reps=20):
+        # width is the full width of the interval, in the unit of the values (s)
+        self.width = width
+        self.min_reps = max(min_reps, 2)
+        self.max_reps = max(max_reps, self.min_reps)
+        self.values = []
+        self.attempts = 0
+
+    def add(self, value):
+        self.values.append(value)
+
+    def mean(self):
+        return sum(self.values) / len(self.values) if self.values else math.nan
+
+    def half_width(self):
+        n = len(self.values)
+        if n < 2:
+            return math.inf
+        mean = self.mean()
+        std = math.sqrt(sum((v - mean) ** 2 for v in self.values) / (n - 1))
+        return t95(n - 1) * std / math.sqrt(n)
+
+    def converged(self):
+        return len(self.values) >= self.min_reps and 2 * self.half_width() <= self.width
+
+    def tries(self, candidates):
+        """Yields try indices from candidates until converged or max_reps were attempted."""
+        for try_idx in candidates:
+            if self.converged() or self.attempts >= self.max_reps:
+                return
+            self.attempts += 1
+            yield try_idx
+
+    def __str__(self):
+        return (f"{len(self.values)} results in {self.attempts} tries, mean {self.mean():.6f}s "
+                f"ci95 +-{self.half_width():.6f}s (target width {self.width:.6f}s), "
+                f"{'converged' if self.converged() else 'not converged'}")
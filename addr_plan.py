@@ -0,0 +1,144 @@
+"""
+Address and naming plan of one emulated network.
+
+good-try.py used to hard-code the 10.0/10.1/10.2/10.3/10.4/10.5 ranges, the
+h<k> host names and the :4442 api port, so only one mininet could exist at a
+time. Every trial now gets a slot and every slot gets its own block of eight
+/16s, a host name prefix, a measurement file tag and an api port.
+
+the different networks of a slot (b = 8 * slot) are:
+- 10.b.0.0/16   - relay to relay connections, one /30 (or /31) per link
+- 10.b+1.0.0/16 - api network, the api is 10.b+1.1.1 and the relays follow it
+- 10.b+2.0.0/24 - api to host os connection (for docker)
+- 10.b+3.0.0/16 - host identifying ips, on the lo interface, host k has 10.b+3.(k/256).(k%256)
+- 10.b+4.0.0/16 - pub to relay connections, one /30 (or /31) per link
+- 10.b+5.0.0/16 - sub to relay connections, one /30 (or /31) per link
+A /24 per link and the last octet as host id ran out at 255 links and 254
+hosts. With the point to point subnets a /16 holds 16384 links (32768 with
+/31s) and there are 65535 loopback ids. The relay id the api sees is
+256 * third + fourth octet of the loopback, so it is k like before and the
+addresses of the first 255 hosts did not change.
+base_try.py uses 12.4*slot.0.0/14 the same way for its own three hosts.
+"""
+
+MAX_SLOTS = 32
+API_PORT = 4442
+REDIS_PORT = 6400
+# /30 leaves the network and broadcast addresses out, /31 (rfc 3021) uses both
+P2P_PREFIXES = (30, 31)
+API_PREFIX = 16
+
+
+class PointToPoint:
+    """The n-th point to point subnet of a /16 pool, a and b are its two host addresses."""
+
+    def __init__(self, first_octets, prefixlen=30):
+        if prefixlen not in P2P_PREFIXES:
+            raise ValueError(f"point to point subnets are /30 or /31, not /{prefixlen}")
+        self.first_octets = first_octets
+        self.prefixlen = prefixlen
+        self.size = 2 ** (32 - prefixlen)
+        self.capacity = 65536 // self.size
+
+    def subnet(self, n):
+        if not 0 <= n < self.capacity:
+            raise ValueError(f"{self.first_octets}.0.0/16 has only {self.capacity} /{self.prefixlen} subnets, not {n + 1}")
+        offset = n * self.size + (1 if self.prefixlen == 30 else 0)
+        return self.address(offset), self.address(offset + 1)
+
+    def address(self, offset):
+        return f"{self.first_octets}.{offset // 256}.{offset % 256}"
+
+
+class AddressPlan:
+    def __init__(self, slot=0, p2p_prefix=30):
+        if not 0 <= slot < MAX_SLOTS:
+            raise ValueError(f"slot {slot} is out of range, there are only {MAX_SLOTS} address blocks")
+        self.slot = slot
+        self.base = 8 * slot
+        # slot 0 keeps the old names so single runs look the same as before
+        self.prefix = f"t{slot}" if slot else ""
+        self.tag = f"t{slot}" if slot else ""
+        self.api_port = API_PORT + 10 * slot
+        self.redis_port = REDIS_PORT + slot
+        self.p2p_prefix = p2p_prefix
+        self.api_prefix = API_PREFIX
+        self.relay_links = PointToPoint(f"10.{self.base}", p2p_prefix)
+        self.pub_links = PointToPoint(f"10.{self.base + 4}", p2p_prefix)
+        self.sub_links = PointToPoint(f"10.{self.base + 5}", p2p_prefix)
+
+    def host(self, k):
+        return f"{self.prefix}h{k}"
+
+    def switch(self):
+        return f"s{self.slot + 1}"
+
+    def api_host(self):
+        # was h999, which a topology with 999 hosts would have taken
+        return f"{self.prefix}api"
+
+    def root(self):
+        return f"{self.prefix}root"
+
+    def loopback(self, k):
+        if not 0 < k < 65536:
+            raise ValueError(f"host {k} has no loopback, there are 65535")
+        return f"10.{self.base + 3}.{k // 256}.{k % 256}"
+
+    def loopbacks(self, n):
+        # the relays 1..n, what goes into the cert
+        return [self.loopback(k) for k in range(1, n + 1)]
+
+    @staticmethod
+    def relay_id(ip_address):
+        # the same as moq-api's client takes from the --node url
+        octets = ip_address.split('.')
+        return int(octets[2]) * 256 + int(octets[3])
+
+    def relay_link(self, counter):
+        return self.relay_links.subnet(counter)
+
+    def pub_link(self, counter):
+        return self.pub_links.subnet(counter)
+
+    def sub_link(self, counter):
+        return self.sub_links.subnet(counter)
+
+    def api_ip(self, n):
+        if not 0 < n < 254 * 256:
+            raise ValueError(f"the api network has no address {n}")
+        return f"10.{self.base + 1}.{1 + n // 256}.{n % 256}"
+
+    def api_url(self):
+        return f"http://{self.api_ip(1)}:{self.api_port}"
+
+    def docker_ip(self, n):
+        return f"10.{self.base + 2}.0.{n}"
+
+    def baseline(self, net, subnet, n):
+        # base_try.py lives on 12.x, four /16s per slot
+        return f"12.{4 * self.slot + net}.{subnet}.{n}"
+
+    def baseline_host(self, k):
+        # base_try.py may run while our own network is up, so it needs names of its own
+        return f"{self.prefix}b{k}"
+
+    def baseline_root(self):
+        return f"{self.prefix}broot"
+
+    def baseline_ips(self):
+        return [self.baseline(0, 1, 2), self.baseline(0, 1, 1), self.baseline(0, 2, 2), self.baseline(0, 2, 1)]
+
+    def redis_env(self, ip=None):
+        # ./dev/api runs its own redis container, parallel slots must not share it
+        env = f"REDIS={ip or self.docker_ip(99)}"
+        if self.slot:
+            env += f" REDIS_PORT={self.redis_port} REDIS_NAME=moq-redis-{self.tag}"
+        return env
+
+    def is_relay_link(self, ip_address):
+        # the connections between relays are on the 10.b.x.x network
+        return ip_address.startswith(f"10.{self.base}.")
+
+    def __repr__(self):
+        return f"AddressPlan(slot={self.slot}, p2p_prefix={self.p2p_prefix})"
@@ -0,0 +1,136 @@
+"""
+Polls the opti api's /tracks/{track}/topology during a trial.
+
+good-try.py used to curl every track one after the other through api.cmd()
+after the run and dig the json out of the shell output. This runs as its own
+process in the api's namespace (the launcher starts it like a client), asks
+for all tracks at once from a small pool of threads with a kept-alive
+connection each, every `interval` seconds and once more when it gets
+SIGTERM. Every answer is a json line with the time, the track, the status,
+how long the api took and the used_links and cost, so the tree changes
+during the run show up and the api's response time is a metric of its own.
+
+    python3 api_poller.py --url http://10.1.1.1:4442 --tracks 1000_bbb-360-30 --interval 0.5
+
+summarize() reads such a file back for good-try.py.
+"""
+
+import argparse
+import http.client
+import json
+import signal
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote, urlsplit
+
+import numpy as np
+
+
+class Pool:
+    def __init__(self, url, workers=8, timeout=5.0):
+        parts = urlsplit(url)
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.timeout = timeout
+        self.local = threading.local()
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='api-poll')
+
+    def _connection(self):
+        # one connection per worker thread, kept open between the rounds
+        connection = getattr(self.local, 'connection', None)
+        if connection is None:
+            connection = self.local.connection = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+        return connection
+
+    def _get(self, track):
+        path = f"/tracks/{quote(track, safe='')}/topology"
+        record = {'t': time.time(), 'track': track}
+        start = time.perf_counter()
+        for attempt in range(2):
+            connection = self._connection()
+            try:
+                connection.request('GET', path)
+                response = connection.getresponse()
+                body = response.read()
+                break
+            except (OSError, http.client.HTTPException) as e:
+                # the server may have closed the kept-alive connection, a second try gets a new one
+                connection.close()
+                self.local.connection = None
+                if attempt:
+                    record.update(status=0, ms=(time.perf_counter() - start) * 1000, error=str(e))
+                    return record
+        record.update(status=response.status, ms=(time.perf_counter() - start) * 1000)
+        if response.status == 200:
+            try:
+                answer = json.loads(body)
+                record.update(used_links=answer.get('used_links', []), cost=float(answer.get('cost', 0)))
+            except ValueError as e:
+                record['error'] = f"no json: {e}"
+        return record
+
+    def round(self, tracks):
+        return list(self.executor.map(self._get, tracks))
+
+    def close(self):
+        self.executor.shutdown()
+
+
+def poll(url, tracks, interval, out, workers=8):
+    stopping = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stopping.set())
+    signal.signal(signal.SIGINT, lambda *_: stopping.set())
+    pool = Pool(url, workers=min(workers, max(len(tracks), 1)))
+    while True:
+        last = stopping.is_set()
+        # with no interval only the round after SIGTERM, the topology as it was at the end of the run
+        if interval > 0 or last:
+            for record in pool.round(tracks):
+                out.write(json.dumps(record) + '\n')
+            out.flush()
+        if last:
+            break
+        stopping.wait(interval if interval > 0 else None)
+    pool.close()
+
+
+def summarize(path):
+    """{track: {'used_links', 'cost', 'changes', 'polls', 'errors'}} and the api's response times in ms."""
+    tracks = {}
+    times = []
+    with open(path, 'r') as file:
+        for line in file:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            times.append(record['ms'])
+            track = tracks.setdefault(record['track'], {'used_links': None, 'cost': 0.0, 'changes': 0, 'polls': 0, 'errors': 0})
+            track['polls'] += 1
+            if 'used_links' not in record:
+                track['errors'] += 1
+                continue
+            links = sorted(map(json.dumps, record['used_links']))
+            if track['used_links'] is not None and links != track['links']:
+                track['changes'] += 1
+            track['links'] = links
+            track['used_links'] = record['used_links']
+            track['cost'] = record['cost']
+    for track in tracks.values():
+        track.pop('links', None)
+    times = np.array(times)
+    latency = {'mean': times.mean(), 'p50': np.percentile(times, 50), 'p99': np.percentile(times, 99), 'max': times.max()} \
+        if len(times) else {'mean': np.nan, 'p50': np.nan, 'p99': np.nan, 'max': np.nan}
+    return tracks, latency
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Poll the topology of tracks at the opti api')
+    parser.add_argument('--url', type=str, required=True)
+    parser.add_argument('--tracks', type=str, required=True, help='comma separated')
+    parser.add_argument('--interval', type=float, default=0.5, help='seconds between the rounds, 0 for only the last one')
+    parser.add_argument('--workers', type=int, default=8)
+    args = parser.parse_args()
+    poll(args.url, [track for track in args.tracks.split(',') if track], args.interval, sys.stdout, args.workers)
@@ -1,29 +1,27 @@
 import os
-import subprocess
-import yaml
 from functools import partial
-from time import sleep
-from sys import exit  # pylint: disable=redefined-builtin
 import argparse
 from mininet.net import Mininet
-from mininet.util import dumpNodeConnections
-from mininet.log import setLogLevel, info
-from mininet.cli import CLI
+from mininet.log import setLogLevel
 from mininet.node import Node
 from mininet.link import TCLink
-from mininet import log
-import os
-import datetime
-import glob
-import re
 import numpy as np
-import re
 import the_path
+from addr_plan import AddressPlan
+from baseline_store import BaselineStore, baseline_key, sample_target
+from cert_cache import ensure_cert
+from latency import parse_gst, parse_clock
+from warmup import steady
+from launcher import Launcher
+from readiness import Sequencer, StageTimeout, tcp_listening, udp_listening, origin_announced, samples
 
 
 #!/usr/bin/env python
 clocked = os.getenv("CLOCKED", False)
 tls_verify = not os.getenv("NO_CERT", False)
+# the baseline stops early once it has this many samples, 30s is the upper bound
+base_samples = int(os.getenv("BASE_SAMPLES", 0))
+base_window = float(os.getenv("BASE_WINDOW", 30))
 
 
 def calculate_statistics(latencies):
@@ -32,11 +30,6 @@ def calculate_statistics(latencies):
     percentile_99 = np.percentile(latencies, 99)
     return average/1e9, median/1e9, percentile_99/1e9
 
-def extract_latency(line):
-    match = re.search(r'Latency: (\d+)', line)
-    if match:
-        return int(match.group(1))
-    return None
 
 
 
@@ -45,31 +38,36 @@ def main():
     parser.add_argument('--filename', type=str, required=True, help='Filename for the output without .txt')
     parser.add_argument('--clock', action='store_true', help='Use clocked')
     parser.add_argument('--clockr', action='store_true', help='Use clocked')
+    parser.add_argument('--ns', action='store_true', help='moq-clock with the send and receive times in ns')
     parser.add_argument('--tls-verify', action='store_true', help='Use tls_verify')
     parser.add_argument('--track', type=str, required=True, help='Track name')
+    parser.add_argument('--slot', type=int, default=0, help='Address slot of the trial, see addr_plan.py')
+    parser.add_argument('--keep-cert', action='store_true', help='The cert already covers our ips, do not rebake it')
+    parser.add_argument('--samples', type=int, default=base_samples, help='Latencies to wait for, 0 is the default of the mode')
     args = parser.parse_args()
     clocked = args.clock
     clockedr = args.clockr
+    base_mode = 'clock' if clocked else 'clockr' if clockedr else 'gst'
+    target = sample_target(base_mode, args.samples)
+    # the measurement goes to the store too, so the next trials with the same key can skip it
+    store = BaselineStore(target=target)
+    key = baseline_key(args.track, base_mode, args.tls_verify, args.ns)
+    ns_str = ' --ns' if args.ns else ''
 
     tls_verify = args.tls_verify
+    plan = AddressPlan(args.slot)
+    relay_ip = plan.baseline(0, 1, 2)
 
     setLogLevel('critical')
     template_for_relays = (
         'RUST_LOG=debug RUST_BACKTRACE=0 '
         './target/debug/moq-relay --bind \'{bind}\' --api {api} --node \'{node}\' '
         '--tls-cert ./dev/localhost.crt --tls-key ./dev/localhost.key '
-        ' {tls_verify} --dev {origi} &'
+        ' {tls_verify} --dev {origi}'
     )
 
-    ip_string = ' '.join(['12.0.1.2 12.0.1.1 12.0.2.2 12.0.2.1'])
-    with open('./dev/cert', 'r') as file:
-        cert_content = file.readlines()
-    cert_content[-1] = f'go run filippo.io/mkcert -ecdsa -days 10 -cert-file "$CRT" -key-file "$KEY" localhost 127.0.0.1 ::1  {ip_string}'
-    with open('./dev/cert2', 'w') as file:
-        file.writelines(cert_content)
-    env = os.environ.copy()
-    env['PATH'] =  env['PATH'] +the_path.PATH_GO
-    subprocess.call(['./dev/cert2'], env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    if not args.keep_cert:
+        ensure_cert(plan.baseline_ips(), go_path=the_path.PATH_GO)
 
     tls_verify_str = ""
     tls_verify_gst_str=""
@@ -84,100 +82,109 @@ def main():
     net.staticArp()
 
     # Create 3 hosts
-    baseline_sub = net.addHost('h1', ip="")
-    baseline_relay = net.addHost('h2', ip="")
-    baseline_pub = net.addHost('h3', ip="")
+    baseline_sub = net.addHost(plan.baseline_host(1), ip="")
+    baseline_relay = net.addHost(plan.baseline_host(2), ip="")
+    baseline_pub = net.addHost(plan.baseline_host(3), ip="")
 
     # Connect the hosts
     net.addLink(baseline_pub, baseline_relay,
-                params1={'ip': f"12.0.1.1/24"},
-                params2={'ip': f"12.0.1.2/24"})
+                params1={'ip': f"{plan.baseline(0, 1, 1)}/24"},
+                params2={'ip': f"{relay_ip}/24"})
     net.addLink(baseline_relay, baseline_sub,
-                params1={'ip': f"12.0.2.2/24"},
-                params2={'ip': f"12.0.2.1/24"})
+                params1={'ip': f"{plan.baseline(0, 2, 2)}/24"},
+                params2={'ip': f"{plan.baseline(0, 2, 1)}/24"})
 
-    api = net.addHost('h999', ip="12.2.0.1")
-    root = Node('root', inNamespace=False)
+    api = net.addHost(plan.baseline_host(999), ip=plan.baseline(2, 0, 1))
+    root = Node(plan.baseline_root(), inNamespace=False)
     intf = net.addLink(root, api).intf1
-    root.setIP('12.2.0.99', intf=intf)
+    root.setIP(plan.baseline(2, 0, 99), intf=intf)
     net.addLink(
-        api, baseline_relay, params1={'ip': f"12.1.0.1/24"}, params2={'ip': f"12.1.0.2/24"}
+        api, baseline_relay, params1={'ip': f"{plan.baseline(1, 0, 1)}/24"}, params2={'ip': f"{plan.baseline(1, 0, 2)}/24"}
     )
-    api.cmd('REDIS=12.2.0.99 ./dev/api --bind [::]:4442 &')
-
     net.start()
-    baseline_sub.cmd('ip route add 12.0.1.0/30 via 12.0.2.2')
-    baseline_pub.cmd('ip route add 12.0.2.0/30 via 12.0.1.2')
+    launcher = Launcher(view=os.getenv("XTERM", False))
+    # the api and the relay outlive net.stop(), which only ends the hosts' shells, so they run under a launcher
+    # of their own and are stopped by their process groups at the end, instead of holding ports and redis
+    # into the next trial of a reused network or another slot
+    servers = Launcher()
+    servers.start(api, f'{plan.prefix}baseline-api', f'{plan.redis_env(plan.baseline(2, 0, 99))} ./dev/api --bind [::]:{plan.api_port}')
+    seq = Sequencer(float(os.getenv("STAGE_TIMEOUT", 30)))
+
+    def stage(name, *probes, **kwargs):
+        # a baseline that doesn't get ready still measures whatever arrives, like the sleeps did
+        try:
+            seq.stage(name, *probes, **kwargs)
+        except StageTimeout as e:
+            print(f"*** {e}")
+
+    baseline_sub.cmd(f'ip route add {plan.baseline(0, 1, 0)}/30 via {plan.baseline(0, 2, 2)}')
+    baseline_pub.cmd(f'ip route add {plan.baseline(0, 2, 0)}/30 via {relay_ip}')
+
+    stage('baseline-api', tcp_listening(api, plan.api_port))
 
     # Start the relay on one of the hosts
-    baseline_relay.cmd(template_for_relays.format(
-        host=baseline_relay,
-        bind='12.0.1.2:4443',
-        api='http://12.1.0.1:4442',
-        node='https://12.0.1.2:4443',
+    servers.start(baseline_relay, f'{plan.prefix}baseline-relay', template_for_relays.format(
+        bind=f'{relay_ip}:4443',
+        api=f'http://{plan.baseline(1, 0, 1)}:{plan.api_port}',
+        node=f'https://{relay_ip}:4443',
         tls_verify=tls_verify_str,
         origi="--original"
     ))
-    sleep(1)
+    stage('baseline-relay', udp_listening(baseline_relay, 4443))
+    api_url = f'http://{plan.baseline(1, 0, 1)}:{plan.api_port}'
     # CLI(net)
     track = args.track
     if not clocked and not clockedr:
         vidi_filenammm = track.split("_")[1]
-        baseline_pub.cmd(f'xterm -hold -T "baseline-pub" -e bash -c "export GST_PLUGIN_PATH="${{PWD}}/../moq-gst/target/debug${{GST_PLUGIN_PATH:+:$GST_PLUGIN_PATH}}:${{PWD}}/../6gxr-latency-clock"; gst-launch-1.0 -q -v -e filesrc location="./dev/{vidi_filenammm}.mp4"  ! qtdemux name=before01 \
-    before01.video_0 ! h264parse name=before02 ! avdec_h264 name=before03 ! videoconvert name=before2 ! timestampoverlay name=middle ! videoconvert name=after1 ! x264enc tune=zerolatency name=after2 ! h264parse name=after3 ! isofmp4mux chunk-duration=1 fragment-duration=1 name=after4 ! moqsink {tls_verify_gst_str} url="https://12.0.1.2:4443" namespace="{track}";sleep 0.1 "&')
-        sleep(0.5)
-        baseline_sub.cmd(f'xterm -hold -T "baseline-sub" -e bash -c "export GST_PLUGIN_PATH="${{PWD}}/../moq-gst/target/debug${{GST_PLUGIN_PATH:+:$GST_PLUGIN_PATH}}:${{PWD}}/../6gxr-latency-clock"; export RST_LOG=debug; ./target/debug/moq-sub --name {track} https://12.0.1.2:4443 | GST_DEBUG=timeoverlayparse:4 gst-launch-1.0 --no-position filesrc location=/dev/stdin ! decodebin ! videoconvert ! timeoverlayparse ! videoconvert ! fakesink 2> measurements/assumed_baseline_pre_{filename}.txt" &')
-        sleep(30) # should match with the normal measure
-        subprocess.call(['sudo', 'pkill', '-f', 'xterm'], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        launcher.start(baseline_pub, f'{plan.prefix}baseline-pub', f'export GST_PLUGIN_PATH="${{PWD}}/../moq-gst/target/debug${{GST_PLUGIN_PATH:+:$GST_PLUGIN_PATH}}:${{PWD}}/../6gxr-latency-clock"; gst-launch-1.0 -q -v -e filesrc location="./dev/{vidi_filenammm}.mp4"  ! qtdemux name=before01 \
+    before01.video_0 ! h264parse name=before02 ! avdec_h264 name=before03 ! videoconvert name=before2 ! timestampoverlay name=middle ! videoconvert name=after1 ! x264enc tune=zerolatency name=after2 ! h264parse name=after3 ! isofmp4mux chunk-duration=1 fragment-duration=1 name=after4 ! moqsink {tls_verify_gst_str} url="https://{relay_ip}:4443" namespace="{track}"')
+        stage('baseline-announce', origin_announced(api, api_url, track))
+        launcher.start(baseline_sub, f'{plan.prefix}baseline-sub', f'export GST_PLUGIN_PATH="${{PWD}}/../moq-gst/target/debug${{GST_PLUGIN_PATH:+:$GST_PLUGIN_PATH}}:${{PWD}}/../6gxr-latency-clock"; export RST_LOG=debug; ./target/debug/moq-sub --name {track} https://{relay_ip}:4443 | GST_DEBUG=timeoverlayparse:4 gst-launch-1.0 --no-position filesrc location=/dev/stdin ! decodebin ! videoconvert ! timeoverlayparse ! videoconvert ! fakesink',
+                       stderr=f"measurements/assumed_baseline_pre_{filename}.txt")
+        stage('baseline-samples', samples(f"measurements/assumed_baseline_pre_{filename}.txt", 'gst', target), timeout=base_window)
+        launcher.stop_all()
+        launcher.wait()
 
         lat =  f"measurements/assumed_baseline_pre_{filename}.txt"
 
-        with open(lat, 'r') as file:
-            file_latencies = []
-            for line in file:
-                latency = extract_latency(line)
-                if latency is not None:
-                    file_latencies.append(latency)
-            if file_latencies:
-                average, median, percentile_99 = calculate_statistics(file_latencies)
-                assumed_baseline = average
-                baseline_file = f"measurements/assumed_baseline_{filename}.txt"
-                with open(baseline_file, 'w') as file:
-                    file.write(str(assumed_baseline))
-                print(f"*** assumed baseline: {assumed_baseline}")
+        # the baseline takes every latency, with or without a frame-id
+        file_latencies, _ = parse_gst(lat, require_frame=False)
+        file_latencies, _, warmup = steady(file_latencies)
+        if len(file_latencies):
+            print(f"*** left out {warmup} warm-up latencies")
+            entry = store.record(key, file_latencies)
+            assumed_baseline = entry['average']
+            print(f"*** baseline has {entry['samples']} samples, median {entry['median']} p99 {entry['p99']}")
+            baseline_file = f"measurements/assumed_baseline_{filename}.txt"
+            with open(baseline_file, 'w') as file:
+                file.write(str(assumed_baseline))
+            print(f"*** assumed baseline: {assumed_baseline}")
 
 
     else:
-        baseline_pub.cmd(f'xterm -hold  -T "baseline-pub" -e bash -c "RUST_LOG=info ./target/debug/moq-clock --publish --namespace {track} https://12.0.1.2:4443" &')
-        sleep(0.5)
-        baseline_sub.cmd(f'xterm -hold  -T "baselin-sub" -e bash -c "RUST_LOG=info ./target/debug/moq-clock --namespace {track} https://12.0.1.2:4443 {tls_verify_str} | tee measurements/assumed_baseline_clock_pre_{filename}.txt" &')
-        sleep(30)
-        subprocess.call(['sudo', 'pkill', '-f', 'xterm'], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        launcher.start(baseline_pub, f'{plan.prefix}baseline-pub', f'RUST_LOG=info ./target/debug/moq-clock --publish --namespace {track} https://{relay_ip}:4443{ns_str}')
+        stage('baseline-announce', origin_announced(api, api_url, track))
+        launcher.start(baseline_sub, f'{plan.prefix}baseline-sub', f'RUST_LOG=info ./target/debug/moq-clock --namespace {track} https://{relay_ip}:4443 {tls_verify_str}{ns_str}',
+                       stdout=f"measurements/assumed_baseline_clock_pre_{filename}.txt")
+        stage('baseline-samples', samples(f"measurements/assumed_baseline_clock_pre_{filename}.txt", 'clock', target), timeout=base_window)
+        launcher.stop_all()
+        launcher.wait()
         file_path1 = f"measurements/assumed_baseline_clock_pre_{filename}.txt"
-        with open(file_path1, 'r') as file:
-            file_latencies = []
-            for line in file:
-                try:
-                    number=int(line.strip())
-                    if clocked:
-                        latency = number*1000000
-                        file_latencies.append(latency)
-                    else:
-                        if number<1000 and clockedr:
-                            latency = number*1000000
-                            file_latencies.append(latency)
-                except ValueError:
-                    #todo
-                    continue
-            if file_latencies:
-                assumed_baseline, median, percentile_99 = calculate_statistics(file_latencies)
-                print(f"*** assumed baseline (clocked): {assumed_baseline}")
-                baseline_file = f"measurements/assumed_clocked_baseline_{filename}.txt"
-                with open(baseline_file, 'w') as file:
-                    file.write(str(assumed_baseline))
+        # clock takes every sample, clockr cuts off the ones of a second and more, --ns only leaves out the backlog
+        file_latencies, _ = parse_clock(file_path1, None if clocked else 1000)
+        file_latencies, _, warmup = steady(file_latencies)
+        if len(file_latencies):
+            print(f"*** left out {warmup} warm-up latencies")
+            entry = store.record(key, file_latencies)
+            assumed_baseline = entry['average']
+            print(f"*** assumed baseline (clocked): {assumed_baseline} from {entry['samples']} samples")
+            baseline_file = f"measurements/assumed_clocked_baseline_{filename}.txt"
+            with open(baseline_file, 'w') as file:
+                file.write(str(assumed_baseline))
+    servers.stop_all()
+    servers.wait()
     net.stop()
-
-    subprocess.call(['sudo', 'pkill', '-f', 'xterm'], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    print(f"*** baseline stages: {seq.summary()}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,124 @@
+"""
+Store of the assumed baselines measured by base_try.py.
+
+The baseline of a track only depends on the track, the mode, whether tls is
+verified and the binaries doing the work, but base_try.py used to measure it
+again before every trial. The latencies are now kept in
+measurements/baseline_store.json under that key, and a trial reuses them as
+long as they are younger than the ttl and there are enough of them.
+Baselines which stopped short of the sample target are topped up by the
+next measurement of the same key instead of being thrown away.
+"""
+
+import fcntl
+import glob
+import hashlib
+import json
+import os
+import time
+
+import numpy as np
+
+STORE = 'measurements/baseline_store.json'
+
+# what the baseline runs besides the relay, a rebuild of any of them invalidates it
+BINARIES = {
+    'clock': ['./target/debug/moq-relay', './target/debug/moq-clock'],
+    'gst': ['./target/debug/moq-relay', './target/debug/moq-sub',
+            '../moq-gst/target/debug/*.so', '../6gxr-latency-clock/*.so'],
+}
+# what base_try.py waits for when BASE_SAMPLES isn't set
+DEFAULT_SAMPLES = {'gst': 300, 'clock': 20, 'clockr': 20}
+
+
+def sample_target(mode, samples=0):
+    return samples or DEFAULT_SAMPLES[baseline_mode(mode)]
+
+
+def baseline_mode(mode):
+    # ffmpeg trials get the gst baseline, see base_try.py
+    return mode if mode in ['clock', 'clockr'] else 'gst'
+
+
+def build_hash(mode):
+    # size and mtime instead of the content, the debug builds are hundreds of MB
+    # and any rebuild touches them anyway
+    h = hashlib.sha256()
+    for pattern in BINARIES['gst' if baseline_mode(mode) == 'gst' else 'clock']:
+        for path in sorted(glob.glob(pattern)):
+            stat = os.stat(path)
+            h.update(f"{path}:{stat.st_size}:{stat.st_mtime_ns};".encode())
+    return h.hexdigest()[:16]
+
+
+def baseline_key(track, mode, tls_verify, ns=False):
+    mode = baseline_mode(mode)
+    # a --ns baseline keeps the latencies a ms one cuts off, they are not interchangeable
+    return f"{track}|{mode}{'|ns' if ns else ''}|{'tls' if tls_verify else 'notls'}|{build_hash(mode)}"
+
+
+def summarize(latencies):
+    latencies = np.asarray(latencies, dtype=np.float64)
+    return {
+        'average': float(np.mean(latencies)) / 1e9,
+        'median': float(np.median(latencies)) / 1e9,
+        'p99': float(np.percentile(latencies, 99)) / 1e9,
+        'std': float(np.std(latencies)) / 1e9,
+        'samples': int(len(latencies)),
+    }
+
+
+class BaselineStore:
+    def __init__(self, path=STORE, ttl=3600.0, target=0):
+        self.path = path
+        self.ttl = ttl
+        # how many latencies a stored baseline needs before it is reused
+        self.target = target
+
+    def _locked(self, mode):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        lock = open(f"{self.path}.lock", 'w')
+        fcntl.flock(lock, mode)
+        return lock
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return {}
+        with open(self.path, 'r') as file:
+            try:
+                return json.load(file)
+            except ValueError:
+                return {}
+
+    def _fresh(self, entry):
+        return entry is not None and time.time() - entry['measured'] <= self.ttl
+
+    def lookup(self, key):
+        """The stored entry if it is fresh and has enough samples, None means measure again."""
+        if self.ttl <= 0:
+            return None
+        with self._locked(fcntl.LOCK_SH):
+            entry = self._load().get(key)
+        if self._fresh(entry) and entry['samples'] >= max(self.target, 1):
+            return entry
+        return None
+
+    def record(self, key, latencies):
+        """Adds the latencies (ns) of a measurement and returns the updated entry."""
+        with self._locked(fcntl.LOCK_EX):
+            entries = self._load()
+            entry = entries.get(key)
+            latencies = [int(latency) for latency in latencies]
+            if self._fresh(entry) and entry['samples'] < self.target:
+                # the last one stopped short, keep what it got
+                latencies = entry['latencies'] + latencies
+                measured = entry['measured']
+            else:
+                measured = time.time()
+            entry = dict(summarize(latencies), latencies=latencies, measured=measured)
+            entries[key] = entry
+            tmp = f"{self.path}.tmp{os.getpid()}"
+            with open(tmp, 'w') as file:
+                json.dump(entries, file)
+            os.replace(tmp, self.path)
+        return entry
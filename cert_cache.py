@@ -0,0 +1,86 @@
+"""
+Cache of the dev certificates baked with mkcert.
+
+Baking a cert means `go run filippo.io/mkcert`, which compiles and runs go
+every time and takes seconds. The certs only depend on their SAN list and
+lifetime, so the pairs are kept in dev/cert_cache/<key>/ where the key is a
+hash of both, and a cached pair is copied to dev/localhost.crt/key as long
+as it is not about to expire.
+"""
+
+import fcntl
+import hashlib
+import os
+import shutil
+import subprocess
+
+CACHE_DIR = './dev/cert_cache'
+DAYS = 10
+# a cert that expires within this many seconds is baked again
+MARGIN = 24 * 3600
+# mkcert always adds these, see dev/cert
+DEFAULT_SANS = ['localhost', '127.0.0.1', '::1']
+
+
+def cache_key(sans, days=DAYS):
+    # the order of the ips doesn't change the cert, duplicates neither
+    names = sorted(set(DEFAULT_SANS + list(sans)))
+    return hashlib.sha256(f"{days}|{' '.join(names)}".encode()).hexdigest()[:16]
+
+
+def still_valid(crt, margin=MARGIN):
+    if not os.path.exists(crt):
+        return False
+    # openssl says 0 if the cert is still valid after margin seconds
+    return subprocess.call(['openssl', 'x509', '-checkend', str(int(margin)), '-noout', '-in', crt],
+                           stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL) == 0
+
+
+def bake(sans, folder, days=DAYS, go_path=''):
+    # dev/cert with its last line pointed into the cache folder, it runs from ./dev
+    with open('./dev/cert', 'r') as file:
+        cert_content = file.readlines()
+    relative = os.path.relpath(folder, './dev')
+    cert_content[-1] = (f'go run filippo.io/mkcert -ecdsa -days {days} -cert-file "{relative}/$CRT" -key-file "{relative}/$KEY" '
+                        f'localhost 127.0.0.1 ::1  {" ".join(sans)}')
+    with open('./dev/cert2', 'w') as file:
+        file.writelines(cert_content)
+    os.chmod('./dev/cert2', 0o755)
+    env = os.environ.copy()
+    env['PATH'] = env['PATH'] + go_path
+    subprocess.call(['./dev/cert2'], env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def install(src, dst):
+    # relays which are already up keep their file, the new one is renamed over it
+    with open(src, 'rb') as file:
+        new = file.read()
+    if os.path.exists(dst):
+        with open(dst, 'rb') as file:
+            if file.read() == new:
+                return
+    tmp = f"{dst}.tmp{os.getpid()}"
+    shutil.copyfile(src, tmp)
+    os.replace(tmp, dst)
+
+
+def ensure_cert(sans, days=DAYS, go_path='', log=print):
+    """Put a cert for sans in dev/localhost.crt/key, baking it only if there is no valid cached one."""
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    folder = os.path.join(CACHE_DIR, cache_key(sans, days))
+    crt = os.path.join(folder, 'localhost.crt')
+    key = os.path.join(folder, 'localhost.key')
+    # base_try.py and good-try.py may both get here at the same time
+    with open(os.path.join(CACHE_DIR, '.lock'), 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        if still_valid(crt) and os.path.exists(key):
+            log(f"** Reusing cached cert {folder}")
+        else:
+            log(f"** Baking fresh cert into {folder}")
+            os.makedirs(folder, exist_ok=True)
+            bake(sans, folder, days, go_path)
+            if not still_valid(crt, 0):
+                raise RuntimeError(f"mkcert did not produce {crt}, see ./dev/cert2")
+        install(crt, './dev/localhost.crt')
+        install(key, './dev/localhost.key')
+    return folder
@@ -0,0 +1,90 @@
+"""
+Fan-out skew of a track over its subscribers.
+
+Every subscriber of a track gets the same frames from the same publisher,
+so their latencies can be joined on the frame-id: gst's Frame-id, or the
+group and object of moq-clock --ns. align() puts them into one frames x
+subscribers matrix, NaN where a subscriber has no latency for a frame, and
+the rest are numpy reductions over its rows and columns:
+- spread: max - min latency of a frame over the subscribers that got it,
+  how far apart the relays delivered it, its percentiles are the skew,
+- lag: a subscriber's latency minus the frame's median, averaged per
+  subscriber, which ones the fan-out serves last,
+- lost: frames some subscribers got and others didn't, only counted in the
+  window all of them were running, the ones before a late join or after an
+  early end aren't lost.
+moq-clock without --ns has no frame-id, it numbers its lines, so its
+latencies can't be joined.
+"""
+
+import numpy as np
+
+PERCENTILES = (50, 90, 99)
+
+
+def align(columns):
+    """columns is {sub: (latency, frame)}, gives (frame ids, subs, latency matrix with NaN for missing)."""
+    subs = sorted(columns)
+    frames = np.unique(np.concatenate([np.asarray(columns[sub][1], dtype=np.int64) for sub in subs] or [np.empty(0, np.int64)]))
+    matrix = np.full((len(frames), len(subs)), np.nan)
+    for index, sub in enumerate(subs):
+        latency, frame = columns[sub]
+        # the first latency of a frame id, gst logs some frames twice
+        frame, first = np.unique(np.asarray(frame, dtype=np.int64), return_index=True)
+        matrix[np.searchsorted(frames, frame), index] = np.asarray(latency, dtype=np.float64)[first]
+    return frames, subs, matrix
+
+
+def window(matrix):
+    """Mask of the frames between the latest first frame and the earliest last frame of the subscribers."""
+    got = ~np.isnan(matrix)
+    rows = np.arange(len(matrix))
+    if not len(matrix) or not got.any(axis=0).all():
+        return np.zeros(len(matrix), dtype=bool)
+    first = np.argmax(got, axis=0).max()
+    last = (len(matrix) - 1 - np.argmax(got[::-1], axis=0)).min()
+    return (rows >= first) & (rows <= last)
+
+
+def skew(columns):
+    """{'subs', 'frames', 'complete', 'spread' (ns per frame got by 2 or more), 'lost' and 'lag' (ns) per sub}"""
+    frames, subs, matrix = align(columns)
+    got = ~np.isnan(matrix)
+    inside = window(matrix)
+    shared = got.sum(axis=1) >= 2
+    rows = matrix[shared]
+    spread = np.nanmax(rows, axis=1) - np.nanmin(rows, axis=1) if len(rows) else np.empty(0)
+    lag = rows - np.nanmedian(rows, axis=1)[:, None] if len(rows) else np.empty((0, len(subs)))
+    # a frame is lost by a sub if any other one got it within the window
+    lost = (~got & got.any(axis=1)[:, None] & inside[:, None]).sum(axis=0)
+    return {
+        'subs': subs,
+        'frames': int(inside.sum()),
+        'complete': int(got[inside].all(axis=1).sum()),
+        'spread': spread,
+        'lost': dict(zip(subs, lost.tolist())),
+        'lag': {sub: float(np.nanmean(lag[:, index])) if (~np.isnan(lag[:, index])).any() else None
+                for index, sub in enumerate(subs)},
+    }
+
+
+def percentiles(spread):
+    """{p: ms} of the spread, None for every p without frames shared by two subscribers."""
+    if not len(spread):
+        return {p: None for p in PERCENTILES + (100,)}
+    return dict(zip(PERCENTILES + (100,), (np.percentile(spread, PERCENTILES + (100,)) / 1e6).tolist()))
+
+
+def report(skews):
+    """skews is {track: skew(...)}"""
+    lines = ["track;subs;frames;complete;" + ';'.join(f"spread p{p} ms" for p in PERCENTILES) + ";spread max ms"]
+    for track, result in sorted(skews.items()):
+        values = percentiles(result['spread'])
+        lines.append(f"{track};{len(result['subs'])};{result['frames']};{result['complete']};"
+                     + ';'.join('' if values[p] is None else f"{values[p]:.3f}" for p in PERCENTILES + (100,)))
+    lines.append("track;sub;lost;lag ms")
+    for track, result in sorted(skews.items()):
+        for sub in result['subs']:
+            lag = result['lag'][sub]
+            lines.append(f"{track};{sub};{result['lost'][sub]};{'' if lag is None else f'{lag / 1e6:.3f}'}")
+    return '\n'.join(lines) + '\n'
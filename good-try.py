@@ -2,31 +2,45 @@
 
 import os
 import subprocess
-import yaml
 from functools import partial
 from time import sleep
 from sys import exit  # pylint: disable=redefined-builtin
 
 from mininet.net import Mininet
 from mininet.util import dumpNodeConnections
-from mininet.log import setLogLevel, info
+from mininet.log import setLogLevel
 from mininet.cli import CLI
 from mininet.node import Node
 from mininet.link import TCLink
 from mininet import log
-import os
 import datetime
-import glob
 import re
 import numpy as np
-import re
-import os
-import datetime
-import subprocess
-import json
 import the_path
-import networkx as nx
+import fcntl
+import signal
+import tempfile
+from time import monotonic
 from collections import Counter
+from adaptive import Convergence
+from addr_plan import AddressPlan, MAX_SLOTS
+from topo_compiler import load_config, compile_topo, check_full_mesh, check_connected
+from trial_sched import Trial, cores_needed, run_parallel
+from baseline_store import BaselineStore, baseline_key, sample_target, build_hash
+from cert_cache import ensure_cert
+from latency import parse_latencies, save_latencies, parse_load_report
+from warmup import steady
+from fanout_skew import skew, percentiles as skew_percentiles, report as skew_report
+from launcher import Launcher, CLIENT_PATTERN
+from live_monitor import LiveMonitor, TrialStalled
+from netstats import read_net_dev, delta, format_net_dev, NetSampler
+from results_store import ResultsStore
+from proc_profile import ProcProfiler
+from api_poller import summarize as summarize_polls
+from gst_tracer import parse_tracer, publisher_ns, report as tracer_report
+from hop_trace import load_trace, join as join_hops, report as hop_report, save as save_hops
+from relay_metrics import summarize as summarize_metrics, fanout, report as metrics_report
+from readiness import Sequencer, StageTimeout, tcp_listening, udp_listening, origin_announced, no_process, first_object, QuietProbe
 
 my_debug = os.getenv("MY_DEBUG", False)
 all_gas_no_brakes= not os.getenv("BRAKE", False)
@@ -39,6 +53,58 @@ topofile= os.getenv("TOPO", "tiniest_topo.yaml")
 folding= os.getenv("BUILD", False)
 # gst mostly, clock for moq-clock, clockr cuts off seconds of first delays, ffmpeg for no measurement
 mode = os.getenv("MODE", "clock")
+# moq-clock stamps and prints every object in ns, one way to the ns instead of whole ms
+clock_ns = os.getenv("CLOCK_NS", False)
+# how many trials may run at once, each in its own mininet, 1 keeps the old serial run
+parallel = int(os.getenv("PARALLEL", 1))
+core_budget = int(os.getenv("CORES", os.cpu_count()))
+# seconds a startup stage may take before the trial is given up
+stage_timeout = float(os.getenv("STAGE_TIMEOUT", 30))
+# build the network once per topology and only restart the processes for the NUMERO repetitions
+reuse_net = os.getenv("REUSE_NET", False)
+# a stored baseline of the same track, mode, tls and build is reused for this many seconds, 0 measures every time
+base_ttl = float(os.getenv("BASE_TTL", 3600))
+base_samples = int(os.getenv("BASE_SAMPLES", 0))
+# ip -batch per host for the addresses and routes, NO_IP_BATCH goes back to one cmd per route to compare
+ip_batch = not os.getenv("NO_IP_BATCH", False)
+# an xterm per client tailing its output, the clients themselves always run without one
+xterm_view = os.getenv("XTERM", False)
+# the parsed latencies go to a _latency.npz instead of the _cleaned.txt / _clocked.txt csv
+lat_binary = os.getenv("LAT_BINARY", False)
+# a trial is given up once a subscriber got nothing for LIVE_STALL seconds, 0 never
+live_stall = float(os.getenv("LIVE_STALL", 10))
+# stop a trial early once every subscriber's mean latency is known to +-LIVE_CI_MS (95%), 0 runs the whole video
+live_ci_ms = float(os.getenv("LIVE_CI_MS", 0))
+live_min_samples = int(os.getenv("LIVE_MIN_SAMPLES", 100))
+# moq-clock's ms latencies of CLOCK_MAX_MS and more are the backlog of the group it joined and left out, 0 keeps them,
+# the live monitor and the parse after the run both use it
+clock_max_ms = int(os.getenv("CLOCK_MAX_MS", 1000)) or None
+# the relays' interface counters are sampled this often (ms) during a trial, 0 for not at all
+net_sample_ms = float(os.getenv("NET_SAMPLE_MS", 100))
+# and the cpu, rss, context switches and threads of the relays and clients, 0 for not at all
+proc_sample_ms = float(os.getenv("PROC_SAMPLE_MS", 500))
+# the opti api's topology of every track is polled this often during the run, 0 for only once at the end
+api_poll_ms = float(os.getenv("API_POLL_MS", 500))
+# every subscriber's result and per-frame latencies also go to this sqlite file, empty for none
+results_db = os.getenv("RESULTS_DB", "measurements/results.sqlite")
+# adaptive repetitions instead of NUMERO: repeat until the 95% ci of average-baseline is ADAPTIVE_MS wide,
+# at least ADAPTIVE_MIN and at most ADAPTIVE_MAX times
+adaptive_width = float(os.getenv("ADAPTIVE_MS", 0)) / 1000
+adaptive_min = int(os.getenv("ADAPTIVE_MIN", 3))
+adaptive_max = int(os.getenv("ADAPTIVE_MAX", max(num_of_tries, 20)))
+# topologies without a full mesh, the relays route over the shortest path by latency
+sparse = os.getenv("SPARSE", False)
+# /31 instead of /30 point to point subnets, twice the links per address pool
+p2p_prefix = 31 if os.getenv("P2P_31", False) else 30
+# topo:api[:mode],... instead of the_path.test_set, scale_sweep.py runs the generated topologies with it
+test_set_env = os.getenv("TEST_SET", "")
+# the relays write a line per object they receive, dequeue and send, joined into per-hop latencies after the run
+hop_trace = os.getenv("HOP_TRACE", False)
+# the warm-up at the start of every subscriber's latencies is found with MSER-5 and left out of the statistics
+trim_warmup = not os.getenv("NO_WARMUP_TRIM", False)
+# every relay's /metrics is scraped this often from its own namespace during the run, 0 for not at all,
+# the relays then count every object per track, so leave it off for latencies comparable to runs without it
+relay_metrics_ms = float(os.getenv("RELAY_METRICS_MS", 0))
 
 
 def info(msg):
@@ -48,21 +114,12 @@ def debug(msg):
     if my_debug:
         log.info(msg + '\n')
 
-def relayid_to_ip(relayname, node_names):
-    relayid = node_names.index(relayname) + 1
-    return f"10.3.0.{relayid}"
-
 def calculate_statistics(latencies):
     average = np.mean(latencies)
     std_dev = np.std(latencies)
     median = np.median(latencies)
     percentile_99 = np.percentile(latencies, 99)
     return average/1e9, std_dev/1e9,median/1e9, percentile_99/1e9
-def extract_latency(line):
-    match = re.search(r'(\d+),', line)
-    if match:
-        return int(match.group(1))
-    return None
 
 if not os.geteuid() == 0:
     exit("** This script must be run as root")
@@ -70,692 +127,812 @@ if not os.geteuid() == 0:
 if not os.path.exists('the_path.py'):
     exit("** the_path module is not available")
 
-test_set = the_path.test_set
+test_set = [tuple(item.split(':')) for item in test_set_env.split(',') if item] or the_path.test_set
 test_set_unique = list(set(item[0] for item in test_set))
 
-# Checking all the topo files if they have all the edges
+# Checking all the topo files if they have all the edges (or with SPARSE a path between every two relays),
+# the parsed yaml stays cached for the trials
 for topo in test_set_unique:
-    with open(f"../cdn-optimization/datasource/{topo}", 'r') as file:
-        config = yaml.safe_load(file)
-    node_names = [node['name'] for node in config['nodes']]
-
-    G = nx.Graph()
-    G.add_nodes_from(node_names)
-    for edge in config['edges']:
-        G.add_edge(edge['node1'], edge['node2'])
-    is_full_mesh = all(G.has_edge(node1, node2) for node1 in node_names for node2 in node_names if node1 != node2)
-
-    if not is_full_mesh:
-        raise ValueError(f"The nodes and edges do not form a full mesh in {topo}")
-if __name__ == '__main__':
-
-    for topo_idx in range(len(test_set)):
-        for try_idx in range(num_of_tries):
-            print("** Mopping up remaining mininet")
-
-            subprocess.call(['sudo', 'mn', '-c'], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-            subprocess.call(['sudo', 'pkill', '-f','gst-launch'], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-            subprocess.call(['sudo', 'pkill', '-f','xterm'], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-
-            if my_debug or folding:
-                print("** Folding them needed binaries")
-                subprocess.run(['rm', 'target/debug/*'], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-                subprocess.run(['sudo', '-u', the_path.user, the_path.cargopath, 'build'], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-
-            sleep(5)
-
-
-            if my_debug:
-                setLogLevel( 'info' )
-            else:
-                setLogLevel( 'critical' )
-            current_time1 = datetime.datetime.now().strftime("%Y%m%d%H%M%S")
-
-
+    if sparse:
+        check_connected(topo)
+    else:
+        check_full_mesh(topo)
+
+
+def mop_up():
+    print("** Mopping up remaining mininet")
+
+    subprocess.call(['sudo', 'mn', '-c'], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    subprocess.call(['sudo', 'pkill', '-f','gst-launch'], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    subprocess.call(['sudo', 'pkill', '-f','xterm'], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    # headless clients don't go down with an xterm any more
+    subprocess.call(['sudo', 'pkill', '-f', CLIENT_PATTERN], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    subprocess.call(['sudo', 'pkill', '-f', '[a]pi_poller.py'], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    subprocess.call(['sudo', 'pkill', '-f', '[r]elay_metrics.py'], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+def fold_binaries():
+    if my_debug or folding:
+        print("** Folding them needed binaries")
+        subprocess.run(['rm', 'target/debug/*'], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        subprocess.run(['sudo', '-u', the_path.user, the_path.cargopath, 'build'], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+def bake_cert(ips):
+    # mkcert only runs if the cache has no valid cert for exactly these ips
+    ensure_cert(ips, go_path=the_path.PATH_GO)
+
+def server_patterns(plan, relays, config):
+    patterns = [f'moq-relay --bind {plan.loopback(i)}:4443 ' for i in range(1, len(relays)+1)]
+    if config['api'] == 'origi':
+        patterns.append(f'moq-api --redis redis://{plan.docker_ip(99)}:')
+    elif config['api'] == 'opti':
+        patterns.append(f'fastapi dev app/api.py --host {plan.api_ip(1)} --port {plan.api_port}')
+    return patterns
+
+def stop_servers(plan, relays, config, sig='TERM'):
+    # matched on their slot's addresses, the relays of the other parallel trials stay
+    for pattern in server_patterns(plan, relays, config):
+        subprocess.call(['pkill', f'-{sig}', '-f', pattern], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def install_ip(hosts, topo):
+    # the loopback addresses and routes of a host go in one ip -batch instead of a cmd() round trip each
+    start = monotonic()
+    count = 0
+    for k, host in hosts.items():
+        commands = topo.ip_commands(k)
+        count += len(commands)
+        for command in commands:
+            debug(f'{host.name}: ip {command}')
+        if not ip_batch:
+            for command in commands:
+                host.cmd(f'ip {command}')
+            continue
+        with tempfile.NamedTemporaryFile('w', prefix=f'{host.name}-', suffix='.ip', delete=False) as file:
+            file.write('\n'.join(commands) + '\n')
+        # -force goes on after an error, the single commands didn't stop either
+        out = host.cmd(f'ip -force -batch {file.name}')
+        os.unlink(file.name)
+        if out.strip():
+            debug(f'{host.name}: {out.strip()}')
+    if topo.forwarding:
+        # multi-hop routes need forwarding, and a reply may come back over another path than the request went
+        for i in range(1, topo.relay_number + 1):
+            hosts[i].cmd('sysctl -qw net.ipv4.ip_forward=1; for f in /proc/sys/net/ipv4/conf/*/rp_filter; do echo 0 > $f; done')
+        print(f"** {len(topo.forwarding)} of {topo.relay_number} relays forward for multi-hop routes")
+    took = monotonic() - start
+    if not ip_batch:
+        print(f"** {count} addresses and routes one by one took {took:.2f}s")
+        return
+    # what the old way would have cost, one shell round trip per command
+    probe = hosts[1]
+    rtt_start = monotonic()
+    for _ in range(5):
+        probe.cmd('ip route show dev lo')
+    rtt = (monotonic() - rtt_start) / 5
+    print(f"** {count} addresses and routes in {len(hosts)} batches took {took:.2f}s, "
+          f"one by one would be about {count*rtt:.2f}s, saved {count*rtt - took:.2f}s")
+
+
+def run_trial(topo_idx, tries, slot=0, on_result=None):
+    plan = AddressPlan(slot, p2p_prefix)
+    seq = Sequencer(stage_timeout)
+    # in parallel mode the parent cleans up and builds once for every trial
+    if parallel <= 1:
+        mop_up()
+        fold_binaries()
+        seq.stage('cleanup', no_process('gst-launch'), no_process('[x]term'), no_process(CLIENT_PATTERN))
 
-            topofile = test_set[topo_idx][0]
-            with open(f"../cdn-optimization/datasource/{topofile}", 'r') as file:
-                config = yaml.safe_load(file)
-            config['mode'] = test_set[topo_idx][2] if len(test_set[topo_idx]) > 2 else mode
-            config['api'] = test_set[topo_idx][1]
-            print(f"** Sorting out the config {topofile} with {config['mode']} and {config['api']}")
 
-            baseline_clk_str = ""
-            baseline_tls_str = ""
-            baseline_path_clk_str = ""
-            if config['mode'] in ['clock', 'clockr']:
-                baseline_clk_str = f"--{config['mode']}"
-                baseline_path_clk_str = "clocked_"
-            if forklift_certified:
-                baseline_tls_str = "--tls-verify"
-
-            baseline_path = os.path.join('measurements', f"assumed_{baseline_path_clk_str}baseline_{current_time1}.txt")
-            based_line = 0.0
-            if not no_based_line:
-                subprocess.call(['sudo', 'python', 'base_try.py', '--filename', f"{current_time1}",'--track',f"{config['first_hop_relay'][0]['track']}"] + ([baseline_clk_str] if baseline_clk_str else []) + ([baseline_tls_str] if baseline_tls_str else []))
-                with open(baseline_path, 'r') as file:
-                    baseline_content = file.read().strip()
-                    based_line = float(baseline_content)
-            else:
-                print("** No baseline because debugging NO_BASE envvar")
-                based_line = 0.0
-                with open(baseline_path, 'w') as file:
-                    file.write(str(based_line))
-
-
-            net = Mininet( topo=None, waitConnected=True, link=partial(TCLink) )
-            net.staticArp()
-            switch = net.addSwitch('s1',failMode='standalone')
-
-
-            relay_number = len(config['nodes'])
-
-
-            node_names = [item['name'] for item in config['nodes']]
-            edges = config['edges']
-            connections = []
-            for edge in edges:
-                src = edge['node1']
-                dst = edge['node2']
-                src_index = node_names.index(src) + 1
-                dst_index = node_names.index(dst) + 1
-                latency = edge['attributes']['latency']
-                connection = {'node1': src_index, 'node2': dst_index, 'delay': latency}
-                connections.append(connection)
-                debug(f"I see {src} to {dst} at index {connection['node1']} and {connection['node2']} with latency {connection['delay']}ms")
-            edges = connections
-
-
-            # print("** Baking fresh cert")
-            ip_string = ' '.join([f'10.3.0.{i}' for i in range(1, relay_number+1)])
-            with open('./dev/cert', 'r') as file:
-                cert_content = file.readlines()
-            cert_content[-1] = f'go run filippo.io/mkcert -ecdsa -days 10 -cert-file "$CRT" -key-file "$KEY" localhost 127.0.0.1 ::1  {ip_string}'
-            with open('./dev/cert2', 'w') as file:
-                file.writelines(cert_content)
-            env = os.environ.copy()
-            env['PATH'] =  env['PATH'] + the_path.PATH_GO
-            subprocess.call(['./dev/cert2'], env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-
-            """
-            the different networks are:
-            - 10.0.x.0/24 - relay to relay connections where x is a counter
-            - 10.1.1.0/24 - api network
-            - 10.2.0.0/24 - api to host os connection (for docker)
-            - 10.3.0.0/24 - relay identifying ips, on the lo interface of the relays
-            - 10.4.x.0/24 - pub and sub to relay connections, where x is a counter
-            the first_hop_relay is the relay which the pub will use
-            the last_hop_relay is the relay which the sub(s) will use (with 3 subs the third will fail, if sleep is higher than 0.2)
-            """
-
-            first_hop_relay = [(relayid_to_ip(item['relayid'], node_names), item['track']) for item in config['first_hop_relay']]
-            last_hop_relay = [(relayid_to_ip(item['relayid'], node_names), item['track']) for item in config['last_hop_relay']]
-
-            number_of_clients = len(last_hop_relay)+len(first_hop_relay)
-            relays = []
-            pubs = []
-            subs= []
-            k = 1
-
-
-            # ** Creating hosts
-            for i in range(relay_number):
-                host = net.addHost(f'h{k}', ip="")
-                host.cmd('ip addr add 10.3.0.%s/32 dev lo' % str((k)))
-                relays.append(host)
-
-                k += 1
-
-            for i in range(len(first_hop_relay)):
-                host = net.addHost(f'h{k}', ip="")
-                host.cmd('ip addr add 10.3.0.%s/32 dev lo' % str((k)))
-                pubs.append((host,first_hop_relay[i][1]))
-
-                k += 1
-
-            for i in range(len(last_hop_relay)):
-                host = net.addHost(f'h{k}', ip="")
-                host.cmd('ip addr add 10.3.0.%s/32 dev lo' % str((k)))
-                subs.append((host,last_hop_relay[i][1]))
-
-                k += 1
-
-
-            # *** Setting up full mesh network
-            network_counter = 0
-            delay = None
-            # *** connecting pubs and subs
-            pub_relays = {}
-            for i in range(relay_number):
-                matching_pubs = [g for g, (ip, _) in enumerate(first_hop_relay) if ip.split('.')[-1] == str(i+1)]
-                for index in matching_pubs:
-                    net.addLink( pubs[index][0],relays[i],
-                        params1={'ip': f"10.4.{network_counter}.{2*index+1}/24"},
-                        params2={'ip':  f"10.4.{network_counter}.{2*index+2}/24"})
-                    pubs[index][0].cmd(f'ip route add 10.3.0.{i+1}/32 via 10.4.{network_counter}.{2*index+2}')
-                    debug(f'ip route add 10.3.0.{i+1}/32 via 10.4.{network_counter}.{2*index+2}')
-                    network_counter += 1
-                    pub_relays[str(pubs[index][1])]=(relays[i])
-
-                matching_subs = [g for g, (ip, _) in enumerate(last_hop_relay) if ip.split('.')[-1] == str(i+1)]
-                for index in matching_subs:
-                    net.addLink( subs[index][0],relays[i],
-                        params1={'ip': f"10.5.{network_counter}.{2*index+1}/24"},
-                        params2={'ip':  f"10.5.{network_counter}.{2*index+2}/24"})
-                    subs[index][0].cmd(f'ip route add 10.3.0.{i+1}/32 via 10.5.{network_counter}.{2*index+2}')
-                    debug(f'ip route add 10.3.0.{i+1}/32 via 10.5.{network_counter}.{2*index+2}')
-                    network_counter += 1
-
-            # *** connecting relays to each other adding delays
-            for i in range(relay_number):
-                for j in range(i + 1, relay_number):
-                    searching = True
-                    for edge in edges:
-                        if ((i+1 == edge['node1'] and j+1 == edge['node2']) or (i+1 == edge['node2'] and j+1 == edge['node1'])) and searching:
-                            delay=edge['delay']
-                            debug(f"delay between {i+1} and {j+1} is {delay}")
-                            searching=False
-                            # break
-                    ip1 = f"10.0.{network_counter}.1/24"
-                    ip2 = f"10.0.{network_counter}.2/24"
-
-                    host1 = relays[i]
-                    host2 = relays[j]
-                    if delay is None:
-                        net.addLink(host1, host2, cls=TCLink,
-                        params1={'ip': ip1},
-                        params2={'ip': ip2})
-                    else:
-                        net.addLink(host1, host2, cls=TCLink, delay=f'{delay}ms',
-                        params1={'ip': ip1},
-                        params2={'ip': ip2})
-                        info(f"\n")
-
-                    ip1 = f"10.0.{network_counter}.1"
-                    ip2 = f"10.0.{network_counter}.2"
-                    host1.cmd(f'ip route add 10.3.0.{j+1}/32 via {ip2}')
-                    host2.cmd(f'ip route add 10.3.0.{i+1}/32 via {ip1}')
-                    debug(f'ip route add 10.3.0.{j+1}/32 via {ip2}')
-                    debug(f'ip route add 10.3.0.{i+1}/32 via {ip1}')
-                    network_counter += 1
-                    delay=None
-
-
-            api = net.addHost('h999', ip="10.2.0.1")
-            root = Node( 'root', inNamespace=False )
-            intf = net.addLink( root, api ).intf1
-            root.setIP( '10.2.0.99', intf=intf )
-
-            # *** Setting up "api network"
-            ip_counter = 1
+    if my_debug:
+        setLogLevel( 'info' )
+    else:
+        setLogLevel( 'critical' )
+    topofile = test_set[topo_idx][0]
+    config = load_config(topofile)
+    config['mode'] = test_set[topo_idx][2] if len(test_set[topo_idx]) > 2 else mode
+    config['api'] = test_set[topo_idx][1]
+    print(f"** Sorting out the config {topofile} with {config['mode']} and {config['api']}")
+    topo = compile_topo(config, plan)
+
+    # the clients run headless, XTERM only adds a window tailing their output
+    launcher = Launcher(view=xterm_view)
+
+    net = Mininet( topo=None, waitConnected=True, link=partial(TCLink) )
+    net.staticArp()
+    switch = net.addSwitch(plan.switch(),failMode='standalone')
+
+
+    relay_number = topo.relay_number
+
+
+    # print("** Baking fresh cert")
+    # parallel trials share one cert which the parent baked for every slot,
+    # the baseline's ips are in it too as the baseline now runs next to the network
+    if parallel <= 1:
+        bake_cert(plan.loopbacks(relay_number) + plan.baseline_ips())
+
+    """
+    the networks are described in addr_plan.py
+    the first_hop_relay is the relay which the pub will use
+    the last_hop_relay is the relay which the sub(s) will use
+    """
+
+    first_hop_relay = [(plan.loopback(client.relay), client.track) for client in topo.pubs]
+    last_hop_relay = [(plan.loopback(client.relay), client.track) for client in topo.subs]
+
+    number_of_clients = len(last_hop_relay)+len(first_hop_relay)
+
+    # ** Creating hosts, links and routes from the compiled plan, see topo_compiler.py
+    hosts = {}
+    for k in range(1, topo.host_count+1):
+        hosts[k] = net.addHost(plan.host(k), ip="")
+    relays = [hosts[i] for i in range(1, relay_number+1)]
+    pubs = [(hosts[client.k], client.track) for client in topo.pubs]
+    subs = [(hosts[client.k], client.track) for client in topo.subs]
+    # load generators, one host running many subscriptions of its track
+    virtual_subs = {hosts[client.k].name: (client.virtual, client.sessions) for client in topo.subs if client.virtual}
+    pub_relays = {track: hosts[i] for track, i in topo.pub_relay.items()}
+
+    for link in topo.links:
+        if link.delay is None:
+            net.addLink(hosts[link.a], hosts[link.b], cls=TCLink,
+                params1={'ip': f"{link.ip_a}/{plan.p2p_prefix}"},
+                params2={'ip': f"{link.ip_b}/{plan.p2p_prefix}"})
+        else:
+            net.addLink(hosts[link.a], hosts[link.b], cls=TCLink, delay=f'{link.delay}ms',
+                params1={'ip': f"{link.ip_a}/{plan.p2p_prefix}"},
+                params2={'ip': f"{link.ip_b}/{plan.p2p_prefix}"})
+            debug(f"delay between {link.a} and {link.b} is {link.delay}")
+
+    install_ip(hosts, topo)
+
+
+    api = net.addHost(plan.api_host(), ip=plan.docker_ip(1))
+    root = Node( plan.root(), inNamespace=False )
+    intf = net.addLink( root, api ).intf1
+    root.setIP( plan.docker_ip(99), intf=intf )
+
+    # *** Setting up "api network"
+    ip_counter = 1
+    net.addLink(
+         api,switch,params1 = {'ip': f"{plan.api_ip(ip_counter)}/{plan.api_prefix}"},
+    )
+    ip_counter += 1
+    for host in relays:
             net.addLink(
-                 api,switch,params1 = {'ip': f"10.1.1.{ip_counter}/24"},
+                host, switch, params1 = {'ip': f"{plan.api_ip(ip_counter)}/{plan.api_prefix}"},
             )
             ip_counter += 1
-            for host in relays:
-                    net.addLink(
-                        host, switch, params1 = {'ip': f"10.1.1.{ip_counter}/24"},
-                    )
-                    ip_counter += 1
-
-            current_time = datetime.datetime.now().strftime("%m%d%H%M%S")
-
-            net.start()
-
-            if my_debug:
-                dumpNodeConnections(net.hosts)
-                info("pubs: " + str(pubs))
-                info("subs: " + str(subs))
-
-            template_for_relays = (
-                    'RUST_LOG=debug RUST_BACKTRACE=0 '
-                    './target/debug/moq-relay --bind \'{bind}\' --api {api} --node \'{node}\' '
-                    '--tls-cert ./dev/localhost.crt --tls-key ./dev/localhost.key '
-                    ' {tls_verify} --dev {origi} &'
-                )
-
-            origi_api_str = ""
-            if config['api'] == "origi":
-                origi_api_str = "--original"
-                api.cmd('REDIS=10.2.0.99 ./dev/api --bind [::]:4442 &')
-            else:
-                if config['api'] == "opti":
-                    api.cmd(f'cd ../cdn-optimization;{the_path.venv} TOPOFILE={topofile} python -m fastapi dev app/api.py --host 10.1.1.1 --port 4442 &')
-
-            # for some reason this is needed or the first relay wont reach the api
-            # (ffmpeg needs the 1s, gst can work with less)
-            sleep(4)
-
-
-            tls_verify_str = ""
-            if not forklift_certified:
-                tls_verify_str = "--tls-disable-verify"
-
-            host_counter = 1
-            for h in relays:
-                ip_address = f'10.3.0.{host_counter}'
-                debug(f'Starting relay on {h} - {ip_address}')
-
-                h.cmd(template_for_relays.format(
-                    host=h.name,
-                    bind=f'{ip_address}:4443',
-                    api=f'http://10.1.1.1:4442',
-                    node=f'https://{ip_address}:4443',
-                    tls_verify=tls_verify_str,
-                    origi=origi_api_str
-                ))
-                debug(template_for_relays.format(
-                    host=h.name,
-                    bind=f'{ip_address}:4443',
-                    api=f'http://10.1.1.1:4442',
-                    node=f'https://{ip_address}:4443',
-                    tls_verify=tls_verify_str,
-                    origi=origi_api_str
-                ))
-
-                host_counter += 1
-
-
-            # the two sleeps are needed at that specific line, bc other way they would start and the exact same time,
-            # and the pub wouldn't connect to the relay, and the sub couldn't connect to the pub
-            sleep(0.5)
-            k=0
-            def get_video_duration(file_path):
-                command = ['ffprobe', '-v', 'error', '-show_entries', 'format=duration', '-of', 'default=noprint_wrappers=1:nokey=1', file_path]
-                output = subprocess.check_output(command).decode().strip()
-                duration = float(output)
-                return duration
-
-            max_video_duration = 0
-            max_resolution = 300
-
-            for (h,track) in pubs:
-                vidi_filenammm = track.split("_")[1]
-                if config['mode'] == 'gst':
-
-                    track_duration = get_video_duration(f"./dev/{vidi_filenammm}.mp4")
-                    if track_duration > max_video_duration:
-                        max_video_duration = track_duration
-                else:
-                    if config['mode'] in ['clock', 'clockr']:
-                        try:
-                            max_video_duration = int(vidi_filenammm.split("-")[2])
-                        except:
-                            max_video_duration = 30
 
-                resolution = track.split("_")[1].split("-")[1]
-                if int(resolution) > max_resolution:
-                    max_resolution = int(resolution)
-                le_cmd = ""
 
-                if config['mode'] in ['clock', 'clockr']:
-                    le_cmd = (f'xterm -hold  -T "{h.name}-pub" -e bash -c "RUST_LOG=info ./target/debug/moq-clock --publish --namespace {track} https://{first_hop_relay[k][0]}:4443 {tls_verify_str}" &')
-                else:
-                    if config['mode'] == 'ffmpeg':
-                        le_cmd = (f'xterm -hold -T "{h.name}-pub" -e bash -c "ffmpeg -hide_banner -stream_loop -1 -re -i ./dev/{vidi_filenammm}.mp4 -c copy -an -f mp4 -movflags cmaf+separate_moof+delay_moov+skip_trailer+frag_every_frame - '
-                            f' | RUST_LOG=info ./target/debug/moq-pub --name {track} https://{first_hop_relay[k][0]}:4443 {tls_verify_str}" &')
-                    else:
-                        if config['mode'] == 'gst':
-                            holder = " "
-                            if my_debug:
-                                holder = " -hold "
-                            gst_shark_str = ""
-                            if gst_shark>0:
-                                gst_shark_str = 'export GST_DEBUG="GST_TRACER:7"; export GST_SHARK_CTF_DISABLE=TRUE; '
-                            if gst_shark == 1:
-                                gst_shark_str += 'export GST_TRACERS="proctime";'
-                            if gst_shark == 2:
-                                gst_shark_str += 'export GST_TRACERS="interlatency";'
-                            gst_tls_str = ""
-                            if not forklift_certified:
-                                gst_tls_str = "tls-disable-verify=true"
-
-                            le_cmd = f'xterm {holder} -T "{h.name}-pub" -e bash -c "export GST_PLUGIN_PATH="${{PWD}}/../moq-gst/target/debug${{GST_PLUGIN_PATH:+:$GST_PLUGIN_PATH}}:${{PWD}}/../6gxr-latency-clock"; {gst_shark_str} gst-launch-1.0 -q -v -e filesrc location="./dev/{vidi_filenammm}.mp4"  ! qtdemux name=before01 \
-                            before01.video_0 ! h264parse config-interval=-1 name=before02 ! avdec_h264 name=before03 ! videoconvert name=before2 ! timestampoverlay name=middle ! videoconvert name=after1 ! x264enc tune=zerolatency name=after2 ! h264parse name=after3 ! isofmp4mux chunk-duration=1 fragment-duration=1 name=after4 ! moqsink {gst_tls_str} url="https://{first_hop_relay[k][0]}:4443" namespace="{track}" 2> measurements/baseline_{track}_{current_time}_{h.name}.txt ; sleep 3 "&'
-
-                debug(f'issuing on {h} connecting to {first_hop_relay[k][0]}:\n {h} {le_cmd}')
-                # if not my_debug:
-                h.cmd(le_cmd)
-                sleep(the_path.wait_between_pubs)
-                k += 1
-
-            # if this is 1.5 or more it will cause problems
-            # around 0.7 needed
-            sleep(the_path.wait_after_pubs)
-
-
-            k=0
-            for (h,track) in subs:
-                filename = f"measurements/{track}_{current_time}_{h.name}"
-                errorfile1 = f"measurements/{track}_{current_time}_{h.name}_iferror"
-                errorfile2 = f"measurements/{track}_{current_time}_{h.name}_iferror2"
-                if config['mode'] in ['clock', 'clockr']:
-
-                    le_cmd = (f'xterm -hold  -T "{h.name}-sub-t" -e bash -c "RUST_LOG=info ./target/debug/moq-clock --namespace {track} https://{last_hop_relay[k][0]}:4443 {tls_verify_str} | tee {filename}.txt" &')
-                else:
-                    if config['mode'] == 'ffmpeg':
-                          le_cmd = (f'xterm -hold -T "{h.name}-sub-t" -e bash  -c "RUST_LOG=info RUST_BACKTRACE=1 ./target/debug/moq-sub --name {track} {tls_verify_str} https://{last_hop_relay[k][0]}:4443 '
-                      f' --tls-disable-verify | ffplay -window_title \'{h.name}sub\' -x 360 -y 200 - "&')
-                    else:
+    net.start()
 
-                        le_sink = "autovideosink"
-                        if not video_on:
-                            le_sink = "fakesink"
+    sampler = None
+    profiler = None
 
-                        le_cmd = f'xterm  -hold  -T "{h.name}-sub-t" -e bash  -c "export GST_PLUGIN_PATH="${{PWD}}/../moq-gst/target/debug${{GST_PLUGIN_PATH:+:$GST_PLUGIN_PATH}}:${{PWD}}/../6gxr-latency-clock"; export RUST_LOG=info; ./target/debug/moq-sub --name {track} {tls_verify_str} https://{last_hop_relay[k][0]}:4443 2> {errorfile1}.txt | GST_DEBUG=timeoverlayparse:4 gst-launch-1.0 --no-position filesrc location=/dev/stdin ! decodebin ! videoconvert ! timeoverlayparse ! videoconvert ! {le_sink} 2> {filename}.txt | tee {errorfile2}.txt" &'
+    def give_up():
+        # takes the whole trial down, but leaves no mess for the others
+        if sampler:
+            sampler.stop()
+        if profiler:
+            profiler.stop()
+        launcher.stop_all(sig=signal.SIGKILL)
+        launcher.wait(timeout=1)
+        stop_servers(plan, relays, config, 'KILL')
+        net.stop()
 
+    def stage(name, *probes, **kwargs):
+        try:
+            return seq.stage(name, *probes, **kwargs)
+        except StageTimeout:
+            give_up()
+            raise
 
-                if not my_debug:
-                    h.cmd(le_cmd)
+    if my_debug:
+        dumpNodeConnections(net.hosts)
+        info("pubs: " + str(pubs))
+        info("subs: " + str(subs))
+
+    template_for_relays = (
+            'RUST_LOG=debug RUST_BACKTRACE=0 '
+            './target/debug/moq-relay --bind \'{bind}\' --api {api} --node \'{node}\' '
+            '--tls-cert ./dev/localhost.crt --tls-key ./dev/localhost.key '
+            ' {tls_verify} --dev {origi} {trace} {metrics} &'
+        )
+
+    for rep, try_idx in enumerate(tries):
+        seq = Sequencer(stage_timeout)
+        if rep:
+            print(f"** Repetition {try_idx} of {topofile} on the same network")
+        current_time1 = datetime.datetime.now().strftime("%Y%m%d%H%M%S") + plan.tag
+
+
+
+        baseline_clk_str = ""
+        baseline_tls_str = ""
+        baseline_path_clk_str = ""
+        if config['mode'] in ['clock', 'clockr']:
+            baseline_clk_str = f"--{config['mode']}"
+            baseline_path_clk_str = "clocked_"
+        if forklift_certified:
+            baseline_tls_str = "--tls-verify"
+
+        baseline_path = os.path.join('measurements', f"assumed_{baseline_path_clk_str}baseline_{current_time1}.txt")
+        based_line = 0.0
+        base_track = config['first_hop_relay'][0]['track']
+        base_target = sample_target(config['mode'], base_samples)
+        stored_baseline = None
+        if not no_based_line:
+            stored_baseline = BaselineStore(ttl=base_ttl, target=base_target).lookup(baseline_key(base_track, config['mode'], forklift_certified, bool(clock_ns)))
+        if stored_baseline:
+            print(f"** Reusing the baseline of {base_track}: {stored_baseline['average']} from {stored_baseline['samples']} samples")
+            based_line = stored_baseline['average']
+            with open(baseline_path, 'w') as file:
+                file.write(str(based_line))
+        elif not no_based_line:
+            subprocess.call(['sudo', 'python', 'base_try.py', '--filename', f"{current_time1}",'--track', base_track, '--slot', str(slot), '--keep-cert', '--samples', str(base_target)] + ([baseline_clk_str] if baseline_clk_str else []) + ([baseline_tls_str] if baseline_tls_str else []) + (['--ns'] if clock_ns else []))
+            with open(baseline_path, 'r') as file:
+                baseline_content = file.read().strip()
+                based_line = float(baseline_content)
+        else:
+            print("** No baseline because debugging NO_BASE envvar")
+            based_line = 0.0
+            with open(baseline_path, 'w') as file:
+                file.write(str(based_line))
+
+
+
+        current_time = datetime.datetime.now().strftime("%m%d%H%M%S") + plan.tag
+        counters_before = {host.name: read_net_dev(host) for host in net.hosts}
+
+        origi_api_str = ""
+        if config['api'] == "origi":
+            origi_api_str = "--original"
+            api.cmd(f'{plan.redis_env()} ./dev/api --bind [::]:{plan.api_port} &')
+        else:
+            if config['api'] == "opti":
+                api.cmd(f'cd ../cdn-optimization;{the_path.venv} TOPOFILE={topofile} python -m fastapi dev app/api.py --host {plan.api_ip(1)} --port {plan.api_port} &')
+
+        # the first relay wont reach the api if it isn't listening yet
+        stage('api', tcp_listening(api, plan.api_port))
+
+
+        tls_verify_str = ""
+        if not forklift_certified:
+            tls_verify_str = "--tls-disable-verify"
+
+        host_counter = 1
+        for h in relays:
+            ip_address = plan.loopback(host_counter)
+            debug(f'Starting relay on {h} - {ip_address}')
+
+            h.cmd(template_for_relays.format(
+                host=h.name,
+                bind=f'{ip_address}:4443',
+                api=plan.api_url(),
+                node=f'https://{ip_address}:4443',
+                tls_verify=tls_verify_str,
+                origi=origi_api_str,
+                trace=f'--trace measurements/{current_time}_{h.name}_trace.csv' if hop_trace else '',
+                metrics='--metrics' if relay_metrics_ms > 0 else ''
+            ))
+            debug(template_for_relays.format(
+                host=h.name,
+                bind=f'{ip_address}:4443',
+                api=plan.api_url(),
+                node=f'https://{ip_address}:4443',
+                tls_verify=tls_verify_str,
+                origi=origi_api_str,
+                trace=f'--trace measurements/{current_time}_{h.name}_trace.csv' if hop_trace else '',
+                metrics='--metrics' if relay_metrics_ms > 0 else ''
+            ))
+
+            host_counter += 1
+
+
+        # the pubs and subs would fail to connect if they started before the relays listen
+        stage('relays', *[udp_listening(h, 4443) for h in relays])
+        # the relays' own counters, all of them scraped at once with a scraper in every relay's namespace
+        if relay_metrics_ms > 0:
+            for i, h in enumerate(relays, 1):
+                launcher.start(h, f'{h.name}-metrics', f"exec python3 relay_metrics.py --url https://{plan.loopback(i)}:4443/metrics --interval {relay_metrics_ms / 1000}",
+                               stdout=f"measurements/{current_time}_{h.name}_metrics.jsonl")
+        # the relays' counters over time, from before the first client to after the last one is gone
+        if net_sample_ms > 0:
+            sampler = NetSampler(relays, net_sample_ms / 1000).start()
+        # cpu and memory of the relays (below their hosts' shells) and of every client the launcher runs
+        if proc_sample_ms > 0:
+            profiler = ProcProfiler(lambda: dict({h.name: h.pid for h in relays}, **{name: client.pid for name, client in list(launcher.clients.items())}),
+                                    proc_sample_ms / 1000).start()
+        k=0
+        def get_video_duration(file_path):
+            command = ['ffprobe', '-v', 'error', '-show_entries', 'format=duration', '-of', 'default=noprint_wrappers=1:nokey=1', file_path]
+            output = subprocess.check_output(command).decode().strip()
+            duration = float(output)
+            return duration
+
+        max_video_duration = 0
+        max_resolution = 300
+
+        for (h,track) in pubs:
+            vidi_filenammm = track.split("_")[1]
+            if config['mode'] == 'gst':
 
-                debug(f'issuing on {h} connecting to {last_hop_relay[k][0]}:\n {h} {le_cmd}')
-                sleep(the_path.wait_between_subs)
-                k += 1
+                track_duration = get_video_duration(f"./dev/{vidi_filenammm}.mp4")
+                if track_duration > max_video_duration:
+                    max_video_duration = track_duration
+            else:
+                if config['mode'] in ['clock', 'clockr']:
+                    try:
+                        max_video_duration = int(vidi_filenammm.split("-")[2])
+                    except:
+                        max_video_duration = 30
 
-            sleep(1)
+            resolution = track.split("_")[1].split("-")[1]
+            if int(resolution) > max_resolution:
+                max_resolution = int(resolution)
+            le_cmd = ""
+            le_err = None
 
-            if video_on:
+            if config['mode'] in ['clock', 'clockr']:
+                le_cmd = f'RUST_LOG=info ./target/debug/moq-clock --publish --namespace {track} https://{first_hop_relay[k][0]}:4443 {tls_verify_str}'
+                if clock_ns:
+                    le_cmd += ' --ns'
+            else:
+                if config['mode'] == 'ffmpeg':
+                    le_cmd = (f'ffmpeg -hide_banner -stream_loop -1 -re -i ./dev/{vidi_filenammm}.mp4 -c copy -an -f mp4 -movflags cmaf+separate_moof+delay_moov+skip_trailer+frag_every_frame - '
+                        f' | RUST_LOG=info ./target/debug/moq-pub --name {track} https://{first_hop_relay[k][0]}:4443 {tls_verify_str}')
+                else:
+                    if config['mode'] == 'gst':
+                        gst_shark_str = ""
+                        if gst_shark>0:
+                            gst_shark_str = 'export GST_DEBUG="GST_TRACER:7"; export GST_SHARK_CTF_DISABLE=TRUE; '
+                        if gst_shark == 1:
+                            gst_shark_str += 'export GST_TRACERS="proctime";'
+                        if gst_shark == 2:
+                            gst_shark_str += 'export GST_TRACERS="interlatency";'
+                        gst_tls_str = ""
+                        if not forklift_certified:
+                            gst_tls_str = "tls-disable-verify=true"
+
+                        le_err = f"measurements/baseline_{track}_{current_time}_{h.name}.txt"
+                        le_cmd = f'export GST_PLUGIN_PATH="${{PWD}}/../moq-gst/target/debug${{GST_PLUGIN_PATH:+:$GST_PLUGIN_PATH}}:${{PWD}}/../6gxr-latency-clock"; {gst_shark_str} gst-launch-1.0 -q -v -e filesrc location="./dev/{vidi_filenammm}.mp4"  ! qtdemux name=before01 \
+                        before01.video_0 ! h264parse config-interval=-1 name=before02 ! avdec_h264 name=before03 ! videoconvert name=before2 ! timestampoverlay name=middle ! videoconvert name=after1 ! x264enc tune=zerolatency name=after2 ! h264parse name=after3 ! isofmp4mux chunk-duration=1 fragment-duration=1 name=after4 ! moqsink {gst_tls_str} url="https://{first_hop_relay[k][0]}:4443" namespace="{track}"'
+
+            debug(f'issuing on {h} connecting to {first_hop_relay[k][0]}:\n {h} {le_cmd}')
+            # if not my_debug:
+            launcher.start(h, f'{h.name}-pub', le_cmd, stderr=le_err)
+            # the next pub and the subs only go once the relay registered this track at the api
+            relayid = None if config['api'] == 'origi' else topo.pubs[k].relay
+            stage(f'announce-{h.name}', origin_announced(api, plan.api_url(), track, relayid))
+            k += 1
+
+        # from the api's namespace, so the trees show up as they change while the subs join and run
+        poll_file = f"measurements/{current_time}_api_polls.jsonl"
+        if config['api'] == 'opti':
+            launcher.start(api, f'{api.name}-poller', f"exec python3 api_poller.py --url {plan.api_url()} --tracks {','.join(track for (_, track) in pubs)} --interval {api_poll_ms / 1000}",
+                           stdout=poll_file)
+
+        k=0
+        for (h,track) in subs:
+            filename = f"measurements/{track}_{current_time}_{h.name}"
+            errorfile1 = f"measurements/{track}_{current_time}_{h.name}_iferror"
+            errorfile2 = f"measurements/{track}_{current_time}_{h.name}_iferror2"
+            le_out = None
+            le_err = None
+            if config['mode'] in ['clock', 'clockr']:
 
-                if config['mode'] == 'gst':
-                    sleep(2)
-                    try:
-                        output = subprocess.check_output(['xdotool', 'search', '--name', 'gst-launch'])
-                        process_ids = output.decode().split()
-                        for i, process_id in enumerate(process_ids):
-                            sleep(0.2)
-                            subprocess.call(['xdotool', 'windowmove', process_id, f'{i*max_resolution+50}', '0'])
-                    except subprocess.CalledProcessError:
-                            print("No windows found with the name 'gst-launch'")
+                le_cmd = f'RUST_LOG=info ./target/debug/moq-clock --namespace {track} https://{last_hop_relay[k][0]}:4443 {tls_verify_str}'
+                if h.name in virtual_subs:
+                    virtual, sessions = virtual_subs[h.name]
+                    le_cmd += f' --load {virtual} --sessions {sessions} --report {filename}_load.txt'
+                if clock_ns:
+                    le_cmd += ' --ns'
+                le_out = f"{filename}.txt"
+            else:
+                if config['mode'] == 'ffmpeg':
+                      le_cmd = (f'RUST_LOG=info RUST_BACKTRACE=1 ./target/debug/moq-sub --name {track} {tls_verify_str} https://{last_hop_relay[k][0]}:4443 '
+                  f' --tls-disable-verify | ffplay -window_title \'{h.name}sub\' -x 360 -y 200 - ')
                 else:
-                    if config['mode'] == 'ffmpeg':
-                        for i in range(len(subs)):
-                            sleep(0.2)
-                            subprocess.call(['xdotool', 'search', '--name', f'h{i}sub', 'windowmove', f'{i*max_resolution+50}', '0'])
+                    if h.name in virtual_subs:
+                        print(f"** {h.name} runs a single subscriber, virtual subscribers are only for clock mode")
 
+                    le_sink = "autovideosink"
+                    if not video_on:
+                        le_sink = "fakesink"
 
-            if all_gas_no_brakes and not my_debug:
-                sleep(max_video_duration+2)
-            else:
-                CLI( net )
-
-            sleep(5)
-
-            for (h,_) in subs:
-                if config['mode'] == 'gst':
-                    h.cmd('pkill -f -TERM  gst-launch')
-                h.cmd('pkill -f -TERM  xterm')
-
-            for (h,_) in pubs:
-                if config['mode'] == 'gst':
-                    h.cmd('pkill -f -TERM gst-launch')
-                h.cmd('pkill -f -TERM xterm')
-            sleep(1)
-
-
-
-            all_network_receive_bytes = 0
-            all_network_receive_packets = 0
-            all_network_transmit_bytes = 0
-            all_network_transmit_packets = 0
-            # Count the occurrences of each unique string in the subs list
-            number_of_subscribers = Counter(track for _, track in subs)
-
-            for host in net.hosts:
-                # TODO this now is be more optimal but should be checked
-                if host.name != 'h999':
-                    # we need to exec this, because otherwise all of the outputs after starting the host will be displayed for the following command
-                    host.cmd("echo clean")
-                    interfaces = host.cmd('ip -br a').strip().split('\n')
-                    interface_names = []
-                    for line in interfaces:
-                        parts = line.split()
-                        interface_name = parts[0].split('@')[0]
-                        ip_address = parts[2] if len(parts) > 2 else ''
-                        # we can do this because the connections between relays are on the 10.0.x.x network
-                        if '10.0.' in ip_address:
-                            interface_names.append(interface_name)
-                    net_dev_output = host.cmd('cat /proc/net/dev').strip().split('\n')
-                    with open(f"measurements/{current_time}_{host.name}_network.txt", 'w') as file:
-                        file.write('\n'.join(net_dev_output))
-                        file.write("\n")
-                        file.write('\n'.join(interfaces))
-
-                    # publisher side division for multiple subscribers
-                    # from the topo we change the divider at the publisher to the number of subscribers of that track
-                    # this because after the calc we will multiple by the link length which contains publisher relays
-                    # transmitting interfaces already as many times as many subscribers are.
-                    divider = 1
-                    if config['api'] == 'origi':
-                        for track, relay_host in pub_relays.items():
-                            if relay_host == host:
-                                divider = number_of_subscribers[track]
-                                break
-                    # we look for the interfaces which are choosen, and sum up only the 9th and 10th column, transmit bytes and packets
-                    for line in net_dev_output:
-                        if any(interface_name in line for interface_name in interface_names):
-                            stats = line.split(':')[1].split()
-                            # with our 720p test video around 726-900 bytes or around 20 packets of control info can happen on even inactive interfaces
-                            if int(stats[8]) > 1100 and int(stats[9]) > 50:
-                                all_network_transmit_bytes += (int(stats[8])/ divider)
-                                all_network_transmit_packets += (int(stats[9])/ divider)
-                                if divider != 1:
-                                   print(f"transmit: {int(stats[8])} / {divider} = {int(stats[8])/ divider}")
-
-
-
-            with open(f"measurements/{current_time}_api_network.txt", 'w') as file:
-                file.write(api.cmd('cat /proc/net/dev'))
-                file.write("\n")
-                file.write(api.cmd('ip -br a'))
-
-
-            sum_cost = {}
-            sum_underlay_length = {}
+                    # the timeoverlayparse lines are on gst's stderr, that is the measurement
+                    le_cmd = f'export GST_PLUGIN_PATH="${{PWD}}/../moq-gst/target/debug${{GST_PLUGIN_PATH:+:$GST_PLUGIN_PATH}}:${{PWD}}/../6gxr-latency-clock"; export RUST_LOG=info; ./target/debug/moq-sub --name {track} {tls_verify_str} https://{last_hop_relay[k][0]}:4443 2> {errorfile1}.txt | GST_DEBUG=timeoverlayparse:4 gst-launch-1.0 --no-position filesrc location=/dev/stdin ! decodebin ! videoconvert ! timeoverlayparse ! videoconvert ! {le_sink}'
+                    le_out = f"{errorfile2}.txt"
+                    le_err = f"{filename}.txt"
 
-            if config['mode'] in ['clock', 'clockr']:
-                for (h, track) in subs:
-
-                    file_path1 = f"measurements/{track}_{current_time}_{h.name}.txt"
-                    with open(file_path1, 'r') as file:
-                        output = file.read()
-                    file_path2 = f"measurements/{track}_{current_time}_{h.name}_clocked.txt"
-                    with open(file_path2, 'w') as file:
-                        # todo this does nothing
-                        counter2 = 0
-                        # we leave out the first 5 lines because regardless of the hw resources they are always around 1 second and so spoil the averages
-                        for line in output.splitlines():
-                            try:
-                                number = int(line.strip())
-                                if number<1000:
-                                    latency = number*1000000
-                                    file.write(f"{latency},{counter2}\n")
-                            except ValueError:
-                                continue
-
-            if config['api'] == 'origi':
-                for first_hop_relay in config['first_hop_relay']:
-                    first_hop_track = first_hop_relay['track']
-                    relevant_last_hop_relays = [item['relayid'] for item in config['last_hop_relay'] if item['track'] == first_hop_track]
-                    sum_cost[first_hop_relay['track']] = 0
-                    sum_underlay_length[first_hop_relay['track']] = 0
-                    for relayid in relevant_last_hop_relays:
-                        for edge in config['edges']:
-                            if (edge['node1'] == first_hop_relay['relayid'] and edge['node2'] == relayid) or \
-                               (edge['node1'] == relayid and edge['node2'] == first_hop_relay['relayid']):
-                                sum_cost[first_hop_relay['track']] += edge['attributes']['cost']
-                                sum_underlay_length[first_hop_relay['track']] += edge['attributes'].get('underlay_length', 1)
-                    all_network_receive_bytes = all_network_receive_bytes*sum_underlay_length[first_hop_relay['track']]
-                    all_network_receive_packets = all_network_receive_packets*sum_underlay_length[first_hop_relay['track']]
-                    all_network_transmit_bytes = all_network_transmit_bytes*sum_underlay_length[first_hop_relay['track']]
-                    all_network_transmit_packets = all_network_transmit_packets*sum_underlay_length[first_hop_relay['track']]
 
-            else:
-                number_of_used_links = 0
-                if config['api'] == 'opti':
-                    sum_cost = {}
-                    for first_hop_relay in config['first_hop_relay']:
-                        first_hop_track = first_hop_relay['track']
-                        sum_cost[first_hop_relay['track']] = 0
-                        api.cmd('echo clean')
-                        response = api.cmd(f'curl -s http://10.1.1.1:4442/tracks/{first_hop_track}/topology')
-                        response_lines = response.strip().split('\n')
-                        sanitized_response_lines = [line for line in response_lines if line.startswith('{')][0].strip('(venv)')
-                        if len(response_lines) > 1:
-                            response_json = json.loads(sanitized_response_lines)
-                            number_of_used_links=len(response_json.get('used_links', []))
-                            sum_cost[first_hop_relay['track']] += float(response_json.get('cost', 0))
+            if not my_debug:
+                launcher.start(h, f'{h.name}-sub-t', le_cmd, stdout=le_out, stderr=le_err)
 
+            debug(f'issuing on {h} connecting to {last_hop_relay[k][0]}:\n {h} {le_cmd}')
+            k += 1
 
+        # the measurement window starts once every subscriber got its first object
+        if config['mode'] in ['gst', 'clock', 'clockr'] and not my_debug:
+            stage('first-object', *[first_object(f"measurements/{track}_{current_time}_{h.name}.txt", config['mode']) for (h,track) in subs])
 
-            net.stop()
+        if video_on:
 
             if config['mode'] == 'gst':
+                sleep(2)
+                try:
+                    output = subprocess.check_output(['xdotool', 'search', '--name', 'gst-launch'])
+                    process_ids = output.decode().split()
+                    for i, process_id in enumerate(process_ids):
+                        sleep(0.2)
+                        subprocess.call(['xdotool', 'windowmove', process_id, f'{i*max_resolution+50}', '0'])
+                except subprocess.CalledProcessError:
+                        print("No windows found with the name 'gst-launch'")
+            else:
+                if config['mode'] == 'ffmpeg':
+                    for i in range(len(subs)):
+                        sleep(0.2)
+                        subprocess.call(['xdotool', 'search', '--name', f'h{i}sub', 'windowmove', f'{i*max_resolution+50}', '0'])
+
+
+        if all_gas_no_brakes and not my_debug and config['mode'] in ['gst', 'clock', 'clockr']:
+            # the same window as the old sleep, but it ends early when a subscriber stalls or the means converged
+            monitor = LiveMonitor({f"{track}/{h.name}": f"measurements/{track}_{current_time}_{h.name}.txt" for (h,track) in subs},
+                                  config['mode'], stall=live_stall, ci_ms=live_ci_ms, min_samples=live_min_samples,
+                                  max_ms=clock_max_ms)
+            try:
+                monitor.run(max_video_duration+2)
+            except TrialStalled:
+                give_up()
+                raise
+        elif all_gas_no_brakes and not my_debug:
+            sleep(max_video_duration+2)
+        else:
+            CLI( net )
+
+        # let the subscribers drain what is still in flight, up to the old 5s
+        try:
+            seq.stage('drain', QuietProbe([f"measurements/{track}_{current_time}_{h.name}.txt" for (h,track) in subs]), timeout=5)
+        except StageTimeout:
+            pass
+
+        for (h,_) in subs:
+            launcher.stop(f'{h.name}-sub-t')
+
+        for (h,_) in pubs:
+            launcher.stop(f'{h.name}-pub')
+        # the poller asks once more on its way out, that is the topology the cost is taken from
+        if config['api'] == 'opti':
+            launcher.stop(f'{api.name}-poller')
+        # like the poller, a last scrape on the way out has the final counters
+        for h in relays:
+            launcher.stop(f'{h.name}-metrics')
+        stage('teardown', *[launcher.exited(name) for name in launcher.clients])
+        launcher.wait()
+        if sampler:
+            print(f"** network samples in {sampler.stop().save(f'measurements/{current_time}_netdev.npz')}")
+            sampler = None
+        procs = []
+        if profiler:
+            print(f"** process profile in {profiler.stop().save(f'measurements/{current_time}_procs.txt')}")
+            procs = profiler.summarize()
+            profiler = None
+        relay_procs = [p for p in procs if p['comm'] == 'moq-relay']
+        relay_cpu_max = max([p['cpu_pct'] for p in relay_procs], default=0.0)
+        relay_rss_max = max([p['rss_max_mb'] for p in relay_procs], default=0.0)
+        client_cpu = {h.name: sum(p['cpu_pct'] for p in procs if p['label'] == f'{h.name}-sub-t') for (h,_) in subs}
+        # what the relays counted themselves, the fan-out per track adds up over all of them
+        relay_tracks = {}
+        api_lookups = None
+        if relay_metrics_ms > 0:
+            summaries = {h.name: summarize_metrics(f"measurements/{current_time}_{h.name}_metrics.jsonl") for h in relays
+                         if os.path.exists(f"measurements/{current_time}_{h.name}_metrics.jsonl")}
+            relay_tracks = fanout(summaries)
+            api_lookups = sum(summary['last'].get('moq_relay_api_lookups_total', 0) for summary in summaries.values())
+            text = metrics_report(summaries)
+            with open(f"measurements/{current_time}_relay_metrics.txt", 'w') as metrics_file:
+                metrics_file.write(text)
+            print(f"** relay metrics:\n{text}", end='')
+        print(f"** stages: {seq.summary()}")
+
+
+
+        all_network_receive_bytes = 0
+        all_network_receive_packets = 0
+        all_network_transmit_bytes = 0
+        all_network_transmit_packets = 0
+        # Count the occurrences of each unique string in the subs list
+        number_of_subscribers = Counter(track for _, track in subs)
+
+        for host in net.hosts:
+            # TODO this now is be more optimal but should be checked
+            if host != api:
+                # the network may have carried earlier repetitions, only what happened since our start counts
+                counters = delta(counters_before[host.name], read_net_dev(host))
+                interfaces = host.cmd('ip -br a').strip().split('\n')
+                interface_names = []
+                for line in interfaces:
+                    parts = line.split()
+                    interface_name = parts[0].split('@')[0]
+                    ip_address = parts[2] if len(parts) > 2 else ''
+                    if plan.is_relay_link(ip_address):
+                        interface_names.append(interface_name)
+                with open(f"measurements/{current_time}_{host.name}_network.txt", 'w') as file:
+                    file.write(format_net_dev(counters))
+                    file.write("\n")
+                    file.write('\n'.join(interfaces))
+
+                # publisher side division for multiple subscribers
+                # from the topo we change the divider at the publisher to the number of subscribers of that track
+                # this because after the calc we will multiple by the link length which contains publisher relays
+                # transmitting interfaces already as many times as many subscribers are.
+                divider = 1
+                if config['api'] == 'origi':
+                    for track, relay_host in pub_relays.items():
+                        if relay_host == host:
+                            divider = number_of_subscribers[track]
+                            break
+                # we look for the interfaces which are choosen, and sum up only the 9th and 10th column, transmit bytes and packets
+                for interface_name in interface_names:
+                    if interface_name in counters:
+                        stats = counters[interface_name]
+                        # with our 720p test video around 726-900 bytes or around 20 packets of control info can happen on even inactive interfaces
+                        if int(stats[8]) > 1100 and int(stats[9]) > 50:
+                            all_network_transmit_bytes += (int(stats[8])/ divider)
+                            all_network_transmit_packets += (int(stats[9])/ divider)
+                            if divider != 1:
+                               print(f"transmit: {int(stats[8])} / {divider} = {int(stats[8])/ divider}")
+
+
+
+        with open(f"measurements/{current_time}_api_network.txt", 'w') as file:
+            file.write(api.cmd('cat /proc/net/dev'))
+            file.write("\n")
+            file.write(api.cmd('ip -br a'))
+
+
+        sum_cost = {}
+        sum_underlay_length = {}
+        # only the opti api is polled, the others have no tree that changes
+        api_latency = {'mean': float('nan'), 'p99': float('nan')}
+        tree_changes = {}
+
+        if config['api'] == 'origi':
+            # hop, not first_hop_relay, that one is still needed by the next repetition
+            for hop in config['first_hop_relay']:
+                first_hop_track = hop['track']
+                relevant_last_hop_relays = [item['relayid'] for item in config['last_hop_relay'] if item['track'] == first_hop_track]
+                sum_cost[hop['track']] = 0
+                sum_underlay_length[hop['track']] = 0
+                for relayid in relevant_last_hop_relays:
+                    cost, underlay_length = topo.path_cost(hop['relayid'], relayid)
+                    sum_cost[hop['track']] += cost
+                    sum_underlay_length[hop['track']] += underlay_length
+                all_network_receive_bytes = all_network_receive_bytes*sum_underlay_length[hop['track']]
+                all_network_receive_packets = all_network_receive_packets*sum_underlay_length[hop['track']]
+                all_network_transmit_bytes = all_network_transmit_bytes*sum_underlay_length[hop['track']]
+                all_network_transmit_packets = all_network_transmit_packets*sum_underlay_length[hop['track']]
+
+        else:
+            number_of_used_links = 0
+            if config['api'] == 'opti':
+                sum_cost = {}
+                polls, api_latency = summarize_polls(poll_file)
+                print(f"** api answered in {api_latency['mean']:.1f}ms on average, p99 {api_latency['p99']:.1f}ms")
+                for hop in config['first_hop_relay']:
+                    first_hop_track = hop['track']
+                    sum_cost[hop['track']] = 0
+                    track_polls = polls.get(first_hop_track)
+                    if track_polls and track_polls['used_links'] is not None:
+                        number_of_used_links=len(track_polls['used_links'])
+                        sum_cost[hop['track']] += track_polls['cost']
+                        tree_changes[first_hop_track] = track_polls['changes']
+                        print(f"** {first_hop_track}: {number_of_used_links} used links, cost {track_polls['cost']}, "
+                              f"{track_polls['changes']} tree changes in {track_polls['polls']} polls, {track_polls['errors']} errors")
+
+
+        # the network stays, only the processes go
+        stop_servers(plan, relays, config)
+        stage('servers-down', *[no_process(pattern) for pattern in server_patterns(plan, relays, config)])
+
+        if hop_trace:
+            # the relays are gone, so their trace files are complete
+            traces = {h.name: load_trace(f"measurements/{current_time}_{h.name}_trace.csv") for h in relays
+                      if os.path.exists(f"measurements/{current_time}_{h.name}_trace.csv")}
+            hops = join_hops(traces)
+            save_hops(hops, f"measurements/{current_time}_hops.csv")
+            text = hop_report(hops, traces)
+            with open(f"measurements/{current_time}_hops.txt", 'w') as hops_file:
+                hops_file.write(text)
+            print(f"** per hop latencies:\n{text}", end='')
+
+        # one pass over every subscriber's output, the arrays are used for the statistics below
+        parsed = {}
+        if config['mode'] in ['gst', 'clock', 'clockr']:
+            for (h,track) in subs:
+                filename = f"measurements/{track}_{current_time}_{h.name}"
+                latencies, frame_ids = parse_latencies(f"{filename}.txt", config['mode'], max_ms=clock_max_ms)
+                save_latencies(filename, config['mode'], latencies, frame_ids, binary=lat_binary)
+                # the saved file keeps the warm-up, the statistics are over the steady state only
+                parsed[h.name] = steady(latencies, frame_ids) if trim_warmup else (latencies, frame_ids, 0)
+
+        # the load generators' latencies above are over all their subscriptions, the report has them one by one
+        # {host: (subscriptions without a single sample, the worst p99 of one subscription in ms)}
+        load_stats = {}
+        if config['mode'] in ['clock', 'clockr']:
+            for (h, track) in subs:
+                report_path = f"measurements/{track}_{current_time}_{h.name}_load.txt"
+                if h.name in virtual_subs and os.path.exists(report_path):
+                    report = parse_load_report(report_path)
+                    starved = sum(1 for row in report['subs'] if not row['samples'])
+                    worst = max([row['p99'] for row in report['subs'] if row['p99'] is not None], default=None)
+                    load_stats[h.name] = (starved, worst)
+                    print(f"** {h.name}: {report.get('connected', 0)} of {report.get('subscriptions', 0)} subscriptions connected, "
+                          f"{starved} got nothing, p99 {report['all']['p99'] if report['all'] else None} ms over all, worst p99 of one {worst} ms")
+
+        # the subscribers of a track joined on the frame-id, moq-clock only has one with --ns,
+        # a load host's subscriptions all print the same ids into one file
+        skews = {}
+        if config['mode'] == 'gst' or (config['mode'] in ['clock', 'clockr'] and clock_ns):
+            by_track = {}
+            for (h, track) in subs:
+                if h.name not in virtual_subs and len(parsed[h.name][0]):
+                    by_track.setdefault(track, {})[h.name] = parsed[h.name][:2]
+            skews = {track: skew(columns) for track, columns in by_track.items() if len(columns) > 1}
+            if skews:
+                text = skew_report(skews)
+                with open(f"measurements/{current_time}_skew.txt", 'w') as skew_file:
+                    skew_file.write(text)
+                print(f"** fan-out skew:\n{text}", end='')
+
+        if config['mode'] in ['gst','clock','clockr']:
+            # the gst publishers' tracer lines per element, what they add after the timestamp overlay is
+            # taken off the subscribers' averages below
+            tracer_baseline = {}
+            if config['mode'] == 'gst' and gst_shark > 0:
+                with open(f"measurements/{current_time}_tracer.txt", 'w') as tracer_file:
+                    for (h, track) in pubs:
+                        tracer = parse_tracer(f"measurements/baseline_{track}_{current_time}_{h.name}.txt")
+                        text = tracer_report(tracer)
+                        tracer_file.write(f"# {track} {h.name}\n{text}")
+                        print(f"** {track} {'proctime' if gst_shark == 1 else 'interlatency'} of {h.name}:\n{text}", end='')
+                        publisher = publisher_ns(tracer)
+                        if publisher is None:
+                            print(f"** no tracer lines from {h.name}, is gst-shark installed?")
+                        else:
+                            tracer_baseline[track] = publisher / 1e9
+
+            summing_current_time = datetime.datetime.now().strftime("%m%d%H")
+
+            with open(f"measurements/enddelays_{summing_current_time}.txt", 'a') as enddelays_file:
+                # parallel trials append to the same file, keep their blocks in one piece
+                fcntl.flock(enddelays_file, fcntl.LOCK_EX)
+                file_exists = os.fstat(enddelays_file.fileno()).st_size > 0
+                header = f"meas. time;track__host;topo;api;average of timestamps;deviation of timestamps;baseline;avarage-baseline;number of frames;ending time;sum cost for all subs on track;tx bytes for all;tx pckts for all;relay cpu max %;client cpu %;relay rss max MB;api ms;api p99 ms;tree changes;warm-up frames"
+                if not file_exists:
+                    enddelays_file.write(f"\n{header}")
+                    print(f"{header}")
+                clock_str=""
+                if config['mode'] in ['clock', 'clockr']:
+                    clock_str = f"-{config['mode']}"
+                enddelays_file.write(f"\n---")
+                print(f"{config['mode']}-{config['api']}-{topofile}")
+                above_baseline = []
+                # opened here and not before the fork, every parallel trial needs its own connection
+                results = ResultsStore(results_db) if results_db else None
                 for (h,track) in subs:
-                    filename = f"measurements/{track}_{current_time}_{h.name}"
-
-                    with open(f"{filename}.txt", 'r') as file:
-                                lines = file.readlines()
-                                csv_lines = ["Latency,Frame-id\n"]
-                                for line in lines:
-                                    latency_match = re.search(r'Latency: (\d+)', line)
-                                    frame_id_match = re.search(r'Frame-id: (\d+)', line)
-                                    if latency_match and frame_id_match:
-                                        latency = latency_match.group(1)
-                                        frame_id = frame_id_match.group(1)
-                                        csv_lines.append(f"{latency},{frame_id}\n")
-
-                    with open(f"{filename}_cleaned.txt", 'w') as file:
-                        file.writelines(csv_lines)
-
-            if config['mode'] in ['gst','clock','clockr']:
-                # todo this is not useable rightnow
-                if gst_shark>0:
-                    print("latest_files: ", latest_files)
-                    baseline_files = glob.glob(os.path.join(folder_path, 'baseline*'))
-                    baseline_file = max(baseline_files, key=os.path.getctime)
-                    print("baseline_file: ", baseline_file)
-                    if gst_shark==1:
-                        baseline=0
-                        with open(baseline_file, 'r') as file:
-                            for line in file:
-                                element_counts = {}
-                                element_sums = {}
-                                element_avarages={}
-                                for line in file:
-                                    match = re.search(r'element=\(string\)(\w+), time=\(string\)0:00:00.(\d+)', line)
-
+                    file_path = f"measurements/{track}_{current_time}_{h.name}"
+                    file_latencies, frame_ids, warmup = parsed[h.name]
+                    count = len(file_latencies)
+
+                    if count:
+                        average, distribution, median, percentile_99 = calculate_statistics(file_latencies)
+                        did_it_warn = False
+                        ending_time = None
+                        if config['mode'] == 'gst':
+                            error_filename = f"{file_path}_iferror.txt"
+                            with open(error_filename, 'r') as error_file:
+                                for line in error_file:
+                                    if 'WARN' in line:
+                                        did_it_warn = True
+                            error_filename2 = f"{file_path}_iferror2.txt"
+                            with open(error_filename2, 'r') as error_file2:
+                                for line2 in error_file2:
+                                    match = re.search(r'Execution ended after ([0-9:.]+)', line2)
                                     if match:
-                                        element = match.group(1)
-                                        if element in element_counts:
-                                            element_counts[element] += 1
-                                        else:
-                                            element_counts[element] = 1
-                                        time= int(match.group(2))
-                                        if element in element_sums:
-                                            element_sums[element] += time
-                                        else:
-                                            element_sums[element] = time
-
-                                for element, count in element_counts.items():
-                                    print(f"Element: {element}, Count: {count}, sum: {element_sums[element]}, av:{element_sums[element]/count}")
-                                    element_avarages[element]=element_sums[element]/count
-                            element_avarages.pop('middle')
-                            baselines = [value for key, value in element_avarages.items() if key.startswith('after')]
-                            baseline = sum(baselines)/1e9
-                    else:
-                        if gst_shark==2:
-                            baseline=0
-                            baseline_plus = []
-                            baseline_minus = []
-                            with open(baseline_file, 'r') as file:
-                                with open('test.txt', 'w') as test_file:
-                                    for line in file:
-                                        match = re.search(r'filesrc0_src, to_pad=\(string\)moqsink0_sink, time=\(string\)0:00:00\.(\d+);', line)
-                                        if match:
-                                            baseline_plus.append(int(match.group(1)))
-
-                                        match = re.search(r'filesrc0_src, to_pad=\(string\)middle_src, time=\(string\)0:00:00\.(\d+);', line)
-                                        if match:
-                                            baseline_minus.append(int(match.group(1)))
-
-                                baseline = (sum(baseline_plus) / len(baseline_plus)) / 1e9 - (sum(baseline_minus) / len(baseline_minus)) / 1e9
-
-
-                latencies = []
-
-
-
-                summing_current_time = datetime.datetime.now().strftime("%m%d%H")
-
-                file_exists = os.path.isfile(f"measurements/enddelays_{summing_current_time}.txt")
-
-                end_of_file_part = "cleaned"
-                if config['mode'] == 'gst':
-                    end_of_file_part = "cleaned"
-                else:
-                    if config['mode'] in ['clock', 'clockr']:
-                        end_of_file_part = "clocked"
-
-
-
-                with open(f"measurements/enddelays_{summing_current_time}.txt", 'a') as enddelays_file:
-                    header = f"meas. time;track__host;topo;api;average of timestamps;deviation of timestamps;baseline;avarage-baseline;number of frames;ending time;sum cost for all subs on track;tx bytes for all;tx pckts for all"
-                    if not file_exists:
-                        enddelays_file.write(f"\n{header}")
-                        print(f"{header}")
-                    clock_str=""
-                    if config['mode'] in ['clock', 'clockr']:
-                        clock_str = f"-{config['mode']}"
-                    enddelays_file.write(f"\n---")
-                    print(f"{config['mode']}-{config['api']}-{topofile}")
-                    for (h,track) in subs:
-                        file_path = f"measurements/{track}_{current_time}_{h.name}"
-                        with open(f"{file_path}_{end_of_file_part}.txt", 'r') as file:
-                            file_latencies = []
-                            count = 0
-                            last_frame = 1
-
-                            for line in file:
-                               latency = extract_latency(line)
-                               if latency is not None:
-                                   file_latencies.append(latency)
-                                   count += 1
-                                   last_frame = line.split(",")[1]
-
-                        if file_latencies:
-                            average, distribution, median, percentile_99 = calculate_statistics(file_latencies)
-                            did_it_warn = False
-                            ending_time = None
-                            if config['mode'] == 'gst':
-                                error_filename = f"{file_path}_iferror.txt"
-                                with open(error_filename, 'r') as error_file:
-                                    for line in error_file:
-                                        if 'WARN' in line:
-                                            did_it_warn = True
-                                error_filename2 = f"{file_path}_iferror2.txt"
-                                with open(error_filename2, 'r') as error_file2:
-                                    for line2 in error_file2:
-                                        match = re.search(r'Execution ended after ([0-9:.]+)', line2)
-                                        if match:
-                                            ending_time = match.group(1)
-                                            break
-                            else:
-                                ending_time = 0
-                                did_it_warn = 0
-                            file_name_parts = file_path.replace('measurements/', '').split('_')
-                            a = file_name_parts[-2]
-                            b = '_'.join(file_name_parts[:-2]) + '__' + file_name_parts[-1]
-                            actual_line = f"{a};{clock_str}{b};{topofile.replace('.yaml','')};{config['api']};{average};{distribution};{based_line};{average-based_line};{count};{ending_time};{sum_cost[track]};{all_network_transmit_bytes};{all_network_transmit_packets}"
-                            enddelays_file.write(f"\n{actual_line}")
-                            print(f"{actual_line}")
-                            if gst_shark == 2:
-                                enddelays_file.write(f">> subtracting average interlatency: {average-baseline}\n")
-                            if gst_shark == 1:
-                                enddelays_file.write(f">> subtracting average proctimes: {average-baseline}\n")
-                        if gst_shark == 2:
-                            print(f">> subtracting average interlatency: {average-baseline}")
-                        if gst_shark == 1:
-                            print(f">> subtracting average proctimes: {average-baseline}")
+                                        ending_time = match.group(1)
+                                        break
+                        else:
+                            ending_time = 0
+                            did_it_warn = 0
+                        file_name_parts = file_path.replace('measurements/', '').split('_')
+                        a = file_name_parts[-2]
+                        b = '_'.join(file_name_parts[:-2]) + '__' + file_name_parts[-1]
+                        actual_line = f"{a};{clock_str}{b};{topofile.replace('.yaml','')};{config['api']};{average};{distribution};{based_line};{average-based_line};{count};{ending_time};{sum_cost[track]};{all_network_transmit_bytes};{all_network_transmit_packets};{relay_cpu_max:.1f};{client_cpu[h.name]:.1f};{relay_rss_max:.1f};{api_latency['mean']:.1f};{api_latency['p99']:.1f};{tree_changes.get(track, '')};{warmup}"
+                        enddelays_file.write(f"\n{actual_line}")
+                        print(f"{actual_line}")
+                        above_baseline.append(average-based_line)
+                        if results:
+                            results.add_run(latency=file_latencies, frame=frame_ids,
+                                trial_time=current_time, topo=topofile.replace('.yaml',''), api=config['api'], mode=config['mode'],
+                                track=track, host=h.name, build_hash=build_hash(config['mode']), slot=slot,
+                                average=average, std=distribution, median=median, p99=percentile_99,
+                                baseline=based_line, above_baseline=average-based_line, frames=count, ending_time=str(ending_time),
+                                cost=sum_cost.get(track), tx_bytes=all_network_transmit_bytes, tx_packets=all_network_transmit_packets,
+                                relay_cpu_max=relay_cpu_max, client_cpu=client_cpu[h.name], relay_rss_max=relay_rss_max,
+                                api_ms=api_latency['mean'], api_p99_ms=api_latency['p99'], tree_changes=tree_changes.get(track),
+                                relay_objects_out=relay_tracks.get(track, {}).get('objects_out'), relay_bytes_out=relay_tracks.get(track, {}).get('bytes_out'),
+                                relay_queue_max=relay_tracks.get(track, {}).get('queue_max'), groups_dropped=relay_tracks.get(track, {}).get('groups_dropped'),
+                                api_lookups=api_lookups, virtual_subs=virtual_subs.get(h.name, (None, None))[0],
+                                starved_subs=load_stats.get(h.name, (None, None))[0], sub_p99_max=load_stats.get(h.name, (None, None))[1], warmup=warmup,
+                                skew_p99=skew_percentiles(skews[track]['spread'])[99] if track in skews else None,
+                                lost_frames=skews[track]['lost'].get(h.name) if track in skews else None)
+                        if track in tracer_baseline:
+                            tracer_line = f">> subtracting average {'proctimes' if gst_shark == 1 else 'interlatency'}: {average-tracer_baseline[track]}"
+                            enddelays_file.write(f"\n{tracer_line}")
+                            print(tracer_line)
+
+            if results:
+                results.close()
+
+            # the repetition's result for the adaptive mode, averaged over the subscribers
+            if on_result and above_baseline:
+                on_result(float(np.mean(above_baseline)))
+
+    net.stop()
+
+
+def run_adaptive(topo_idx, tries, slot=0):
+    # tries are the candidates, the convergence decides how many of them are run
+    convergence = Convergence(adaptive_width, adaptive_min, len(tries))
+    if reuse_net:
+        run_trial(topo_idx, convergence.tries(tries), slot, on_result=convergence.add)
+    else:
+        for try_idx in convergence.tries(tries):
+            try:
+                run_trial(topo_idx, [try_idx], slot, on_result=convergence.add)
+            except StageTimeout as e:
+                print(f"** test_set[{topo_idx}] try {try_idx} gave up: {e}")
+    print(f"** test_set[{topo_idx}] adaptive: {convergence}")
+    return convergence
+
+
+if __name__ == '__main__':
+
+    trial_target = run_trial
+    if adaptive_width:
+        # every configuration goes as one batch, run_adaptive picks how many of its tries run
+        batches = [(topo_idx, list(range(adaptive_max))) for topo_idx in range(len(test_set))]
+        trial_target = run_adaptive
+    elif reuse_net:
+        # one network per topology, the tries are repetitions on it
+        batches = [(topo_idx, list(range(num_of_tries))) for topo_idx in range(len(test_set))]
+    else:
+        batches = [(topo_idx, [try_idx]) for topo_idx in range(len(test_set)) for try_idx in range(num_of_tries)]
+
+    if parallel <= 1:
+        for topo_idx, tries in batches:
+            try:
+                trial_target(topo_idx, tries)
+            except StageTimeout as e:
+                print(f"** test_set[{topo_idx}] tries {tries} gave up: {e}")
+    else:
+        mop_up()
+        fold_binaries()
+        trials = []
+        max_relays = 0
+        for topo_idx, tries in batches:
+            config = load_config(test_set[topo_idx][0])
+            topo_mode = test_set[topo_idx][2] if len(test_set[topo_idx]) > 2 else mode
+            max_relays = max(max_relays, len(config['nodes']))
+            trials.append(Trial(topo_idx, tries, cores_needed(config, topo_mode)))
+        print("** Baking one cert for every slot")
+        plans = [AddressPlan(slot, p2p_prefix) for slot in range(min(parallel, MAX_SLOTS))]
+        bake_cert([ip for plan in plans for ip in plan.loopbacks(max_relays) + plan.baseline_ips()])
+        failed = run_parallel(trials, trial_target, parallel, core_budget)
+        if failed:
+            print(f"** {len(failed)} trials failed: {failed}")
 
 # Change ownership of all files in the measurements directory
 subprocess.call(['sudo', 'chown', '-R', f'{the_path.user}:{the_path.user}', 'measurements'])
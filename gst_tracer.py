@@ -0,0 +1,93 @@
+"""
+GstShark tracer output of the gst publishers, per element.
+
+With SHARK=1 the publisher runs with the proctime tracer, with SHARK=2 with
+interlatency, and GST_DEBUG="GST_TRACER:7" puts their lines on its stderr,
+which the launcher writes to measurements/baseline_<track>_<time>_<host>.txt:
+
+    ... proctime, element=(string)after2, time=(string)0:00:00.002411020;
+    ... interlatency, from_pad=(string)filesrc0_src, to_pad=(string)moqsink0_sink, time=(string)0:00:00.051234567;
+
+A file is read once in chunks and every value goes into an array of its
+element (proctime) or pad pair (interlatency), in ns. The elements of the
+publisher pipeline are named before0x (demux, parse, decode), middle (the
+timestamp overlay), after0x (encode, parse, mux) and moqsink, so what the
+publisher itself adds after the timestamp is written can be taken off the
+end to end latency, and the rest is network and relays.
+"""
+
+import re
+
+import numpy as np
+
+from latency import chunks
+
+TRACER_LINE = re.compile(
+    rb'(proctime|interlatency), (?:element=\(string\)([\w.-]+)|from_pad=\(string\)([\w.-]+), to_pad=\(string\)([\w.-]+)), '
+    rb'time=\(string\)(\d+):(\d+):(\d+)\.(\d+)')
+STAGES = ('before', 'middle', 'after', 'moqsink')
+
+
+def to_ns(hours, minutes, seconds, fraction):
+    # the fraction has as many digits as gst printed, usually nine
+    return ((int(hours) * 60 + int(minutes)) * 60 + int(seconds)) * 1000000000 + int(fraction.ljust(9, b'0')[:9])
+
+
+def parse_tracer(path):
+    """{'proctime': {element: ns array}, 'interlatency': {(from_pad, to_pad): ns array}}"""
+    values = {'proctime': {}, 'interlatency': {}}
+    for data in chunks(path):
+        for match in TRACER_LINE.finditer(data):
+            tracer, element, from_pad, to_pad = match.group(1, 2, 3, 4)
+            key = element.decode() if tracer == b'proctime' else (from_pad.decode(), to_pad.decode())
+            values[tracer.decode()].setdefault(key, []).append(to_ns(*match.group(5, 6, 7, 8)))
+    return {tracer: {key: np.array(times, dtype=np.int64) for key, times in found.items()}
+            for tracer, found in values.items()}
+
+
+def stage(name):
+    for prefix in STAGES:
+        if name.startswith(prefix):
+            return prefix
+    return 'other'
+
+
+def stats(times):
+    return {'count': len(times), 'mean': float(np.mean(times)), 'p99': float(np.percentile(times, 99))}
+
+
+def element_stats(tracer):
+    """Count, mean and p99 in ns per element and pad pair, and the proctime means summed per stage."""
+    rows = {}
+    for element, times in tracer['proctime'].items():
+        rows[('proctime', element)] = stats(times)
+    for pads, times in tracer['interlatency'].items():
+        rows[('interlatency', '->'.join(pads))] = stats(times)
+    stages = {}
+    for element, times in tracer['proctime'].items():
+        stages[stage(element)] = stages.get(stage(element), 0.0) + float(np.mean(times))
+    return rows, stages
+
+
+def publisher_ns(tracer):
+    """What the publisher adds after the timestamp overlay, the mean in ns, or None without tracer lines."""
+    if tracer['proctime']:
+        # the encoder and muxer, the overlay itself is before the timestamp is taken
+        after = [float(np.mean(times)) for element, times in tracer['proctime'].items() if stage(element) == 'after']
+        return sum(after) if after else None
+    to_sink = [times for (source, sink), times in tracer['interlatency'].items() if source.startswith('filesrc') and sink.startswith('moqsink')]
+    to_middle = [times for (source, sink), times in tracer['interlatency'].items() if source.startswith('filesrc') and sink.startswith('middle')]
+    if to_sink and to_middle:
+        # source to sink minus source to overlay, the overlay to sink part
+        return float(np.mean(to_sink[0])) - float(np.mean(to_middle[0]))
+    return None
+
+
+def report(tracer):
+    rows, stages = element_stats(tracer)
+    lines = ["tracer;element or pads;count;mean ms;p99 ms"]
+    for (kind, name), row in sorted(rows.items()):
+        lines.append(f"{kind};{name};{row['count']};{row['mean']/1e6:.3f};{row['p99']/1e6:.3f}")
+    for name, total in sorted(stages.items()):
+        lines.append(f"proctime stage;{name};;{total/1e6:.3f};")
+    return '\n'.join(lines) + '\n'
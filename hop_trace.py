@@ -0,0 +1,167 @@
+"""
+Per-hop latency of the objects, from the relays' --trace files.
+
+A relay started with --trace writes a csv line for every object it receives
+from upstream (recv), that one of its downstream subscriptions takes off the
+track (deq) and whose header it wrote to a downstream stream (send):
+
+    event,namespace,name,group,object,ns
+
+A namespace or name with a comma, quote or line break in it is quoted the
+csv way, with its quotes doubled, so csv.reader gets it back whole.
+
+The relays of a mininet share the host clock, so the files can be joined on
+(namespace, name, group, object). The relays don't know whom they received
+from, so the upstream of relay X for an object is the other relay whose send
+of it was the last one before X's recv, none means X got it from the
+publisher. Every such hop Y -> X is split into
+- queue: Y's deq - Y's recv, the object waiting in Y's track,
+- proc:  Y's send - Y's deq, framing and handing it to quic,
+- link:  X's recv - Y's send, the network between them,
+where deq and send are the last ones of Y before the matched send.
+"""
+
+import bisect
+import csv
+from collections import Counter, namedtuple
+
+import numpy as np
+
+Hop = namedtuple('Hop', ['namespace', 'name', 'group', 'object', 'upstream', 'relay', 'queue', 'proc', 'link'])
+
+
+def load_trace(path):
+    """{(namespace, name, group, object): [recv or None, sorted deqs, sorted sends]} of one relay."""
+    objects = {}
+    with open(path, 'r', newline='') as file:
+        # the last line of a killed relay may be cut anywhere, even in the middle of ns, only whole lines count,
+        # a quoted name with a line break spans two of them and is put back together by the reader
+        reader = csv.reader(line for line in file if line.endswith('\n'))
+        next(reader, None)
+        for row in reader:
+            if len(row) != 6:
+                continue
+            event, namespace, name, group, obj, ns = row
+            if event not in ('recv', 'deq', 'send'):
+                # skip lines are groups a subscription jumped over, no object to follow
+                continue
+            entry = objects.setdefault((namespace, name, int(group), int(obj)), [None, [], []])
+            ns = int(ns)
+            if event == 'recv':
+                entry[0] = ns if entry[0] is None else min(entry[0], ns)
+            elif event == 'deq':
+                entry[1].append(ns)
+            elif event == 'send':
+                entry[2].append(ns)
+    for entry in objects.values():
+        entry[1].sort()
+        entry[2].sort()
+    return objects
+
+
+def last_before(values, limit):
+    index = bisect.bisect_right(values, limit)
+    return values[index - 1] if index else None
+
+
+def join(traces):
+    """traces is {relay: load_trace(...)}, gives a Hop per object and relay that received it."""
+    hops = []
+    keys = set()
+    for objects in traces.values():
+        keys.update(objects)
+    for key in keys:
+        holders = {relay: objects[key] for relay, objects in traces.items() if key in objects}
+        for relay, (recv, _, _) in holders.items():
+            if recv is None:
+                continue
+            best = None
+            for upstream, (up_recv, deqs, sends) in holders.items():
+                if upstream == relay or up_recv is None or up_recv > recv:
+                    continue
+                send = last_before(sends, recv)
+                if send is not None and (best is None or send > best[1]):
+                    best = (upstream, send, up_recv, deqs)
+            if best is None:
+                hops.append(Hop(*key, None, relay, None, None, None))
+                continue
+            upstream, send, up_recv, deqs = best
+            deq = last_before(deqs, send)
+            queue = deq - up_recv if deq is not None else None
+            proc = send - deq if deq is not None else None
+            hops.append(Hop(*key, upstream, relay, queue, proc, recv - send))
+    hops.sort(key=lambda hop: (hop.namespace, hop.name, hop.group, hop.object, hop.relay))
+    return hops
+
+
+def relay_times(traces):
+    """{relay: (queue ns array, proc ns array)} over all its sends, the clients' subscriptions included."""
+    result = {}
+    for relay, objects in traces.items():
+        queue = []
+        proc = []
+        for recv, deqs, sends in objects.values():
+            if recv is None:
+                continue
+            for send in sends:
+                deq = last_before(deqs, send)
+                if deq is not None and deq >= recv:
+                    queue.append(deq - recv)
+                    proc.append(send - deq)
+        result[relay] = (np.array(queue, dtype=np.int64), np.array(proc, dtype=np.int64))
+    return result
+
+
+def chains(hops):
+    """{(namespace, relay): the most common chain of relays from the publisher's one to relay}"""
+    upstream = {(hop.namespace, hop.name, hop.group, hop.object, hop.relay): hop.upstream for hop in hops}
+    counted = {}
+    for hop in hops:
+        chain = [hop.relay]
+        key = (hop.namespace, hop.name, hop.group, hop.object)
+        while upstream.get(key + (chain[-1],)) is not None and len(chain) <= len(upstream):
+            chain.append(upstream[key + (chain[-1],)])
+            if chain[-1] in chain[:-1]:
+                break
+        counted.setdefault((hop.namespace, hop.relay), Counter())[tuple(reversed(chain))] += 1
+    return {key: counter.most_common(1)[0][0] for key, counter in counted.items()}
+
+
+def ms(values):
+    values = [v for v in values if v is not None]
+    if not values:
+        return "0;;;"
+    values = np.array(values) / 1e6
+    return f"{len(values)};{values.mean():.3f};{np.percentile(values, 50):.3f};{np.percentile(values, 99):.3f}"
+
+
+def report(hops, traces, names=None):
+    names = names or {}
+
+    def name(relay):
+        return names.get(relay, relay) if relay is not None else 'publisher'
+
+    lines = ["hop;part;count;mean ms;p50 ms;p99 ms"]
+    by_hop = {}
+    for hop in hops:
+        if hop.upstream is not None:
+            by_hop.setdefault((hop.upstream, hop.relay), []).append(hop)
+    for (upstream, relay), group in sorted(by_hop.items()):
+        for part in ('queue', 'proc', 'link'):
+            lines.append(f"{name(upstream)}->{name(relay)};{part};{ms([getattr(hop, part) for hop in group])}")
+    for relay, (queue, proc) in sorted(relay_times(traces).items()):
+        lines.append(f"{name(relay)} all sends;queue;{ms(list(queue))}")
+        lines.append(f"{name(relay)} all sends;proc;{ms(list(proc))}")
+    for (namespace, relay), chain in sorted(chains(hops).items()):
+        lines.append(f"# {namespace} at {name(relay)}: {' -> '.join(name(r) for r in chain)}")
+    return '\n'.join(lines) + '\n'
+
+
+def save(hops, path, names=None):
+    names = names or {}
+    with open(path, 'w', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(Hop._fields)
+        for hop in hops:
+            writer.writerow(hop._replace(upstream=names.get(hop.upstream, hop.upstream), relay=names.get(hop.relay, hop.relay)))
+    return path
@@ -0,0 +1,197 @@
+"""
+Parsing of the subscriber outputs into latency and frame-id arrays.
+
+The gst subscribers log lines with "Latency: <ns>" and "Frame-id: <n>" on
+gst's stderr, the moq-clock subscribers print one latency in ms per line, or
+with --ns a line per object with its ids and send and receive time in ns:
+
+    ns group=28 object=14 sent=1718000000123456789 recv=1718000000125456789 start=1718000000000000000
+
+The namespaces of a mininet share the host clock, so recv - sent is the one
+way latency to the ns. The objects sent before the subscription started are
+the backlog of the group it joined, those are left out instead of cutting
+everything above a second like the ms lines need.
+Both used to be rewritten into _cleaned.txt / _clocked.txt csv files line
+by line and then read back line by line again. Here a file is read once in
+big chunks, the lines are found with precompiled patterns and the values go
+straight into numpy arrays. The csv files are still written for the tools
+that read them, or a compact .npz instead of them.
+
+A moq-clock load generator (--load N) prints the latencies of all its
+subscriptions like one subscriber and writes a report with a line per
+subscription next to it, parse_load_report() reads that one.
+"""
+
+import os
+import re
+
+import numpy as np
+
+CHUNK = 4 << 20
+
+# the whole line with its latency, the frame-id is looked up in that line only
+GST_LINE = re.compile(rb'[^\n]*Latency: (\d+)[^\n]*')
+GST_FRAME = re.compile(rb'Frame-id: (\d+)')
+CLOCK_LINE = re.compile(rb'^\s*(-?\d+)\s*$', re.MULTILINE)
+CLOCK_NS_LINE = re.compile(rb'^ns group=(\d+) object=(\d+) sent=(\d+) recv=(\d+) start=(\d+)\s*$', re.MULTILINE)
+# a clock sample of either kind, for counting them
+CLOCK_ANY_LINE = re.compile(rb'^\s*(?:-?\d+|ns group=[^\n]*)\s*$', re.MULTILINE)
+# the frame-id of a --ns line, a clock group has an object per second
+OBJECTS_PER_GROUP = 1000
+
+
+class Columns:
+    """Preallocated latency and frame-id columns, doubled when they run full."""
+
+    def __init__(self, capacity):
+        self.latency = np.empty(max(capacity, 1024), dtype=np.int64)
+        self.frame = np.empty(max(capacity, 1024), dtype=np.int64)
+        self.size = 0
+
+    def extend(self, latency, frame):
+        # a whole chunk at once, numpy copies the lists in one go
+        end = self.size + len(latency)
+        if end > len(self.latency):
+            capacity = max(end, 2 * len(self.latency))
+            self.latency = np.resize(self.latency, capacity)
+            self.frame = np.resize(self.frame, capacity)
+        self.latency[self.size:end] = latency
+        self.frame[self.size:end] = frame
+        self.size = end
+
+    def arrays(self):
+        return self.latency[:self.size].copy(), self.frame[:self.size].copy()
+
+
+def chunks(path):
+    # complete lines only, the rest of a chunk goes in front of the next one
+    rest = b''
+    with open(path, 'rb') as file:
+        while True:
+            chunk = file.read(CHUNK)
+            if not chunk:
+                break
+            data = rest + chunk
+            cut = data.rfind(b'\n') + 1
+            rest = data[cut:]
+            if cut:
+                yield data[:cut]
+    if rest:
+        yield rest + b'\n'
+
+
+def parse_gst(path, require_frame=True):
+    columns = Columns(os.path.getsize(path) // 128)
+    for data in chunks(path):
+        latency = []
+        frame = []
+        for match in GST_LINE.finditer(data):
+            frame_id = GST_FRAME.search(match.group(0))
+            if frame_id is None and require_frame:
+                continue
+            latency.append(int(match.group(1)))
+            frame.append(int(frame_id.group(1)) if frame_id else -1)
+        columns.extend(latency, frame)
+    return columns.arrays()
+
+
+def clock_ns(data):
+    """(latency ns, frame-id) lists of the --ns lines in data, without the backlog objects."""
+    latency = []
+    frame = []
+    for group, obj, sent, recv, start in CLOCK_NS_LINE.findall(data):
+        sent = int(sent)
+        if sent < int(start):
+            continue
+        latency.append(int(recv) - sent)
+        frame.append(int(group) * OBJECTS_PER_GROUP + int(obj))
+    return latency, frame
+
+
+def is_clock_ns(path):
+    with open(path, 'rb') as file:
+        return CLOCK_NS_LINE.search(file.read(1 << 16)) is not None
+
+
+def parse_clock_ns(path):
+    columns = Columns(os.path.getsize(path) // 96)
+    for data in chunks(path):
+        columns.extend(*clock_ns(data))
+    return columns.arrays()
+
+
+def parse_clock(path, max_ms=1000):
+    # ms per line, the first ones are around a second no matter what and are cut off with max_ms
+    if is_clock_ns(path):
+        return parse_clock_ns(path)
+    columns = Columns(os.path.getsize(path) // 4)
+    for data in chunks(path):
+        numbers = np.array(CLOCK_LINE.findall(data), dtype=np.int64)
+        if max_ms is not None:
+            numbers = numbers[numbers < max_ms]
+        # the sample number is the frame-id, moq-clock doesn't print one
+        columns.extend(numbers * 1000000, np.arange(columns.size, columns.size + len(numbers)))
+    return columns.arrays()
+
+
+def parse_load_report(path):
+    """{'subscriptions', 'sessions', 'connected', 'failed', 'subs': [row], 'all': row, 'buckets': [label]}
+
+    A row has sub, session, samples, mean, p50, p99, max (ms, None without samples) and the histogram counts."""
+    report = {'subs': [], 'all': None, 'buckets': []}
+    with open(path, 'r') as file:
+        for line in file:
+            line = line.strip()
+            if line.startswith('#'):
+                report.update({key: int(value) for key, value in (field.split('=') for field in line[1:].split())})
+                continue
+            fields = line.split(';')
+            if fields[0] == 'sub':
+                report['buckets'] = fields[7:]
+                continue
+            if len(fields) < 7:
+                continue
+            row = {'sub': fields[0], 'session': fields[1], 'samples': int(fields[2]),
+                   'histogram': [int(count) for count in fields[7:]]}
+            for key, value in zip(['mean', 'p50', 'p99', 'max'], fields[3:7]):
+                row[key] = float(value) if value else None
+            if row['sub'] == 'all':
+                report['all'] = row
+            else:
+                report['subs'].append(row)
+    return report
+
+
+def parse_latencies(path, mode, max_ms=1000):
+    if mode == 'gst':
+        return parse_gst(path)
+    return parse_clock(path, max_ms)
+
+
+def text_suffix(mode):
+    return 'cleaned' if mode == 'gst' else 'clocked'
+
+
+def save_latencies(base, mode, latency, frame, binary=False):
+    """Writes base_cleaned.txt / base_clocked.txt like before, or base_latency.npz with binary."""
+    if binary:
+        path = f"{base}_latency.npz"
+        np.savez(path, latency=latency, frame=frame)
+        return path
+    path = f"{base}_{text_suffix(mode)}.txt"
+    with open(path, 'w') as file:
+        if mode == 'gst':
+            file.write("Latency,Frame-id\n")
+        file.write(''.join(f"{value},{frame_id}\n" for value, frame_id in zip(latency.tolist(), frame.tolist())))
+    return path
+
+
+def load_latencies(base, mode):
+    if os.path.exists(f"{base}_latency.npz"):
+        with np.load(f"{base}_latency.npz") as data:
+            return data['latency'], data['frame']
+    path = f"{base}_{text_suffix(mode)}.txt"
+    table = np.loadtxt(path, delimiter=',', dtype=np.int64, skiprows=1 if mode == 'gst' else 0, ndmin=2)
+    if table.size == 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    return table[:, 0], table[:, 1]
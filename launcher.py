@@ -0,0 +1,160 @@
+"""
+Starts the pubs, subs and baseline clients without xterm.
+
+A client is a bash -c pipeline run with host.popen, so it lives in the
+host's namespace in a session of its own (mnexec -d) and the whole pipeline
+can be killed through its process group, without touching the clients of
+other trials. stdout and stderr come back through pipes which one thread
+reads non-blocking and writes to the measurement files the old `| tee` and
+`2>` redirections wrote to. Output without a file keeps its last lines in
+memory, they are printed if the client died with an error.
+
+With view=True every client also gets an xterm tailing its output, for
+debugging only, the clients don't depend on it.
+"""
+
+import os
+import selectors
+import signal
+import subprocess
+import tempfile
+import threading
+from collections import deque
+from time import monotonic, sleep
+
+from readiness import Probe
+
+TAIL_LINES = 50
+# what mop_up kills and the cleanup stage waits for, the [t] keeps pgrep/pkill from matching sudo's command line
+CLIENT_PATTERN = '[t]arget/debug/moq-(clock|pub|sub) '
+
+
+class Client:
+    def __init__(self, name, host, process):
+        self.name = name
+        self.host = host
+        self.process = process
+        self.pid = process.pid
+        self.tail = deque(maxlen=TAIL_LINES)
+        self.files = []
+        self.viewer = None
+        # pipes not at eof yet, the last output may still be on its way to the files
+        self.open_pipes = 2
+
+    def alive(self):
+        return self.process.poll() is None
+
+    def __repr__(self):
+        return f"{self.name}[{self.pid}]"
+
+
+class Launcher:
+    def __init__(self, view=False, log=print):
+        self.view = view
+        self.log = log
+        self.clients = {}
+        self.selector = selectors.DefaultSelector()
+        self.lock = threading.Lock()
+        self.pump = None
+
+    def start(self, host, name, script, stdout=None, stderr=None, env=None):
+        """Runs script with bash in host's namespace, stdout and stderr go to the given files."""
+        if name in self.clients and self.clients[name].alive():
+            raise RuntimeError(f"{name} is already running")
+        full_env = None
+        if env:
+            full_env = os.environ.copy()
+            full_env.update(env)
+        process = host.popen(['bash', '-c', script], stdin=subprocess.DEVNULL,
+                             stdout=subprocess.PIPE, stderr=subprocess.PIPE, env=full_env)
+        client = Client(name, host, process)
+        for pipe, path in ((process.stdout, stdout), (process.stderr, stderr)):
+            if path is None and self.view:
+                # the xterm needs something to tail
+                with tempfile.NamedTemporaryFile(prefix=f'{name}-', suffix='.log', delete=False) as file:
+                    path = file.name
+            sink = open(path, 'ab') if path else None
+            if path:
+                client.files.append(path)
+            os.set_blocking(pipe.fileno(), False)
+            with self.lock:
+                self.selector.register(pipe, selectors.EVENT_READ, (client, sink))
+        if self.view and client.files:
+            client.viewer = subprocess.Popen(['xterm', '-T', name, '-e', 'tail', '-F'] + client.files,
+                                             stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        self.clients[name] = client
+        self._ensure_pump()
+        return client
+
+    def _ensure_pump(self):
+        if self.pump is None or not self.pump.is_alive():
+            self.pump = threading.Thread(target=self._run_pump, name='launcher-pump', daemon=True)
+            self.pump.start()
+
+    def _run_pump(self):
+        while True:
+            with self.lock:
+                if not self.selector.get_map():
+                    self.pump = None
+                    return
+            for key, _ in self.selector.select(timeout=0.2):
+                self._read(key)
+
+    def _read(self, key):
+        client, sink = key.data
+        try:
+            chunk = os.read(key.fd, 65536)
+        except BlockingIOError:
+            return
+        if not chunk:
+            with self.lock:
+                self.selector.unregister(key.fileobj)
+            key.fileobj.close()
+            if sink:
+                sink.close()
+            client.open_pipes -= 1
+            return
+        if sink:
+            # flushed right away, the readiness probes watch these files grow
+            sink.write(chunk)
+            sink.flush()
+        else:
+            client.tail.extend(chunk.decode(errors='replace').splitlines())
+
+    def stop(self, name, sig=signal.SIGTERM):
+        client = self.clients.get(name)
+        if client is None:
+            return
+        if client.alive():
+            try:
+                # the pipeline is the process group of its session
+                os.killpg(client.pid, sig)
+            except ProcessLookupError:
+                pass
+        if client.viewer and client.viewer.poll() is None:
+            client.viewer.terminate()
+
+    def stop_all(self, prefix='', sig=signal.SIGTERM):
+        for name in list(self.clients):
+            if name.startswith(prefix):
+                self.stop(name, sig)
+
+    def exited(self, name):
+        client = self.clients[name]
+        return Probe(f"{client} exited", lambda: not client.alive())
+
+    def wait(self, prefix='', timeout=5.0):
+        """Reaps the stopped clients, reports the ones which died with an error."""
+        deadline = monotonic() + timeout
+        for name, client in list(self.clients.items()):
+            if not name.startswith(prefix):
+                continue
+            while (client.alive() or client.open_pipes) and monotonic() < deadline:
+                sleep(0.05)
+            code = client.process.poll()
+            if code is None:
+                continue
+            # killed by us is fine, anything else is worth a look
+            if code not in (0, -signal.SIGTERM, -signal.SIGKILL, 128 + signal.SIGTERM, 128 + signal.SIGKILL) and client.tail:
+                self.log(f"** {client} exited with {code}:\n" + '\n'.join(client.tail))
+            del self.clients[name]
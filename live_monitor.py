@@ -0,0 +1,220 @@
+"""
+Watches the subscribers while a trial runs.
+
+good-try.py used to sleep for the length of the video and only look at the
+outputs afterwards, so a subscriber that stopped receiving after its first
+object still cost the whole run. The monitor tails every subscriber's file
+with asyncio and keeps a running mean and standard deviation (Welford) and
+P^2 estimates of the median and the 99th percentile per track and host.
+
+The run ends
+- after the given duration, like the sleep did,
+- as soon as a subscriber got nothing for `stall` seconds, with TrialStalled,
+- or, with ci_ms, once every subscriber has min_samples and the 95% confidence
+  interval of its mean latency is narrower than +-ci_ms.
+"""
+
+import asyncio
+import math
+import os
+from time import monotonic
+
+import numpy as np
+
+from latency import CLOCK_LINE, GST_FRAME, GST_LINE, clock_ns
+from readiness import StageTimeout
+
+Z95 = 1.96
+
+
+class TrialStalled(StageTimeout):
+    pass
+
+
+class P2Quantile:
+    """The P^2 estimate of one quantile (Jain and Chlamtac), five markers and no stored samples."""
+
+    def __init__(self, p):
+        self.p = p
+        self.heights = []
+        self.positions = [1, 2, 3, 4, 5]
+        self.desired = [1, 1 + 2 * p, 1 + 4 * p, 3 + 2 * p, 5]
+        self.increments = [0, p / 2, p, (1 + p) / 2, 1]
+
+    def add(self, x):
+        heights = self.heights
+        if len(heights) < 5:
+            heights.append(x)
+            heights.sort()
+            return
+        if x < heights[0]:
+            heights[0] = x
+            k = 0
+        elif x >= heights[4]:
+            heights[4] = x
+            k = 3
+        else:
+            k = 0
+            while x >= heights[k + 1]:
+                k += 1
+        for i in range(k + 1, 5):
+            self.positions[i] += 1
+        for i in range(5):
+            self.desired[i] += self.increments[i]
+        for i in range(1, 4):
+            d = self.desired[i] - self.positions[i]
+            if (d >= 1 and self.positions[i + 1] - self.positions[i] > 1) or \
+               (d <= -1 and self.positions[i - 1] - self.positions[i] < -1):
+                d = 1 if d > 0 else -1
+                height = self._parabolic(i, d)
+                if not heights[i - 1] < height < heights[i + 1]:
+                    height = self._linear(i, d)
+                heights[i] = height
+                self.positions[i] += d
+
+    def _parabolic(self, i, d):
+        q, n = self.heights, self.positions
+        return q[i] + d / (n[i + 1] - n[i - 1]) * (
+            (n[i] - n[i - 1] + d) * (q[i + 1] - q[i]) / (n[i + 1] - n[i]) +
+            (n[i + 1] - n[i] - d) * (q[i] - q[i - 1]) / (n[i] - n[i - 1]))
+
+    def _linear(self, i, d):
+        q, n = self.heights, self.positions
+        return q[i] + d * (q[i + d] - q[i]) / (n[i + d] - n[i])
+
+    def value(self):
+        if not self.heights:
+            return math.nan
+        if len(self.heights) < 5:
+            # too few for the markers, the exact quantile of what is there
+            return float(np.percentile(self.heights, 100 * self.p))
+        return self.heights[2]
+
+
+class RunningStats:
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.median = P2Quantile(0.5)
+        self.p99 = P2Quantile(0.99)
+
+    def add(self, x):
+        self.count += 1
+        delta = x - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (x - self.mean)
+        self.median.add(x)
+        self.p99.add(x)
+
+    def std(self):
+        return math.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else math.nan
+
+    def ci_half_width(self):
+        return Z95 * self.std() / math.sqrt(self.count) if self.count > 1 else math.inf
+
+    def __str__(self):
+        # latencies are in ns, shown in ms
+        return (f"n={self.count} mean={self.mean/1e6:.2f}ms std={self.std()/1e6:.2f}ms "
+                f"p50={self.median.value()/1e6:.2f}ms p99={self.p99.value()/1e6:.2f}ms "
+                f"ci95=+-{self.ci_half_width()/1e6:.2f}ms")
+
+
+class Tail:
+    """The latencies of one subscriber file, read as it grows."""
+
+    def __init__(self, path, mode, max_ms=1000):
+        self.path = path
+        self.mode = mode
+        self.max_ms = max_ms
+        self.offset = 0
+        self.rest = b''
+        self.stats = RunningStats()
+        self.last_sample = monotonic()
+
+    def read(self):
+        if not os.path.exists(self.path):
+            return 0
+        with open(self.path, 'rb') as file:
+            file.seek(self.offset)
+            chunk = file.read()
+        self.offset += len(chunk)
+        data = self.rest + chunk
+        cut = data.rfind(b'\n') + 1
+        self.rest = data[cut:]
+        data = data[:cut]
+        found = 0
+        if self.mode == 'gst':
+            for match in GST_LINE.finditer(data):
+                if GST_FRAME.search(match.group(0)):
+                    self.stats.add(int(match.group(1)))
+                    found += 1
+        else:
+            # the --ns lines have no cut off, the backlog of the group is left out instead
+            latency, _ = clock_ns(data)
+            for value in latency:
+                self.stats.add(value)
+            found += len(latency)
+            for number in CLOCK_LINE.findall(data):
+                number = int(number)
+                if self.max_ms is None or number < self.max_ms:
+                    self.stats.add(number * 1000000)
+                    found += 1
+        if found:
+            self.last_sample = monotonic()
+        return found
+
+
+class LiveMonitor:
+    def __init__(self, files, mode, stall=10.0, ci_ms=0.0, min_samples=100, poll=0.25, log=print, max_ms=1000):
+        # files maps a name (track/host) to the subscriber's output file,
+        # max_ms is the cut off of the ms clock lines, the same as the parse after the run
+        self.tails = {name: Tail(path, mode, max_ms) for name, path in files.items()}
+        self.stall = stall
+        self.ci_ms = ci_ms
+        self.min_samples = min_samples
+        self.poll = poll
+        self.log = log
+        self.outcome = None
+
+    async def _tail(self, name, tail, done):
+        while not done.is_set():
+            tail.read()
+            if self.stall and monotonic() - tail.last_sample > self.stall:
+                self.outcome = f"stalled: {name} got nothing for {self.stall:g}s"
+                done.set()
+                return
+            await asyncio.sleep(self.poll)
+
+    async def _converged(self, done):
+        while not done.is_set():
+            await asyncio.sleep(self.poll)
+            if all(t.stats.count >= self.min_samples and t.stats.ci_half_width() <= self.ci_ms * 1e6
+                   for t in self.tails.values()):
+                self.outcome = f"converged: every ci95 is within +-{self.ci_ms}ms"
+                done.set()
+
+    async def _watch(self, duration):
+        done = asyncio.Event()
+        for tail in self.tails.values():
+            tail.last_sample = monotonic()
+        tasks = [asyncio.create_task(self._tail(name, tail, done)) for name, tail in self.tails.items()]
+        if self.ci_ms > 0:
+            tasks.append(asyncio.create_task(self._converged(done)))
+        try:
+            await asyncio.wait_for(done.wait(), timeout=duration)
+        except asyncio.TimeoutError:
+            self.outcome = f"duration: {duration:.0f}s passed"
+            done.set()
+        await asyncio.gather(*tasks)
+
+    def run(self, duration):
+        """Blocks for at most duration seconds, raises TrialStalled when a subscriber stalls."""
+        start = monotonic()
+        asyncio.run(self._watch(duration))
+        self.log(f"** live monitor ended after {monotonic() - start:.1f}s, {self.outcome}")
+        for name, tail in self.tails.items():
+            self.log(f"** live {name}: {tail.stats}")
+        if self.outcome.startswith('stalled'):
+            raise TrialStalled(self.outcome)
+        return self.outcome
@@ -20,7 +20,12 @@ impl Client {
 		let parts:Vec<&str> = node.host_str().unwrap().split('.').collect();
 
 		if parts.len() == 4 && !original {
-			Self { url: url.clone(), client, relayid:parts[3].to_string() , original }
+			// the relay id is the last two octets of the loopback, 10.3.1.2 is relay 258
+			let relayid = match (parts[2].parse::<u32>(), parts[3].parse::<u32>()) {
+				(Ok(third), Ok(fourth)) => (third * 256 + fourth).to_string(),
+				_ => parts[3].to_string(),
+			};
+			Self { url: url.clone(), client, relayid , original }
 		} else {
 			log::info!("The hostname is not an IPv4 address. The specified API will not work.");
 			if original {
@@ -178,9 +178,18 @@ async fn set_origin2(
     }
 
 	//for docker reasons right now we have to provide the hostname also
+	// the loopbacks are in the /16 of the origin's, relay id k is at .(k/256).(k%256)
+	let network = origin.url.host_str()
+		.map(|host| host.split('.').take(2).collect::<Vec<&str>>().join("."))
+		.filter(|network| network.split('.').count() == 2)
+		.unwrap_or_else(|| "10.3".to_string());
 	let mut relay_info: Vec<(String, String, u16)> = Vec::new();
 	for (src, dest) in preinfo {
-		relay_info.push((src.to_string(), "10.3.0.".to_owned()+&dest.clone(), 4443));
+		let host = match dest.parse::<u32>() {
+			Ok(id) => format!("{}.{}.{}", network, id / 256, id % 256),
+			Err(_) => format!("{}.0.{}", network, dest),
+		};
+		relay_info.push((src.to_string(), host, 4443));
 	}
 
 
@@ -6,13 +6,25 @@ use moq_transport::serve::{
 
 use chrono::prelude::*;
 
+use std::sync::{Arc, Mutex};
+
+/// The latencies in ms a subscriber got, shared with whoever reports on them.
+pub type Samples = Arc<Mutex<Vec<i64>>>;
+
 pub struct Publisher {
 	track: GroupsWriter,
+	ns: bool,
 }
 
 impl Publisher {
 	pub fn new(track: GroupsWriter) -> Self {
-		Self { track }
+		Self { track, ns: false }
+	}
+
+	/// Write the seconds with ns instead of ms, for the subscribers' --ns output.
+	pub fn ns(mut self, ns: bool) -> Self {
+		self.ns = ns;
+		self
 	}
 
 	pub async fn run(mut self) -> anyhow::Result<()> {
@@ -33,8 +45,9 @@ impl Publisher {
 
 			sequence += 1;
 
+			let ns = self.ns;
 			tokio::spawn(async move {
-				if let Err(err) = Self::send_segment(segment, now).await {
+				if let Err(err) = Self::send_segment(segment, now, ns).await {
 					log::warn!("failed to send minute: {:?}", err);
 				}
 			});
@@ -49,7 +62,7 @@ impl Publisher {
 		}
 	}
 
-	async fn send_segment(mut segment: GroupWriter, now: DateTime<Utc>) -> anyhow::Result<()> {
+	async fn send_segment(mut segment: GroupWriter, now: DateTime<Utc>, ns: bool) -> anyhow::Result<()> {
 		// Everything but the second.
 		let base = now.format("%Y-%m-%d %H:%M:").to_string();
 
@@ -58,8 +71,11 @@ impl Publisher {
 		loop {
 			let mut now = chrono::Utc::now();
 			let seconds = now.format("%S").to_string();
-			let milliseconds = format!("{:03}", now.timestamp_subsec_millis());
-			let delta = format!("{}.{}", seconds, milliseconds);
+			let fraction = match ns {
+				true => format!("{:09}", now.timestamp_subsec_nanos()),
+				false => format!("{:03}", now.timestamp_subsec_millis()),
+			};
+			let delta = format!("{}.{}", seconds, fraction);
 			segment.write(delta.clone().into()).context("failed to write delta")?;
 
 			println!("{}{}", base, delta);
@@ -82,17 +98,42 @@ impl Publisher {
 }
 pub struct Subscriber {
 	track: TrackReader,
+	samples: Option<Samples>,
+	ns: bool,
 }
 
 impl Subscriber {
 	pub fn new(track: TrackReader) -> Self {
-		Self { track }
+		Self {
+			track,
+			samples: None,
+			ns: false,
+		}
+	}
+
+	/// Also keeps every latency in samples, for the load generator's report.
+	pub fn with_samples(track: TrackReader, samples: Samples) -> Self {
+		Self {
+			track,
+			samples: Some(samples),
+			ns: false,
+		}
+	}
+
+	/// Print a line per object with its ids and the send and receive time in ns instead of the ms difference:
+	///
+	/// ns group=28 object=14 sent=1718000000123456789 recv=1718000000125456789 start=1718000000000000000
+	///
+	/// start is when the subscription began, the objects sent before it are the backlog of the group it joined.
+	pub fn ns(mut self, ns: bool) -> Self {
+		self.ns = ns;
+		self
 	}
 
 	pub async fn run(self) -> anyhow::Result<()> {
 		match self.track.mode().await.context("failed to get mode")? {
 			TrackReaderMode::Stream(stream) => Self::recv_stream(stream).await,
-			TrackReaderMode::Groups(groups) => Self::recv_groups(groups).await,
+			TrackReaderMode::Groups(groups) => Self::recv_groups(groups, self.samples, self.ns).await,
 			TrackReaderMode::Objects(objects) => Self::recv_objects(objects).await,
 			TrackReaderMode::Datagrams(datagrams) => Self::recv_datagrams(datagrams).await,
 		}
@@ -109,7 +150,9 @@ impl Subscriber {
 		Ok(())
 	}
 
-	async fn recv_groups(mut groups: GroupsReader) -> anyhow::Result<()> {
+	async fn recv_groups(mut groups: GroupsReader, samples: Option<Samples>, ns: bool) -> anyhow::Result<()> {
+		let start = Utc::now().timestamp_nanos_opt().unwrap_or_default();
+
 		while let Some(mut group) = groups.next().await? {
 			let base = group
 				.read_next()
@@ -119,19 +162,36 @@ impl Subscriber {
 
 			let base = String::from_utf8_lossy(&base);
 
-			while let Some(object) = group.read_next().await? {
-				let str = String::from_utf8_lossy(&object);
-				// str is like 12:34:56.789
-				// base is like 2021-01-01
+			while let Some(mut object) = group.next().await? {
+				let payload = object.read_all().await?;
+				let str = String::from_utf8_lossy(&payload);
+				// str is like 56.789, or 56.789123456 from a --ns publisher
+				// base is like 2021-01-01 12:34:
 				// parse base and str into DateTime objects
-				let base_datetime = NaiveDateTime::parse_from_str(&format!("{} {}", base, str), "%Y-%m-%d %H:%M:%S%.3f").unwrap();
+				let base_datetime =
+					NaiveDateTime::parse_from_str(&format!("{} {}", base, str), "%Y-%m-%d %H:%M:%S%.f").unwrap();
 				let now_datetime = Utc::now().naive_utc();
 				// subtract base_datetime from now_datetime
 				let difference = now_datetime - base_datetime;
-				// format the difference as a string
-				let difference_str = format!("{}", difference.num_milliseconds());
+				let sent = base_datetime.and_utc().timestamp_nanos_opt().unwrap_or_default();
+
+				if ns {
+					let recv = now_datetime.and_utc().timestamp_nanos_opt().unwrap_or_default();
+					println!(
+						"ns group={} object={} sent={} recv={} start={}",
+						group.group_id, object.object_id, sent, recv, start
+					);
+				} else {
+					// format the difference as a string
+					let difference_str = format!("{}", difference.num_milliseconds());
+
+					println!("{}", difference_str);
+				}
 
-				println!("{}",difference_str );
+				// Not the backlog of the group the subscription joined, like latency.py leaves out of the ns lines.
+				if let Some(samples) = samples.as_ref().filter(|_| sent >= start) {
+					samples.lock().unwrap().push(difference.num_milliseconds());
+				}
 			}
 		}
 
@@ -0,0 +1,264 @@
+use std::{
+	fs,
+	io::Write,
+	path::PathBuf,
+	sync::{
+		atomic::{AtomicUsize, Ordering},
+		Arc,
+	},
+	time::Duration,
+};
+
+use anyhow::Context;
+use moq_native::quic;
+use moq_transport::{serve, session::Subscriber};
+use tokio::{
+	signal::unix::{signal, SignalKind},
+	task::JoinSet,
+};
+use url::Url;
+
+use crate::clock::{self, Samples};
+
+/// Upper bounds of the histogram buckets in ms, everything above the last one goes into an extra bucket.
+const BOUNDS: [i64; 12] = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000];
+
+pub struct LoadConfig {
+	pub url: Url,
+	pub namespace: String,
+	pub track: String,
+
+	/// Virtual subscribers, each its own subscription of the track.
+	pub subscriptions: usize,
+
+	/// MoQ sessions the subscriptions are spread over, round robin.
+	pub sessions: usize,
+
+	/// Where the per-subscription report goes, rewritten every interval and at the end.
+	pub report: Option<PathBuf>,
+	pub interval: Duration,
+
+	/// Print the structured ns lines instead of ms.
+	pub ns: bool,
+}
+
+// Many clock subscribers in one process, to find how many a relay can fan out to.
+// Every subscription prints its latencies like a single subscriber does, so the output can be parsed as before,
+// and keeps the ones of objects sent after it subscribed for a report with a histogram per subscription and over all of them.
+pub struct Load {
+	client: quic::Client,
+	config: LoadConfig,
+	samples: Vec<Samples>,
+	connected: Arc<AtomicUsize>,
+	failed: Arc<AtomicUsize>,
+}
+
+impl Load {
+	pub fn new(client: quic::Client, config: LoadConfig) -> Self {
+		let samples = (0..config.subscriptions).map(|_| Samples::default()).collect();
+
+		Self {
+			client,
+			config,
+			samples,
+			connected: Default::default(),
+			failed: Default::default(),
+		}
+	}
+
+	pub async fn run(self) -> anyhow::Result<()> {
+		let sessions = self.config.sessions.clamp(1, self.config.subscriptions.max(1));
+		let mut tasks = JoinSet::new();
+
+		for session in 0..sessions {
+			let samples: Vec<(usize, Samples)> = (session..self.config.subscriptions)
+				.step_by(sessions)
+				.map(|index| (index, self.samples[index].clone()))
+				.collect();
+
+			let client = self.client.clone();
+			let url = self.config.url.clone();
+			let namespace = self.config.namespace.clone();
+			let track = self.config.track.clone();
+			let connected = self.connected.clone();
+			let failed = self.failed.clone();
+			let ns = self.config.ns;
+
+			tasks.spawn(async move {
+				let count = samples.len();
+				if let Err(err) = Self::run_session(client, url, namespace, track, samples, connected, ns).await {
+					log::warn!("load session {} failed: {:?}", session, err);
+					failed.fetch_add(count, Ordering::Relaxed);
+				}
+			});
+		}
+
+		let mut terminate = signal(SignalKind::terminate())?;
+		let mut interval = tokio::time::interval(self.config.interval);
+
+		loop {
+			tokio::select! {
+				_ = interval.tick() => self.write_report(sessions)?,
+				_ = terminate.recv() => break,
+				res = tasks.join_next() => if res.is_none() { break },
+			}
+		}
+
+		self.write_report(sessions)?;
+		tasks.abort_all();
+
+		Ok(())
+	}
+
+	async fn run_session(
+		client: quic::Client,
+		url: Url,
+		namespace: String,
+		track: String,
+		samples: Vec<(usize, Samples)>,
+		connected: Arc<AtomicUsize>,
+		ns: bool,
+	) -> anyhow::Result<()> {
+		let session = client.connect(&url).await?;
+		let (session, subscriber) = Subscriber::connect(session)
+			.await
+			.context("failed to create MoQ Transport session")?;
+
+		connected.fetch_add(samples.len(), Ordering::Relaxed);
+
+		let mut tasks = JoinSet::new();
+		for (index, samples) in samples {
+			let (prod, sub) = serve::Track::new(namespace.clone(), track.clone()).produce();
+			let mut subscriber = subscriber.clone();
+
+			tasks.spawn(async move {
+				if let Err(err) = subscriber.subscribe(prod).await {
+					log::warn!("subscription {} failed: {}", index, err);
+				}
+			});
+			tasks.spawn(async move {
+				if let Err(err) = clock::Subscriber::with_samples(sub, samples).ns(ns).run().await {
+					log::warn!("subscription {} clock error: {:?}", index, err);
+				}
+			});
+		}
+
+		tokio::select! {
+			res = session.run() => res.context("session error")?,
+			_ = async { while tasks.join_next().await.is_some() {} } => {},
+		}
+
+		Ok(())
+	}
+
+	fn write_report(&self, sessions: usize) -> anyhow::Result<()> {
+		let path = match &self.config.report {
+			Some(path) => path,
+			None => return Ok(()),
+		};
+
+		let mut out = String::new();
+		out.push_str(&format!(
+			"# subscriptions={} sessions={} connected={} failed={}\n",
+			self.config.subscriptions,
+			sessions,
+			self.connected.load(Ordering::Relaxed),
+			self.failed.load(Ordering::Relaxed)
+		));
+		out.push_str("sub;session;samples;mean ms;p50 ms;p99 ms;max ms");
+		for bound in BOUNDS {
+			out.push_str(&format!(";<={}", bound));
+		}
+		out.push_str(&format!(";>{}\n", BOUNDS[BOUNDS.len() - 1]));
+
+		let mut all = Vec::new();
+		for (index, samples) in self.samples.iter().enumerate() {
+			let mut latencies = samples.lock().unwrap().clone();
+			out.push_str(&summary(
+				&index.to_string(),
+				&(index % sessions).to_string(),
+				&mut latencies,
+			));
+			all.append(&mut latencies);
+		}
+		out.push_str(&summary("all", "", &mut all));
+
+		// Readers never see half a report.
+		let partial = path.with_extension("partial");
+		fs::File::create(&partial)?.write_all(out.as_bytes())?;
+		fs::rename(&partial, path)?;
+
+		Ok(())
+	}
+}
+
+fn summary(name: &str, session: &str, latencies: &mut [i64]) -> String {
+	latencies.sort_unstable();
+
+	let mut buckets = [0usize; BOUNDS.len() + 1];
+	for latency in latencies.iter() {
+		buckets[BOUNDS.partition_point(|bound| bound < latency)] += 1;
+	}
+
+	let mut line = match latencies.len() {
+		0 => format!("{};{};0;;;;", name, session),
+		count => format!(
+			"{};{};{};{:.1};{};{};{}",
+			name,
+			session,
+			count,
+			latencies.iter().sum::<i64>() as f64 / count as f64,
+			percentile(latencies, 50),
+			percentile(latencies, 99),
+			latencies[count - 1]
+		),
+	};
+	for bucket in buckets {
+		line.push_str(&format!(";{}", bucket));
+	}
+	line.push('\n');
+
+	line
+}
+
+// Nearest rank of the sorted latencies.
+fn percentile(sorted: &[i64], p: usize) -> i64 {
+	let rank = (p * sorted.len()).div_ceil(100).max(1);
+	sorted[rank - 1]
+}
+
+#[cfg(test)]
+mod tests {
+	use super::*;
+
+	#[test]
+	fn nearest_rank() {
+		let sorted: Vec<i64> = (1..=100).collect();
+		assert_eq!(percentile(&sorted, 50), 50);
+		assert_eq!(percentile(&sorted, 99), 99);
+		assert_eq!(percentile(&[7], 99), 7);
+		assert_eq!(percentile(&[1, 2, 3], 50), 2);
+	}
+
+	#[test]
+	fn summary_buckets() {
+		let mut latencies = vec![3000, 1, 7, 7, 6000];
+		let line = summary("0", "0", &mut latencies);
+		let fields: Vec<&str> = line.trim_end().split(';').collect();
+
+		assert_eq!(&fields[..7], &["0", "0", "5", "1803.0", "7", "6000", "6000"]);
+		// <=1, <=10 twice, <=5000 and the one above the last bound
+		let buckets: Vec<&str> = fields[7..].to_vec();
+		assert_eq!(buckets.len(), BOUNDS.len() + 1);
+		assert_eq!(buckets[0], "1");
+		assert_eq!(buckets[3], "2");
+		assert_eq!(buckets[11], "1");
+		assert_eq!(buckets[12], "1");
+	}
+
+	#[test]
+	fn summary_empty() {
+		let line = summary("3", "1", &mut []);
+		assert!(line.starts_with("3;1;0;;;;"));
+	}
+}
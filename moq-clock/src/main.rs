@@ -1,11 +1,12 @@
 use moq_native::quic;
-use std::net;
+use std::{net, path::PathBuf, time::Duration};
 use url::Url;
 
 use anyhow::Context;
 use clap::Parser;
 
 mod clock;
+mod load;
 
 use moq_transport::{
 	serve,
@@ -37,6 +38,26 @@ pub struct Cli {
 	/// The name of the clock track.
 	#[arg(long, default_value = "now")]
 	pub track: String,
+
+	/// Publish the time with ns, subscribe with a line per object: its ids and the send and receive time in ns.
+	#[arg(long)]
+	pub ns: bool,
+
+	/// Subscribe this many times at once instead of once, a load generator for the relay's fan-out.
+	#[arg(long, default_value = "0")]
+	pub load: usize,
+
+	/// Spread the --load subscriptions over this many sessions, 0 for a session each.
+	#[arg(long, default_value = "0")]
+	pub sessions: usize,
+
+	/// Write the --load report with the latency histogram of every subscription to this file.
+	#[arg(long)]
+	pub report: Option<PathBuf>,
+
+	/// Rewrite the --load report this often, in ms.
+	#[arg(long, default_value = "1000")]
+	pub report_interval: u64,
 }
 
 #[tokio::main]
@@ -54,6 +75,29 @@ async fn main() -> anyhow::Result<()> {
 
 	let quic = quic::Endpoint::new(quic::Config { bind: config.bind, tls })?;
 
+	if config.load > 0 && !config.publish {
+		log::info!("load generator: url={} subscriptions={}", config.url, config.load);
+
+		let load = load::Load::new(
+			quic.client.clone(),
+			load::LoadConfig {
+				url: config.url,
+				namespace: config.namespace,
+				track: config.track,
+				subscriptions: config.load,
+				sessions: match config.sessions {
+					0 => config.load,
+					sessions => sessions,
+				},
+				report: config.report,
+				interval: Duration::from_millis(config.report_interval),
+				ns: config.ns,
+			},
+		);
+
+		return load.run().await;
+	}
+
 	log::info!("connecting to server: url={}", config.url);
 
 	let session = quic.client.connect(&config.url).await?;
@@ -69,7 +113,7 @@ async fn main() -> anyhow::Result<()> {
 		.produce();
 
 		let track = writer.create(&config.track).unwrap();
-		let clock = clock::Publisher::new(track.groups()?);
+		let clock = clock::Publisher::new(track.groups()?).ns(config.ns);
 
 		tokio::select! {
 			res = session.run() => res.context("session error")?,
@@ -83,7 +127,7 @@ async fn main() -> anyhow::Result<()> {
 
 		let (prod, sub) = serve::Track::new(config.namespace, config.track).produce();
 
-		let clock = clock::Subscriber::new(sub);
+		let clock = clock::Subscriber::new(sub).ns(config.ns);
 
 		tokio::select! {
 			res = session.run() => res.context("session error")?,
@@ -1,27 +1,40 @@
+use std::time::Instant;
+
 use url::Url;
 
+use crate::Metrics;
+
 #[derive(Clone)]
 pub struct Api {
 	client: moq_api::Client,
 	origin: moq_api::Origin,
+	metrics: Metrics,
 }
 
 impl Api {
-	pub fn new(url: Url, node: Url, original:bool) -> Self {
-		let origin = moq_api::Origin { url: node.clone()};
-		let client = moq_api::Client::new(url,node,  original);
+	pub fn new(url: Url, node: Url, original: bool, metrics: Metrics) -> Self {
+		let origin = moq_api::Origin { url: node.clone() };
+		let client = moq_api::Client::new(url, node, original);
 
-		Self { client, origin }
+		Self {
+			client,
+			origin,
+			metrics,
+		}
 	}
 
 	pub async fn set_origin(&self, namespace: String) -> Result<Refresh, moq_api::ApiError> {
 		let refresh = Refresh::new(self.client.clone(), self.origin.clone(), namespace);
 		refresh.update().await?;
+		self.metrics.api_register();
 		Ok(refresh)
 	}
 
 	pub async fn get_origin(&self, namespace: &str) -> Result<Option<moq_api::Origin>, moq_api::ApiError> {
-		self.client.get_origin(namespace).await
+		let start = Instant::now();
+		let origin = self.client.get_origin(namespace).await;
+		self.metrics.api_lookup(start.elapsed(), origin.is_ok());
+		origin
 	}
 }
 
@@ -5,7 +5,7 @@ use moq_transport::{
 	session::{Announced, SessionError, Subscriber},
 };
 
-use crate::{Api, Locals, Producer};
+use crate::{Api, Locals, Metrics, Producer};
 
 #[derive(Clone)]
 pub struct Consumer {
@@ -13,15 +13,23 @@ pub struct Consumer {
 	locals: Locals,
 	api: Option<Api>,
 	forward: Option<Producer>, // Forward all announcements to this subscriber
+	metrics: Metrics,
 }
 
 impl Consumer {
-	pub fn new(remote: Subscriber, locals: Locals, api: Option<Api>, forward: Option<Producer>) -> Self {
+	pub fn new(
+		remote: Subscriber,
+		locals: Locals,
+		api: Option<Api>,
+		forward: Option<Producer>,
+		metrics: Metrics,
+	) -> Self {
 		Self {
 			remote,
 			locals,
 			api,
 			forward,
+			metrics,
 		}
 	}
 
@@ -49,6 +57,7 @@ impl Consumer {
 	}
 
 	async fn serve(mut self, mut announce: Announced) -> Result<(), anyhow::Error> {
+		let _announce = self.metrics.announce();
 		let mut tasks = FuturesUnordered::new();
 
 		let (_, mut request, reader) = Tracks::new(announce.namespace.to_string()).produce();
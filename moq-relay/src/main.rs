@@ -3,22 +3,26 @@ use clap::Parser;
 mod api;
 mod consumer;
 mod local;
+mod metrics;
 mod producer;
 mod relay;
 mod remote;
 mod session;
+mod trace;
 mod web;
 
 pub use api::*;
 pub use consumer::*;
 pub use local::*;
+pub use metrics::*;
 pub use producer::*;
 pub use relay::*;
 pub use remote::*;
 pub use session::*;
+pub use trace::*;
 pub use web::*;
 
-use std::net;
+use std::{net, path::PathBuf};
 use url::Url;
 
 #[derive(Parser, Clone)]
@@ -53,6 +57,18 @@ pub struct Cli {
 
 	#[arg(long)]
 	pub original: bool,
+
+	/// Write the receive, dequeue and send time of every object to this csv file.
+	#[arg(long)]
+	pub trace: Option<PathBuf>,
+
+	/// How many trace records may wait for the writer before new ones are dropped.
+	#[arg(long, default_value = "65536")]
+	pub trace_capacity: usize,
+
+	/// Count the objects, bytes, queue depth and skipped groups per track for /metrics.
+	#[arg(long)]
+	pub metrics: bool,
 }
 
 #[tokio::main]
@@ -72,6 +88,27 @@ async fn main() -> anyhow::Result<()> {
 		anyhow::bail!("missing TLS certificates");
 	}
 
+	let metrics = Metrics::new();
+
+	let trace = match cli.trace.clone() {
+		Some(path) => Some(Trace::new(
+			TraceConfig {
+				path,
+				capacity: cli.trace_capacity,
+			},
+			metrics.clone(),
+		)?),
+		None => None,
+	};
+
+	// Without either the sessions don't look at the objects at all.
+	if cli.metrics || trace.is_some() {
+		moq_transport::trace::set_sink(RelaySink {
+			metrics: cli.metrics.then(|| metrics.clone()),
+			trace,
+		});
+	}
+
 	// Create a QUIC server for media.
 	let relay = Relay::new(RelayConfig {
 		tls: tls.clone(),
@@ -80,12 +117,17 @@ async fn main() -> anyhow::Result<()> {
 		api: cli.api,
 		announce: cli.announce,
 		original: cli.original,
+		metrics: metrics.clone(),
 	})?;
 
 	if cli.dev {
 		// Create a web server too.
-		// Currently this only contains the certificate fingerprint (for development only).
-		let web = Web::new(WebConfig { bind: cli.bind, tls });
+		// Currently this only contains the certificate fingerprint and the /metrics counters (for development only).
+		let web = Web::new(WebConfig {
+			bind: cli.bind,
+			tls,
+			metrics,
+		});
 
 		tokio::spawn(async move {
 			web.run().await.expect("failed to run web server");
@@ -0,0 +1,259 @@
+use std::{
+	collections::HashMap,
+	fmt::Write,
+	sync::{
+		atomic::{AtomicU64, Ordering},
+		Arc, Mutex,
+	},
+	time::Duration,
+};
+
+use moq_transport::trace::{Event, TrackSink};
+
+// The counters of one track, shared by all its subscriptions, which resolve it once and then only touch atomics.
+#[derive(Default)]
+pub struct TrackMetrics {
+	objects_received: AtomicU64,
+	bytes_received: AtomicU64,
+	objects_sent: AtomicU64,
+	bytes_sent: AtomicU64,
+	queue_depth: AtomicU64,
+	queue_depth_max: AtomicU64,
+	groups_dropped: AtomicU64,
+}
+
+impl TrackSink for TrackMetrics {
+	fn record(&self, event: Event, _group_id: u64, object_id: u64, size: usize, queued: usize) {
+		match event {
+			Event::Receive => {
+				self.objects_received.fetch_add(1, Ordering::Relaxed);
+				self.bytes_received.fetch_add(size as u64, Ordering::Relaxed);
+			}
+			Event::Dequeue => {
+				self.queue_depth.store(queued as u64, Ordering::Relaxed);
+				self.queue_depth_max.fetch_max(queued as u64, Ordering::Relaxed);
+			}
+			Event::Send => {
+				self.objects_sent.fetch_add(1, Ordering::Relaxed);
+				self.bytes_sent.fetch_add(size as u64, Ordering::Relaxed);
+			}
+			Event::Skip => {
+				self.groups_dropped.fetch_add(object_id, Ordering::Relaxed);
+			}
+		}
+	}
+}
+
+// Which counter of a track a /metrics line shows.
+type TrackCounter = fn(&TrackMetrics) -> &AtomicU64;
+
+#[derive(Default)]
+struct MetricsState {
+	sessions: AtomicU64,
+	sessions_total: AtomicU64,
+	subscriptions: AtomicU64,
+	subscriptions_total: AtomicU64,
+	announces: AtomicU64,
+	announces_total: AtomicU64,
+	api_lookups: AtomicU64,
+	api_lookup_errors: AtomicU64,
+	api_lookup_us: AtomicU64,
+	api_registers: AtomicU64,
+	trace_dropped: AtomicU64,
+	// namespace -> track name, only locked when a subscription starts and on render
+	tracks: Mutex<HashMap<String, HashMap<String, Arc<TrackMetrics>>>>,
+}
+
+// Counters of the relay, served as prometheus text on /metrics by the web server.
+// The per-track ones are fed through the moq_transport::trace sink when the relay runs with --metrics,
+// the rest by the sessions and the api client.
+#[derive(Clone, Default)]
+pub struct Metrics {
+	state: Arc<MetricsState>,
+}
+
+impl Metrics {
+	pub fn new() -> Self {
+		Self::default()
+	}
+
+	/// An accepted MoQ session, counted as active until the guard is dropped.
+	pub fn session(&self) -> Gauge {
+		self.state.sessions_total.fetch_add(1, Ordering::Relaxed);
+		Gauge::new(self.clone(), |state| &state.sessions)
+	}
+
+	/// A downstream subscription being served.
+	pub fn subscription(&self) -> Gauge {
+		self.state.subscriptions_total.fetch_add(1, Ordering::Relaxed);
+		Gauge::new(self.clone(), |state| &state.subscriptions)
+	}
+
+	/// An announce from a publisher being served.
+	pub fn announce(&self) -> Gauge {
+		self.state.announces_total.fetch_add(1, Ordering::Relaxed);
+		Gauge::new(self.clone(), |state| &state.announces)
+	}
+
+	pub fn api_lookup(&self, elapsed: Duration, ok: bool) {
+		self.state.api_lookups.fetch_add(1, Ordering::Relaxed);
+		self.state
+			.api_lookup_us
+			.fetch_add(elapsed.as_micros() as u64, Ordering::Relaxed);
+		if !ok {
+			self.state.api_lookup_errors.fetch_add(1, Ordering::Relaxed);
+		}
+	}
+
+	pub fn api_register(&self) {
+		self.state.api_registers.fetch_add(1, Ordering::Relaxed);
+	}
+
+	pub fn trace_dropped(&self) {
+		self.state.trace_dropped.fetch_add(1, Ordering::Relaxed);
+	}
+
+	/// The counters of a track, created on its first subscription.
+	pub fn track(&self, namespace: &str, name: &str) -> Arc<TrackMetrics> {
+		let mut tracks = self.state.tracks.lock().unwrap();
+		let names = tracks.entry(namespace.to_string()).or_default();
+		names.entry(name.to_string()).or_default().clone()
+	}
+
+	pub fn render(&self) -> String {
+		let state = &self.state;
+		let mut out = String::new();
+
+		let gauges = [
+			("moq_relay_sessions", &state.sessions),
+			("moq_relay_subscriptions", &state.subscriptions),
+			("moq_relay_announces", &state.announces),
+		];
+		for (name, value) in gauges {
+			let _ = writeln!(out, "# TYPE {} gauge\n{} {}", name, name, value.load(Ordering::Relaxed));
+		}
+
+		let counters = [
+			("moq_relay_sessions_total", &state.sessions_total),
+			("moq_relay_subscriptions_total", &state.subscriptions_total),
+			("moq_relay_announces_total", &state.announces_total),
+			("moq_relay_api_lookups_total", &state.api_lookups),
+			("moq_relay_api_lookup_errors_total", &state.api_lookup_errors),
+			("moq_relay_api_lookup_microseconds_total", &state.api_lookup_us),
+			("moq_relay_api_registers_total", &state.api_registers),
+			("moq_relay_trace_dropped_total", &state.trace_dropped),
+		];
+		for (name, value) in counters {
+			let _ = writeln!(
+				out,
+				"# TYPE {} counter\n{} {}",
+				name,
+				name,
+				value.load(Ordering::Relaxed)
+			);
+		}
+
+		let tracks = state.tracks.lock().unwrap();
+		let per_track: [(&str, &str, TrackCounter); 7] = [
+			("moq_relay_objects_received_total", "counter", |t| &t.objects_received),
+			("moq_relay_bytes_received_total", "counter", |t| &t.bytes_received),
+			("moq_relay_objects_sent_total", "counter", |t| &t.objects_sent),
+			("moq_relay_bytes_sent_total", "counter", |t| &t.bytes_sent),
+			("moq_relay_queue_depth", "gauge", |t| &t.queue_depth),
+			("moq_relay_queue_depth_max", "gauge", |t| &t.queue_depth_max),
+			("moq_relay_groups_dropped_total", "counter", |t| &t.groups_dropped),
+		];
+		for (name, kind, value) in per_track {
+			let _ = writeln!(out, "# TYPE {} {}", name, kind);
+			for (namespace, names) in tracks.iter() {
+				for (track, metrics) in names.iter() {
+					let _ = writeln!(
+						out,
+						"{}{{namespace=\"{}\",track=\"{}\"}} {}",
+						name,
+						escape(namespace),
+						escape(track),
+						value(metrics).load(Ordering::Relaxed)
+					);
+				}
+			}
+		}
+
+		out
+	}
+}
+
+fn escape(label: &str) -> String {
+	label.replace('\\', "\\\\").replace('"', "\\\"").replace('\n', "\\n")
+}
+
+/// Decrements its gauge when dropped.
+pub struct Gauge {
+	metrics: Metrics,
+	gauge: fn(&MetricsState) -> &AtomicU64,
+}
+
+impl Gauge {
+	fn new(metrics: Metrics, gauge: fn(&MetricsState) -> &AtomicU64) -> Self {
+		gauge(&metrics.state).fetch_add(1, Ordering::Relaxed);
+		Self { metrics, gauge }
+	}
+}
+
+impl Drop for Gauge {
+	fn drop(&mut self) {
+		(self.gauge)(&self.metrics.state).fetch_sub(1, Ordering::Relaxed);
+	}
+}
+
+#[cfg(test)]
+mod tests {
+	use super::*;
+
+	#[test]
+	fn track_counters() {
+		let metrics = Metrics::new();
+		let first = metrics.track("1000_bbb", "1000_bbb");
+		let second = metrics.track("1000_bbb", "1000_bbb");
+		assert!(Arc::ptr_eq(&first, &second));
+
+		first.record(Event::Receive, 1, 0, 100, 0);
+		second.record(Event::Send, 1, 0, 100, 0);
+		second.record(Event::Send, 1, 0, 100, 0);
+		first.record(Event::Dequeue, 1, 0, 100, 4);
+		first.record(Event::Dequeue, 1, 1, 100, 2);
+		first.record(Event::Skip, 2, 3, 0, 0);
+
+		let text = metrics.render();
+		let track = "{namespace=\"1000_bbb\",track=\"1000_bbb\"}";
+		for (name, value) in [
+			("moq_relay_objects_received_total", 1),
+			("moq_relay_bytes_received_total", 100),
+			("moq_relay_objects_sent_total", 2),
+			("moq_relay_bytes_sent_total", 200),
+			("moq_relay_queue_depth", 2),
+			("moq_relay_queue_depth_max", 4),
+			("moq_relay_groups_dropped_total", 3),
+		] {
+			let line = format!("{}{} {}", name, track, value);
+			assert!(text.lines().any(|l| l == line), "missing {}", line);
+		}
+	}
+
+	#[test]
+	fn gauges_drop() {
+		let metrics = Metrics::new();
+		let session = metrics.session();
+		let _other = metrics.session();
+		drop(session);
+
+		let text = metrics.render();
+		assert!(text.lines().any(|l| l == "moq_relay_sessions 1"));
+		assert!(text.lines().any(|l| l == "moq_relay_sessions_total 2"));
+	}
+
+	#[test]
+	fn escaped_labels() {
+		assert_eq!(escape("a\"b\\c"), "a\\\"b\\\\c");
+	}
+}
@@ -4,21 +4,23 @@ use moq_transport::{
 	session::{Publisher, SessionError, Subscribed},
 };
 
-use crate::{Locals, RemotesConsumer};
+use crate::{Locals, Metrics, RemotesConsumer};
 
 #[derive(Clone)]
 pub struct Producer {
 	remote: Publisher,
 	locals: Locals,
 	remotes: Option<RemotesConsumer>,
+	metrics: Metrics,
 }
 
 impl Producer {
-	pub fn new(remote: Publisher, locals: Locals, remotes: Option<RemotesConsumer>) -> Self {
+	pub fn new(remote: Publisher, locals: Locals, remotes: Option<RemotesConsumer>, metrics: Metrics) -> Self {
 		Self {
 			remote,
 			locals,
 			remotes,
+			metrics,
 		}
 	}
 
@@ -50,6 +52,7 @@ impl Producer {
 	}
 
 	async fn serve(self, subscribe: Subscribed) -> Result<(), anyhow::Error> {
+		let _subscription = self.metrics.subscription();
 
 		if let Some(mut local) = self.locals.route(&subscribe.namespace) {
 			if let Some(track) = local.subscribe(&subscribe.name) {
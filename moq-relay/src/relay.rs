@@ -6,7 +6,7 @@ use futures::{stream::FuturesUnordered, FutureExt, StreamExt};
 use moq_native::quic;
 use url::Url;
 
-use crate::{Api, Consumer, Locals, Producer, Remotes, RemotesConsumer, RemotesProducer, Session};
+use crate::{Api, Consumer, Locals, Metrics, Producer, Remotes, RemotesConsumer, RemotesProducer, Session};
 
 pub struct RelayConfig {
 	/// Listen on this address
@@ -25,9 +25,11 @@ pub struct RelayConfig {
 	/// We use QUIC, so the certificate must be valid for this address.
 	pub node: Option<Url>,
 
-
 	/// Whether to use the original mode.
 	pub original: bool,
+
+	/// Counters served on /metrics.
+	pub metrics: Metrics,
 }
 
 pub struct Relay {
@@ -36,6 +38,7 @@ pub struct Relay {
 	locals: Locals,
 	api: Option<Api>,
 	remotes: Option<(RemotesProducer, RemotesConsumer)>,
+	metrics: Metrics,
 }
 
 impl Relay {
@@ -50,7 +53,7 @@ impl Relay {
 
 		let api = if let (Some(url), Some(node), original) = (config.api, config.node, config.original) {
 			log::info!("using moq-api: url={} node={}", url, node);
-			Some(Api::new(url, node, original))
+			Some(Api::new(url, node, original, config.metrics.clone()))
 		} else {
 			None
 		};
@@ -71,6 +74,7 @@ impl Relay {
 			api,
 			locals,
 			remotes,
+			metrics: config.metrics,
 		})
 	}
 
@@ -97,8 +101,19 @@ impl Relay {
 			// Create a normal looking session, except we never forward or register announces.
 			let session = Session {
 				session,
-				producer: Some(Producer::new(publisher, self.locals.clone(), remotes.clone())),
-				consumer: Some(Consumer::new(subscriber, self.locals.clone(), None, None)),
+				producer: Some(Producer::new(
+					publisher,
+					self.locals.clone(),
+					remotes.clone(),
+					self.metrics.clone(),
+				)),
+				consumer: Some(Consumer::new(
+					subscriber,
+					self.locals.clone(),
+					None,
+					None,
+					self.metrics.clone(),
+				)),
 			};
 
 			let forward = session.producer.clone();
@@ -122,8 +137,10 @@ impl Relay {
 					let remotes = remotes.clone();
 					let forward = forward.clone();
 					let api = self.api.clone();
+					let metrics = self.metrics.clone();
 
 					tasks.push(async move {
+						let _session = metrics.session();
 						let (session, publisher, subscriber) = match moq_transport::session::Session::accept(conn).await {
 							Ok(session) => session,
 							Err(err) => {
@@ -134,8 +151,8 @@ impl Relay {
 
 						let session = Session {
 							session,
-							producer: publisher.map(|publisher| Producer::new(publisher, locals.clone(), remotes)),
-							consumer: subscriber.map(|subscriber| Consumer::new(subscriber, locals, api, forward)),
+							producer: publisher.map(|publisher| Producer::new(publisher, locals.clone(), remotes, metrics.clone())),
+							consumer: subscriber.map(|subscriber| Consumer::new(subscriber, locals, api, forward, metrics.clone())),
 						};
 
 						if let Err(err) = session.run().await {
@@ -0,0 +1,163 @@
+use std::{
+	fs::File,
+	io::{BufWriter, Write},
+	path::PathBuf,
+	sync::{
+		atomic::{AtomicU64, Ordering},
+		mpsc, Arc,
+	},
+	thread,
+	time::{Duration, SystemTime, UNIX_EPOCH},
+};
+
+use moq_transport::trace::{self, Event, TrackSink};
+
+use crate::Metrics;
+
+pub struct TraceConfig {
+	/// The csv file the records go to.
+	pub path: PathBuf,
+
+	/// Records waiting for the writer before new ones are dropped.
+	pub capacity: usize,
+}
+
+// Writes the per-object timestamps of moq_transport::trace to a csv file.
+// The sessions only format a line and try to hand it to a bounded channel, a thread of its own does the IO,
+// so a slow disk drops records instead of holding up the forwarding.
+#[derive(Clone)]
+pub struct Trace {
+	send: mpsc::SyncSender<String>,
+	dropped: Arc<AtomicU64>,
+	metrics: Metrics,
+}
+
+impl Trace {
+	pub fn new(config: TraceConfig, metrics: Metrics) -> anyhow::Result<Self> {
+		let file = File::create(&config.path)?;
+		let (send, recv) = mpsc::sync_channel::<String>(config.capacity);
+
+		thread::Builder::new().name("trace".to_string()).spawn(move || {
+			let mut out = BufWriter::with_capacity(1 << 16, file);
+			let _ = out.write_all(b"event,namespace,name,group,object,ns\n");
+
+			loop {
+				match recv.recv_timeout(Duration::from_millis(20)) {
+					Ok(line) => {
+						let _ = out.write_all(line.as_bytes());
+					}
+					// Flush whenever there is a pause, the relay is killed without a chance to do it at the end.
+					Err(mpsc::RecvTimeoutError::Timeout) => {
+						let _ = out.flush();
+					}
+					Err(mpsc::RecvTimeoutError::Disconnected) => break,
+				}
+			}
+
+			let _ = out.flush();
+		})?;
+
+		log::info!("tracing objects to {}", config.path.display());
+
+		Ok(Self {
+			send,
+			dropped: Default::default(),
+			metrics,
+		})
+	}
+
+	fn write(&self, line: String) {
+		if self.send.try_send(line).is_err() {
+			self.metrics.trace_dropped();
+			let dropped = self.dropped.fetch_add(1, Ordering::Relaxed) + 1;
+			if dropped.is_power_of_two() {
+				log::warn!("trace writer is behind, dropped {} records", dropped);
+			}
+		}
+	}
+}
+
+// The trace of one track, with the names it writes into every line, already quoted for csv.
+struct TraceTrack {
+	trace: Trace,
+	namespace: String,
+	name: String,
+}
+
+impl TrackSink for TraceTrack {
+	fn record(&self, event: Event, group_id: u64, object_id: u64, _size: usize, _queued: usize) {
+		let ns = SystemTime::now()
+			.duration_since(UNIX_EPOCH)
+			.map(|elapsed| elapsed.as_nanos() as u64)
+			.unwrap_or(0);
+
+		self.trace.write(format!(
+			"{},{},{},{},{},{}\n",
+			event.as_str(),
+			self.namespace,
+			self.name,
+			group_id,
+			object_id,
+			ns
+		));
+	}
+}
+
+// Both the per-track counters and the trace file.
+struct Tee(Arc<dyn TrackSink>, Arc<dyn TrackSink>);
+
+impl TrackSink for Tee {
+	fn record(&self, event: Event, group_id: u64, object_id: u64, size: usize, queued: usize) {
+		self.0.record(event, group_id, object_id, size, queued);
+		self.1.record(event, group_id, object_id, size, queued);
+	}
+}
+
+// What main installs as the moq_transport::trace sink, only with --metrics or --trace.
+// Without it the sessions don't record anything for an object.
+pub struct RelaySink {
+	pub metrics: Option<Metrics>,
+	pub trace: Option<Trace>,
+}
+
+impl trace::Sink for RelaySink {
+	fn track(&self, namespace: &str, name: &str) -> Option<Arc<dyn TrackSink>> {
+		let counters = self
+			.metrics
+			.as_ref()
+			.map(|metrics| metrics.track(namespace, name) as Arc<dyn TrackSink>);
+		let trace = self.trace.as_ref().map(|trace| {
+			Arc::new(TraceTrack {
+				trace: trace.clone(),
+				namespace: csv_field(namespace),
+				name: csv_field(name),
+			}) as Arc<dyn TrackSink>
+		});
+
+		match (counters, trace) {
+			(Some(counters), Some(trace)) => Some(Arc::new(Tee(counters, trace))),
+			(counters, trace) => counters.or(trace),
+		}
+	}
+}
+
+// A name with a comma, quote or line break is quoted with its quotes doubled, the way python's csv module reads it.
+fn csv_field(value: &str) -> String {
+	if value.contains([',', '"', '\n', '\r']) {
+		format!("\"{}\"", value.replace('"', "\"\""))
+	} else {
+		value.to_string()
+	}
+}
+
+#[cfg(test)]
+mod tests {
+	use super::*;
+
+	#[test]
+	fn quoted_fields() {
+		assert_eq!(csv_field("1000_bbb-360"), "1000_bbb-360");
+		assert_eq!(csv_field("a,b"), "\"a,b\"");
+		assert_eq!(csv_field("say \"hi\"\n"), "\"say \"\"hi\"\"\n\"");
+	}
+}
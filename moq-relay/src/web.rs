@@ -1,12 +1,27 @@
 use std::{net, sync::Arc};
 
-use axum::{extract::State, http::Method, response::IntoResponse, routing::get, Router};
+use axum::{
+	extract::State,
+	http::{header, Method},
+	response::IntoResponse,
+	routing::get,
+	Router,
+};
 use hyper_serve::tls_rustls::RustlsAcceptor;
 use tower_http::cors::{Any, CorsLayer};
 
+use crate::Metrics;
+
 pub struct WebConfig {
 	pub bind: net::SocketAddr,
 	pub tls: moq_native::tls::Config,
+	pub metrics: Metrics,
+}
+
+#[derive(Clone)]
+struct WebState {
+	fingerprint: String,
+	metrics: Metrics,
 }
 
 // Run a HTTP server using Axum
@@ -28,8 +43,12 @@ impl Web {
 
 		let app = Router::new()
 			.route("/fingerprint", get(serve_fingerprint))
+			.route("/metrics", get(serve_metrics))
 			.layer(CorsLayer::new().allow_origin(Any).allow_methods([Method::GET]))
-			.with_state(fingerprint);
+			.with_state(WebState {
+				fingerprint,
+				metrics: config.metrics,
+			});
 
 		let server = hyper_serve::bind_rustls(config.bind, tls);
 
@@ -42,6 +61,13 @@ impl Web {
 	}
 }
 
-async fn serve_fingerprint(State(fingerprint): State<String>) -> impl IntoResponse {
-	fingerprint
+async fn serve_fingerprint(State(state): State<WebState>) -> impl IntoResponse {
+	state.fingerprint
+}
+
+async fn serve_metrics(State(state): State<WebState>) -> impl IntoResponse {
+	(
+		[(header::CONTENT_TYPE, "text/plain; version=0.0.4")],
+		state.metrics.render(),
+	)
 }
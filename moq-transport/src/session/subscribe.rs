@@ -4,6 +4,7 @@ use crate::{
 	data,
 	message::{self, FilterType, SubscribeLocation, SubscribePair},
 	serve::{self, ServeError, TrackWriter, TrackWriterMode},
+	trace::{self, Event},
 };
 
 use crate::watch::State;
@@ -76,6 +77,7 @@ impl Subscribe {
 
 		let recv = SubscribeRecv {
 			state: recv,
+			tracer: trace::tracer(&track.namespace, &track.name),
 			writer: Some(track.into()),
 		};
 
@@ -114,6 +116,7 @@ impl ops::Deref for Subscribe {
 
 pub(super) struct SubscribeRecv {
 	state: State<SubscribeState>,
+	pub tracer: trace::Tracer,
 	writer: Option<TrackWriterMode>,
 }
 
@@ -206,6 +209,14 @@ impl SubscribeRecv {
 			_ => return Err(ServeError::Mode),
 		};
 
+		self.tracer.record(
+			Event::Receive,
+			datagram.group_id,
+			datagram.object_id,
+			datagram.payload.len(),
+			0,
+		);
+
 		datagrams.write(serve::Datagram {
 			group_id: datagram.group_id,
 			object_id: datagram.object_id,
@@ -5,6 +5,7 @@ use futures::StreamExt;
 
 use crate::coding::Encode;
 use crate::serve::{ServeError, TrackReaderMode};
+use crate::trace::{self, Event, Tracer};
 use crate::watch::State;
 use crate::{data, message, serve};
 
@@ -89,12 +90,15 @@ impl Subscribed {
 
 		self.ok = true; // So we sent SubscribeDone on drop
 
+		// Looked up once, the objects only go through the handle.
+		let tracer = trace::tracer(&self.info.namespace, &self.info.name);
+
 		match track.mode().await? {
 			// TODO cancel track/datagrams on closed
-			TrackReaderMode::Stream(stream) => self.serve_track(stream).await,
-			TrackReaderMode::Groups(groups) => self.serve_groups(groups).await,
-			TrackReaderMode::Objects(objects) => self.serve_objects(objects).await,
-			TrackReaderMode::Datagrams(datagrams) => self.serve_datagrams(datagrams).await,
+			TrackReaderMode::Stream(stream) => self.serve_track(stream, tracer).await,
+			TrackReaderMode::Groups(groups) => self.serve_groups(groups, tracer).await,
+			TrackReaderMode::Objects(objects) => self.serve_objects(objects, tracer).await,
+			TrackReaderMode::Datagrams(datagrams) => self.serve_datagrams(datagrams, tracer).await,
 		}
 	}
 
@@ -158,7 +162,7 @@ impl Drop for Subscribed {
 }
 
 impl Subscribed {
-	async fn serve_track(&mut self, mut track: serve::StreamReader) -> Result<(), SessionError> {
+	async fn serve_track(&mut self, mut track: serve::StreamReader, tracer: Tracer) -> Result<(), SessionError> {
 		let mut stream = self.publisher.open_uni().await?;
 
 		// TODO figure out u32 vs u64 priority
@@ -179,6 +183,8 @@ impl Subscribed {
 
 		while let Some(mut group) = track.next().await? {
 			while let Some(mut object) = group.next().await? {
+				tracer.record(Event::Dequeue, object.group_id, object.object_id, object.size, 0);
+
 				let header = data::TrackObject {
 					group_id: object.group_id,
 					object_id: object.object_id,
@@ -192,6 +198,7 @@ impl Subscribed {
 					.update_max(object.group_id, object.object_id)?;
 
 				writer.encode(&header).await?;
+				tracer.record(Event::Send, object.group_id, object.object_id, object.size, 0);
 
 				log::trace!("sent track object: {:?}", header);
 
@@ -207,14 +214,21 @@ impl Subscribed {
 		Ok(())
 	}
 
-	async fn serve_groups(&mut self, mut groups: serve::GroupsReader) -> Result<(), SessionError> {
+	async fn serve_groups(&mut self, mut groups: serve::GroupsReader, tracer: Tracer) -> Result<(), SessionError> {
 		let mut tasks = FuturesUnordered::new();
 		let mut done: Option<Result<(), ServeError>> = None;
+		let mut last_group: Option<u64> = None;
 
 		loop {
 			tokio::select! {
 				res = groups.next(), if done.is_none() => match res {
 					Ok(Some(group)) => {
+						// Only the latest group is handed out, the ones in between were too old by the time we got here.
+						if let Some(last) = last_group.filter(|last| group.group_id > last + 1) {
+							tracer.record(Event::Skip, last + 1, group.group_id - last - 1, 0, 0);
+						}
+						last_group = Some(group.group_id);
+
 						let header = data::GroupHeader {
 							subscribe_id: self.msg.id,
 							track_alias: self.msg.track_alias,
@@ -225,9 +239,10 @@ impl Subscribed {
 						let publisher = self.publisher.clone();
 						let state = self.state.clone();
 						let info = group.info.clone();
+						let tracer = tracer.clone();
 
 						tasks.push(async move {
-							if let Err(err) = Self::serve_group(header, group, publisher, state).await {
+							if let Err(err) = Self::serve_group(header, group, publisher, state, tracer).await {
 								log::warn!("failed to serve group: {:?}, error: {}", info, err);
 							}
 						});
@@ -247,6 +262,7 @@ impl Subscribed {
 		mut group: serve::GroupReader,
 		mut publisher: Publisher,
 		state: State<SubscribedState>,
+		tracer: Tracer,
 	) -> Result<(), SessionError> {
 		let mut stream = publisher.open_uni().await?;
 
@@ -261,6 +277,11 @@ impl Subscribed {
 		log::trace!("sent group: {:?}", header);
 
 		while let Some(mut object) = group.next().await? {
+			// len() locks the group, only for a sink
+			tracer.record_queued(Event::Dequeue, group.group_id, object.object_id, object.size, || {
+				group.len() - group.pos()
+			});
+
 			let header = data::GroupObject {
 				object_id: object.object_id,
 				size: object.size,
@@ -268,6 +289,7 @@ impl Subscribed {
 			};
 
 			writer.encode(&header).await?;
+			tracer.record(Event::Send, group.group_id, object.object_id, object.size, 0);
 
 			state
 				.lock_mut()
@@ -287,7 +309,11 @@ impl Subscribed {
 		Ok(())
 	}
 
-	pub async fn serve_objects(&mut self, mut objects: serve::ObjectsReader) -> Result<(), SessionError> {
+	pub async fn serve_objects(
+		&mut self,
+		mut objects: serve::ObjectsReader,
+		tracer: Tracer,
+	) -> Result<(), SessionError> {
 		let mut tasks = FuturesUnordered::new();
 		let mut done = None;
 
@@ -308,9 +334,10 @@ impl Subscribed {
 						let publisher = self.publisher.clone();
 						let state = self.state.clone();
 						let info = object.info.clone();
+						let tracer = tracer.clone();
 
 						tasks.push(async move {
-							if let Err(err) = Self::serve_object(header, object, publisher, state).await {
+							if let Err(err) = Self::serve_object(header, object, publisher, state, tracer).await {
 								log::warn!("failed to serve object: {:?}, error: {}", info, err);
 							};
 						});
@@ -330,7 +357,10 @@ impl Subscribed {
 		mut object: serve::ObjectReader,
 		mut publisher: Publisher,
 		state: State<SubscribedState>,
+		tracer: Tracer,
 	) -> Result<(), SessionError> {
+		tracer.record(Event::Dequeue, object.group_id, object.object_id, 0, 0);
+
 		state
 			.lock_mut()
 			.ok_or(ServeError::Done)?
@@ -345,6 +375,7 @@ impl Subscribed {
 
 		let header: data::Header = header.into();
 		writer.encode(&header).await?;
+		tracer.record(Event::Send, object.group_id, object.object_id, 0, 0);
 
 		log::trace!("sent object: {:?}", header);
 
@@ -358,8 +389,20 @@ impl Subscribed {
 		Ok(())
 	}
 
-	async fn serve_datagrams(&mut self, mut datagrams: serve::DatagramsReader) -> Result<(), SessionError> {
+	async fn serve_datagrams(
+		&mut self,
+		mut datagrams: serve::DatagramsReader,
+		tracer: Tracer,
+	) -> Result<(), SessionError> {
 		while let Some(datagram) = datagrams.read().await? {
+			tracer.record(
+				Event::Dequeue,
+				datagram.group_id,
+				datagram.object_id,
+				datagram.payload.len(),
+				0,
+			);
+
 			let datagram = data::Datagram {
 				subscribe_id: self.msg.id,
 				track_alias: self.msg.track_alias,
@@ -374,6 +417,13 @@ impl Subscribed {
 			datagram.encode(&mut buffer)?;
 
 			self.publisher.send_datagram(buffer.into()).await?;
+			tracer.record(
+				Event::Send,
+				datagram.group_id,
+				datagram.object_id,
+				datagram.payload.len(),
+				0,
+			);
 			log::trace!("sent datagram: {:?}", datagram);
 
 			self.state
@@ -10,6 +10,7 @@ use crate::{
 	message::{self, Message},
 	serve::{self, ServeError},
 	setup,
+	trace::{Event, Tracer},
 };
 
 use crate::watch::Queue;
@@ -184,27 +185,33 @@ impl Subscriber {
 			Object(serve::ObjectWriter),
 		}
 
-		let writer = {
+		let (writer, tracer) = {
 			let mut subscribes = self.subscribes.lock().unwrap();
 			let subscribe = subscribes.get_mut(&id).ok_or(ServeError::NotFound)?;
 
-			match header {
+			let writer = match header {
 				data::Header::Track(track) => Writer::Track(subscribe.track(track)?),
 				data::Header::Group(group) => Writer::Group(subscribe.group(group)?),
 				data::Header::Object(object) => Writer::Object(subscribe.object(object)?),
-			}
+			};
+
+			(writer, subscribe.tracer.clone())
 		};
 
 		match writer {
-			Writer::Track(track) => Self::recv_track(track, reader).await?,
-			Writer::Group(group) => Self::recv_group(group, reader).await?,
-			Writer::Object(object) => Self::recv_object(object, reader).await?,
+			Writer::Track(track) => Self::recv_track(track, reader, tracer).await?,
+			Writer::Group(group) => Self::recv_group(group, reader, tracer).await?,
+			Writer::Object(object) => Self::recv_object(object, reader, tracer).await?,
 		};
 
 		Ok(())
 	}
 
-	async fn recv_track(mut track: serve::StreamWriter, mut reader: Reader) -> Result<(), SessionError> {
+	async fn recv_track(
+		mut track: serve::StreamWriter,
+		mut reader: Reader,
+		tracer: Tracer,
+	) -> Result<(), SessionError> {
 		log::trace!("received track: {:?}", track.info);
 
 		let mut prev: Option<serve::StreamGroupWriter> = None;
@@ -218,6 +225,7 @@ impl Subscriber {
 			};
 
 			let mut object = group.create(chunk.size)?;
+			tracer.record(Event::Receive, object.group_id, object.object_id, chunk.size, 0);
 
 			let mut remain = chunk.size;
 			while remain > 0 {
@@ -234,7 +242,7 @@ impl Subscriber {
 		Ok(())
 	}
 
-	async fn recv_group(mut group: serve::GroupWriter, mut reader: Reader) -> Result<(), SessionError> {
+	async fn recv_group(mut group: serve::GroupWriter, mut reader: Reader, tracer: Tracer) -> Result<(), SessionError> {
 		log::trace!("received group: {:?}", group.info);
 
 		while !reader.done().await? {
@@ -243,6 +251,7 @@ impl Subscriber {
 			log::trace!("received group object: {:?}", object);
 			let mut remain = object.size;
 			let mut object = group.create(object.size)?;
+			tracer.record(Event::Receive, object.group_id, object.object_id, remain, 0);
 
 			while remain > 0 {
 				let data = reader.read_chunk(remain).await?.ok_or(SessionError::WrongSize)?;
@@ -255,8 +264,13 @@ impl Subscriber {
 		Ok(())
 	}
 
-	async fn recv_object(mut object: serve::ObjectWriter, mut reader: Reader) -> Result<(), SessionError> {
+	async fn recv_object(
+		mut object: serve::ObjectWriter,
+		mut reader: Reader,
+		tracer: Tracer,
+	) -> Result<(), SessionError> {
 		log::trace!("received object: {:?}", object.info);
+		tracer.record(Event::Receive, object.group_id, object.object_id, 0, 0);
 
 		while let Some(data) = reader.read_chunk(usize::MAX).await? {
 			log::trace!("received object payload: {:?}", data.len());
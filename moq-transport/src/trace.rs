@@ -0,0 +1,152 @@
+//! Optional per-object events, to see where in a chain of relays the latency comes from.
+//!
+//! Nothing is recorded until an application installs a sink with [set_sink].
+//! The sessions resolve a [Tracer] once per subscription with [tracer], which is empty without a sink,
+//! so every object then costs a branch on an `Option` and, with a sink, a call into the track's [TrackSink].
+//! Whether to take a timestamp and what to do with it is up to the sink.
+use std::sync::{Arc, OnceLock};
+
+#[derive(Clone, Copy, Debug, PartialEq, Eq)]
+pub enum Event {
+	/// The object's header was read from an upstream stream or datagram.
+	Receive,
+	/// A downstream subscription took the object from the track.
+	Dequeue,
+	/// The object's header was written to a downstream stream or datagram.
+	Send,
+	/// A downstream subscription jumped over groups it was too slow for,
+	/// `group_id` is the first one skipped and `object_id` how many.
+	Skip,
+}
+
+impl Event {
+	pub fn as_str(&self) -> &'static str {
+		match self {
+			Event::Receive => "recv",
+			Event::Dequeue => "deq",
+			Event::Send => "send",
+			Event::Skip => "skip",
+		}
+	}
+}
+
+/// Gets the events of the objects of one track.
+/// It is called on the hot path and should only count or hand the event off, e.g. to a bounded channel.
+pub trait TrackSink: Send + Sync {
+	/// `size` is the payload size, 0 when it is not known before the payload is read.
+	/// `queued` is, on dequeue, the objects of the group still waiting behind this one for the same subscription.
+	fn record(&self, event: Event, group_id: u64, object_id: u64, size: usize, queued: usize);
+}
+
+pub trait Sink: Send + Sync {
+	/// The sink of a track, called once for every subscription to it. None leaves the track out.
+	fn track(&self, namespace: &str, name: &str) -> Option<Arc<dyn TrackSink>>;
+}
+
+static SINK: OnceLock<Box<dyn Sink>> = OnceLock::new();
+
+/// Installs the sink for the whole process, returns false if there already is one.
+pub fn set_sink<S: Sink + 'static>(sink: S) -> bool {
+	SINK.set(Box::new(sink)).is_ok()
+}
+
+pub fn enabled() -> bool {
+	SINK.get().is_some()
+}
+
+/// The tracer of a track, resolved from the installed sink.
+pub fn tracer(namespace: &str, name: &str) -> Tracer {
+	Tracer {
+		sink: SINK.get().and_then(|sink| sink.track(namespace, name)),
+	}
+}
+
+/// Records the events of one track, cheap to clone and a no-op without a sink.
+#[derive(Clone, Default)]
+pub struct Tracer {
+	sink: Option<Arc<dyn TrackSink>>,
+}
+
+impl Tracer {
+	#[inline]
+	pub fn record(&self, event: Event, group_id: u64, object_id: u64, size: usize, queued: usize) {
+		if let Some(sink) = &self.sink {
+			sink.record(event, group_id, object_id, size, queued);
+		}
+	}
+
+	/// Like [Tracer::record], for a `queued` that is only worth computing with a sink, e.g. one taking a lock.
+	#[inline]
+	pub fn record_queued<F: FnOnce() -> usize>(
+		&self,
+		event: Event,
+		group_id: u64,
+		object_id: u64,
+		size: usize,
+		queued: F,
+	) {
+		if let Some(sink) = &self.sink {
+			sink.record(event, group_id, object_id, size, queued());
+		}
+	}
+}
+
+#[cfg(test)]
+mod tests {
+	use super::*;
+	use std::sync::atomic::{AtomicU64, Ordering};
+
+	#[derive(Default)]
+	struct Count(AtomicU64);
+
+	impl TrackSink for Count {
+		fn record(&self, _event: Event, _group_id: u64, _object_id: u64, size: usize, _queued: usize) {
+			self.0.fetch_add(size as u64, Ordering::Relaxed);
+		}
+	}
+
+	struct Only(Arc<Count>);
+
+	impl Sink for Only {
+		fn track(&self, namespace: &str, _name: &str) -> Option<Arc<dyn TrackSink>> {
+			(namespace == "traced").then(|| self.0.clone() as Arc<dyn TrackSink>)
+		}
+	}
+
+	// The sink is process wide, so this is the one test installing it.
+	#[test]
+	fn per_track_sink() {
+		let count = Arc::new(Count::default());
+		let before = tracer("traced", "now");
+		before.record(Event::Receive, 0, 0, 1, 0);
+
+		assert!(set_sink(Only(count.clone())));
+		assert!(!set_sink(Only(count.clone())));
+		assert!(enabled());
+
+		tracer("traced", "now").record(Event::Receive, 0, 0, 10, 0);
+		tracer("other", "now").record(Event::Receive, 0, 0, 100, 0);
+		// Resolved before the sink was there, stays off.
+		before.record(Event::Receive, 0, 1, 1000, 0);
+
+		assert_eq!(count.0.load(Ordering::Relaxed), 10);
+	}
+
+	#[test]
+	fn queued_only_with_sink() {
+		let off = Tracer::default();
+		off.record_queued(Event::Dequeue, 0, 0, 1, || panic!("queued computed without a sink"));
+
+		let count = Arc::new(Count::default());
+		let on = Tracer {
+			sink: Some(count.clone()),
+		};
+		let mut calls = 0;
+		on.record_queued(Event::Dequeue, 0, 0, 10, || {
+			calls += 1;
+			3
+		});
+		assert_eq!(calls, 1);
+		assert_eq!(count.0.load(Ordering::Relaxed), 10);
+	}
+}
@@ -0,0 +1,128 @@
+"""
+Interface counters of the mininet hosts, taken from /proc/net/dev.
+
+When one network is reused for several repetitions the counters keep
+growing, so every repetition works with the delta to a snapshot taken at
+its start instead of the absolute values.
+"""
+
+import threading
+from time import monotonic
+
+import numpy as np
+
+# the columns of /proc/net/dev after the interface name
+FIELDS = [
+    'rx_bytes', 'rx_packets', 'rx_errs', 'rx_drop', 'rx_fifo', 'rx_frame', 'rx_compressed', 'rx_multicast',
+    'tx_bytes', 'tx_packets', 'tx_errs', 'tx_drop', 'tx_fifo', 'tx_colls', 'tx_carrier', 'tx_compressed',
+]
+TX_BYTES = FIELDS.index('tx_bytes')
+TX_PACKETS = FIELDS.index('tx_packets')
+
+
+def parse_net_dev(text):
+    counters = {}
+    for line in text.splitlines():
+        if ':' not in line:
+            continue
+        name, values = line.split(':', 1)
+        values = values.split()
+        if len(values) != len(FIELDS):
+            continue
+        counters[name.strip()] = [int(value) for value in values]
+    return counters
+
+
+def read_net_dev(host):
+    # we need to exec this, because otherwise all of the outputs after starting the host will be displayed for the following command
+    host.cmd("echo clean")
+    return parse_net_dev(host.cmd('cat /proc/net/dev'))
+
+
+def delta(before, after):
+    counters = {}
+    for name, values in after.items():
+        old = before.get(name, [0] * len(FIELDS))
+        # a counter that went backwards belongs to a recreated interface, take it from zero
+        counters[name] = [new - prev if new >= prev else new for new, prev in zip(values, old)]
+    return counters
+
+
+def format_net_dev(counters):
+    return '\n'.join(f"{name}: {' '.join(str(value) for value in values)}" for name, values in counters.items())
+
+
+# what the sampler keeps of every interface
+SAMPLED = [FIELDS.index(name) for name in ('rx_bytes', 'rx_packets', 'tx_bytes', 'tx_packets')]
+
+
+class NetSampler:
+    """
+    Snapshots the interface counters of some hosts every interval seconds in a thread.
+
+    /proc/<pid>/net/dev of a host's shell shows its namespace, so the sampler
+    reads it directly and never goes through host.cmd(), which the trial
+    itself is using at the same time. The result is a time x interface x
+    (rx_bytes, rx_packets, tx_bytes, tx_packets) matrix.
+    """
+
+    def __init__(self, hosts, interval=0.1, skip=('lo',)):
+        self.pids = {host.name: host.pid for host in hosts}
+        self.interval = interval
+        self.skip = skip
+        self.interfaces = None
+        self.times = []
+        self.rows = []
+        self.stopping = threading.Event()
+        self.thread = threading.Thread(target=self._run, name='net-sampler', daemon=True)
+
+    def _snapshot(self):
+        counters = {}
+        for name, pid in self.pids.items():
+            try:
+                with open(f'/proc/{pid}/net/dev', 'r') as file:
+                    text = file.read()
+            except OSError:
+                continue
+            for iface, values in parse_net_dev(text).items():
+                if iface not in self.skip:
+                    counters[f"{name}:{iface}"] = [values[i] for i in SAMPLED]
+        return counters
+
+    def _run(self):
+        start = monotonic()
+        while not self.stopping.is_set():
+            counters = self._snapshot()
+            if self.interfaces is None:
+                # the links are all up before the sampler starts, the set doesn't change
+                self.interfaces = sorted(counters)
+            self.times.append(monotonic() - start)
+            self.rows.append([counters.get(iface, [0] * len(SAMPLED)) for iface in self.interfaces])
+            self.stopping.wait(self.interval)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.stopping.set()
+        self.thread.join()
+        return self
+
+    def matrix(self):
+        """times (T,), interface names (I,), counters (T, I, 4)"""
+        counters = np.array(self.rows, dtype=np.int64).reshape(len(self.rows), len(self.interfaces or []), len(SAMPLED))
+        return np.array(self.times), list(self.interfaces or []), counters
+
+    def rates(self):
+        """Per second rates between the samples, (T-1, I, 4)"""
+        times, _, counters = self.matrix()
+        if len(times) < 2:
+            return np.zeros((0,) + counters.shape[1:])
+        return np.diff(counters, axis=0) / np.diff(times)[:, None, None]
+
+    def save(self, path):
+        times, interfaces, counters = self.matrix()
+        np.savez_compressed(path, times=times, interfaces=np.array(interfaces), counters=counters,
+                            fields=np.array([FIELDS[i] for i in SAMPLED]))
+        return path
@@ -0,0 +1,162 @@
+"""
+CPU and memory of the relays and clients, sampled from /proc during a trial.
+
+The processes are found below roots, the shells of the relay hosts (the
+relays are started with cmd(... &) in them) and the clients of the
+launcher, so a parallel trial never picks up the processes of another one.
+Of every moq-relay, moq-clock, moq-sub, moq-pub, gst-launch and ffmpeg the
+profiler keeps the cpu time (utime+stime), the RSS, the voluntary and
+involuntary context switches and the thread count, and summarize() turns
+them into average and peak cpu %, max RSS and switch counts.
+"""
+
+import os
+import threading
+from time import monotonic
+
+HZ = os.sysconf('SC_CLK_TCK')
+# comm is cut to 15 characters by the kernel
+WATCHED = ('moq-relay', 'moq-clock', 'moq-sub', 'moq-pub', 'gst-launch-1.0', 'ffmpeg')
+
+
+def parse_stat(text):
+    """(comm, ppid, utime+stime in ticks, threads) of a /proc/<pid>/stat line."""
+    # the comm may have spaces and parentheses, it ends at the last ')'
+    comm = text[text.index('(') + 1:text.rindex(')')]
+    rest = text[text.rindex(')') + 2:].split()
+    return comm, int(rest[1]), int(rest[11]) + int(rest[12]), int(rest[17])
+
+
+def read_stat(pid):
+    with open(f'/proc/{pid}/stat', 'r') as file:
+        return parse_stat(file.read())
+
+
+def parse_status(lines):
+    """(VmRSS in kB, voluntary, involuntary context switches) of /proc/<pid>/status."""
+    values = {}
+    for line in lines:
+        name, _, value = line.partition(':')
+        if name in ('VmRSS', 'voluntary_ctxt_switches', 'nonvoluntary_ctxt_switches'):
+            values[name] = int(value.split()[0])
+    return values.get('VmRSS', 0), values.get('voluntary_ctxt_switches', 0), values.get('nonvoluntary_ctxt_switches', 0)
+
+
+def read_status(pid):
+    with open(f'/proc/{pid}/status', 'r') as file:
+        return parse_status(file)
+
+
+def children_map():
+    children = {}
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            _, ppid, _, _ = read_stat(entry)
+        except (OSError, ValueError, IndexError):
+            continue
+        children.setdefault(ppid, []).append(int(entry))
+    return children
+
+
+class Process:
+    def __init__(self, label, pid, comm, now, cpu):
+        self.label = label
+        self.pid = pid
+        self.comm = comm
+        self.first = (now, cpu)
+        self.last = (now, cpu)
+        self.peak = 0.0
+        self.rss = 0
+        self.switches = None
+        self.first_switches = None
+        self.threads = 0
+
+    def sample(self, now, cpu, rss, switches, threads):
+        then, before = self.last
+        if now > then:
+            self.peak = max(self.peak, (cpu - before) / HZ / (now - then) * 100)
+        self.last = (now, cpu)
+        self.rss = max(self.rss, rss)
+        if self.first_switches is None:
+            self.first_switches = switches
+        self.switches = switches
+        self.threads = max(self.threads, threads)
+
+    def summary(self):
+        seconds = self.last[0] - self.first[0]
+        cpu = (self.last[1] - self.first[1]) / HZ
+        switches = self.switches or (0, 0)
+        first_switches = self.first_switches or (0, 0)
+        return {
+            'label': self.label, 'comm': self.comm, 'pid': self.pid, 'seconds': seconds,
+            'cpu_pct': cpu / seconds * 100 if seconds > 0 else 0.0, 'cpu_peak_pct': self.peak,
+            'rss_max_mb': self.rss / 1024, 'threads_max': self.threads,
+            'voluntary_switches': switches[0] - first_switches[0],
+            'involuntary_switches': switches[1] - first_switches[1],
+        }
+
+
+class ProcProfiler:
+    def __init__(self, roots, interval=0.5):
+        # roots() gives {label: pid} and is asked on every sample, clients come and go
+        self.roots = roots
+        self.interval = interval
+        self.processes = {}
+        self.stopping = threading.Event()
+        self.thread = threading.Thread(target=self._run, name='proc-profiler', daemon=True)
+
+    def _watched(self):
+        children = children_map()
+        found = {}
+        for label, root in self.roots().items():
+            stack = [root]
+            while stack:
+                pid = stack.pop()
+                stack += children.get(pid, [])
+                found.setdefault(pid, label)
+        return found
+
+    def _sample(self):
+        now = monotonic()
+        for pid, label in self._watched().items():
+            try:
+                comm, _, cpu, threads = read_stat(pid)
+                if comm not in WATCHED:
+                    continue
+                rss, voluntary, involuntary = read_status(pid)
+            except (OSError, ValueError, IndexError):
+                # gone in the meantime
+                continue
+            process = self.processes.get(pid)
+            if process is None or process.comm != comm:
+                process = self.processes[pid] = Process(label, pid, comm, now, cpu)
+            process.sample(now, cpu, rss, (voluntary, involuntary), threads)
+
+    def _run(self):
+        while not self.stopping.is_set():
+            self._sample()
+            self.stopping.wait(self.interval)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.stopping.set()
+        self.thread.join()
+        return self
+
+    def summarize(self):
+        return [process.summary() for process in self.processes.values()]
+
+    def save(self, path):
+        rows = self.summarize()
+        names = ['label', 'comm', 'pid', 'seconds', 'cpu_pct', 'cpu_peak_pct', 'rss_max_mb', 'threads_max',
+                 'voluntary_switches', 'involuntary_switches']
+        with open(path, 'w') as file:
+            file.write(';'.join(names) + '\n')
+            for row in rows:
+                file.write(';'.join(f"{row[name]:.2f}" if isinstance(row[name], float) else str(row[name]) for name in names) + '\n')
+        return path
@@ -0,0 +1,143 @@
+"""
+Readiness probes for the trial lifecycle.
+
+Instead of sleeping a fixed amount between the steps of a trial, every step
+is a stage that polls a probe until it is ready. The time each stage took is
+logged, and a stage that doesn't get ready in time raises StageTimeout.
+"""
+
+import os
+import re
+import subprocess
+from time import monotonic, sleep
+
+
+class StageTimeout(RuntimeError):
+    pass
+
+
+class Sequencer:
+    def __init__(self, timeout=30.0, poll=0.05, log=print):
+        self.timeout = timeout
+        self.poll = poll
+        self.log = log
+        self.stages = {}
+
+    def stage(self, name, *probes, timeout=None):
+        """Block until every probe returns something truthy."""
+        timeout = self.timeout if timeout is None else timeout
+        start = monotonic()
+        waiting = list(probes)
+        while True:
+            waiting = [probe for probe in waiting if not probe()]
+            elapsed = monotonic() - start
+            if not waiting:
+                break
+            if elapsed > timeout:
+                self.stages[name] = elapsed
+                raise StageTimeout(f"stage {name} not ready after {elapsed:.1f}s, still waiting for {waiting}")
+            sleep(self.poll)
+        self.stages[name] = elapsed
+        self.log(f"** stage {name} ready after {elapsed:.2f}s")
+        return elapsed
+
+    def summary(self):
+        return ' '.join(f"{name}={elapsed:.2f}s" for name, elapsed in self.stages.items())
+
+
+class Probe:
+    def __init__(self, what, check=None):
+        self.what = what
+        if check is not None:
+            self.check = check
+
+    def __call__(self):
+        return self.check()
+
+    def __repr__(self):
+        return self.what
+
+
+def tcp_listening(host, port):
+    # ss in the namespace of the host, nothing is sent to the server itself
+    return Probe(f"{host.name} tcp :{port}", lambda: host.cmd(f'ss -Hltn "sport = :{port}"').strip() != '')
+
+
+def udp_listening(host, port):
+    # the relay's quic endpoint, a bound udp socket means it is accepting
+    return Probe(f"{host.name} udp :{port}", lambda: host.cmd(f'ss -Hlun "sport = :{port}"').strip() != '')
+
+
+def origin_announced(api, api_url, track, relayid=None):
+    # the relay registers the origin at the api as soon as the publisher's announce arrives
+    path = f"origin/{track}" if relayid is None else f"origin/{relayid}/{track}"
+
+    def check():
+        out = api.cmd(f"curl -s -o /dev/null -w 'HTTP%{{http_code}}\\n' {api_url}/{path}")
+        return 'HTTP200' in out
+
+    return Probe(f"announce of {track}", check)
+
+
+def no_process(pattern):
+    def check():
+        return subprocess.run(['pgrep', '-f', pattern], stdout=subprocess.DEVNULL).returncode != 0
+
+    return Probe(f"no {pattern} running", check)
+
+
+CLOCK_LINE = re.compile(rb'^(?:-?\d+|ns group=[^\n]*)\s*$', re.MULTILINE)
+GST_LINE = re.compile(rb'Latency: \d+')
+
+
+class FileProbe(Probe):
+    """Ready once the (growing) file contains count matches, only new bytes are read."""
+
+    def __init__(self, path, pattern, count=1):
+        super().__init__(f"{count} objects in {path}" if count > 1 else f"first object in {path}")
+        self.path = path
+        self.pattern = pattern
+        self.count = count
+        self.seen = 0
+        self.offset = 0
+        self.rest = b''
+
+    def check(self):
+        if not os.path.exists(self.path):
+            return False
+        with open(self.path, 'rb') as file:
+            file.seek(self.offset)
+            chunk = file.read()
+        self.offset += len(chunk)
+        # only complete lines, so a half written number doesn't count
+        data = self.rest + chunk
+        cut = data.rfind(b'\n') + 1
+        self.rest = data[cut:]
+        self.seen += len(self.pattern.findall(data[:cut]))
+        return self.seen >= self.count
+
+
+def first_object(path, mode):
+    return FileProbe(path, GST_LINE if mode == 'gst' else CLOCK_LINE)
+
+
+def samples(path, mode, count):
+    return FileProbe(path, GST_LINE if mode == 'gst' else CLOCK_LINE, count)
+
+
+class QuietProbe(Probe):
+    """Ready once none of the files grew for a while, i.e. the clients drained."""
+
+    def __init__(self, paths, quiet=0.5):
+        super().__init__(f"quiet {paths}")
+        self.paths = paths
+        self.quiet = quiet
+        self.sizes = None
+        self.since = monotonic()
+
+    def check(self):
+        sizes = [os.path.getsize(path) if os.path.exists(path) else 0 for path in self.paths]
+        if sizes != self.sizes:
+            self.sizes = sizes
+            self.since = monotonic()
+        return monotonic() - self.since >= self.quiet
@@ -0,0 +1,142 @@
+"""
+Scrapes a relay's /metrics during a trial.
+
+The relays only showed up in the results as /proc/net/dev counters and
+through what the subscribers got. With --dev a relay serves prometheus text
+on https://<its address>:4443/metrics (sessions, subscriptions, announces,
+api lookups and, only with --metrics, per track objects and bytes in and out,
+queue depth and groups skipped for slow subscriptions). With RELAY_METRICS_MS
+good-try.py starts its relays with --metrics and one of these in every
+relay's namespace through the launcher, so they all scrape at the same time,
+every `interval` seconds and once more on SIGTERM. Every scrape is a json
+line {t, ms, metrics: {'name{labels}': value}}.
+
+    python3 relay_metrics.py --url https://10.3.0.1:4443/metrics --interval 0.5
+
+summarize() reads such a file back, fanout() adds the relays up per track.
+"""
+
+import argparse
+import json
+import re
+import signal
+import ssl
+import sys
+import threading
+import time
+import urllib.request
+
+SAMPLE = re.compile(r'^([a-zA-Z_:][\w:]*)(\{.*\})?\s+(\S+)$')
+LABEL = re.compile(r'(\w+)="((?:[^"\\]|\\.)*)"')
+# the relay escapes \, " and newlines in the label values
+ESCAPE = re.compile(r'\\(.)')
+
+
+def parse(text):
+    """{'name{labels}': value} of the prometheus text, comments skipped."""
+    values = {}
+    for line in text.splitlines():
+        match = SAMPLE.match(line.strip())
+        if match:
+            name, labels, value = match.groups()
+            values[name + (labels or '')] = float(value)
+    return values
+
+
+def split(key):
+    """'name{a="1",b="2"}' to ('name', {'a': '1', 'b': '2'})"""
+    name, _, labels = key.partition('{')
+    return name, {label: ESCAPE.sub(lambda m: '\n' if m.group(1) == 'n' else m.group(1), value)
+                  for label, value in LABEL.findall(labels)}
+
+
+def scrape(url, context, timeout=2.0):
+    start = time.perf_counter()
+    record = {'t': time.time()}
+    try:
+        with urllib.request.urlopen(url, context=context, timeout=timeout) as response:
+            record['metrics'] = parse(response.read().decode())
+    except OSError as e:
+        record['error'] = str(e)
+    record['ms'] = (time.perf_counter() - start) * 1000
+    return record
+
+
+def poll(url, interval, out):
+    stopping = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stopping.set())
+    signal.signal(signal.SIGINT, lambda *_: stopping.set())
+    # the relays' dev certificate isn't for their addresses
+    context = ssl.create_default_context()
+    context.check_hostname = False
+    context.verify_mode = ssl.CERT_NONE
+    while True:
+        last = stopping.is_set()
+        out.write(json.dumps(scrape(url, context)) + '\n')
+        out.flush()
+        if last:
+            break
+        stopping.wait(interval)
+
+
+def summarize(path):
+    """The last scrape's metrics, the peaks of the gauges over all scrapes and the failed scrapes."""
+    last = {}
+    peaks = {}
+    errors = 0
+    with open(path, 'r') as file:
+        for line in file:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if 'metrics' not in record:
+                errors += 1
+                continue
+            last = record['metrics']
+            for key, value in last.items():
+                if not split(key)[0].endswith('_total'):
+                    peaks[key] = max(peaks.get(key, value), value)
+    return {'last': last, 'peaks': peaks, 'errors': errors}
+
+
+def fanout(summaries):
+    """{namespace: {'objects_in', 'objects_out', 'bytes_in', 'bytes_out', 'queue_max', 'groups_dropped'}} over all relays."""
+    tracks = {}
+    for summary in summaries.values():
+        for key, value in summary['last'].items():
+            name, labels = split(key)
+            if 'namespace' not in labels:
+                continue
+            track = tracks.setdefault(labels['namespace'], {'objects_in': 0.0, 'objects_out': 0.0, 'bytes_in': 0.0,
+                                                            'bytes_out': 0.0, 'queue_max': 0.0, 'groups_dropped': 0.0})
+            column = {'moq_relay_objects_received_total': 'objects_in', 'moq_relay_objects_sent_total': 'objects_out',
+                      'moq_relay_bytes_received_total': 'bytes_in', 'moq_relay_bytes_sent_total': 'bytes_out',
+                      'moq_relay_groups_dropped_total': 'groups_dropped'}.get(name)
+            if column:
+                track[column] += value
+            elif name == 'moq_relay_queue_depth_max':
+                track['queue_max'] = max(track['queue_max'], value)
+    return tracks
+
+
+def report(summaries):
+    lines = ["relay;sessions max;subscriptions max;api lookups;api lookup ms;objects in;objects out;bytes out;queue max;groups dropped;scrape errors"]
+    for relay, summary in sorted(summaries.items()):
+        last, peaks = summary['last'], summary['peaks']
+        lookups = last.get('moq_relay_api_lookups_total', 0)
+        lookup_ms = last.get('moq_relay_api_lookup_microseconds_total', 0) / 1000 / lookups if lookups else 0.0
+        per_track = fanout({relay: summary})
+        lines.append(f"{relay};{peaks.get('moq_relay_sessions', 0):.0f};{peaks.get('moq_relay_subscriptions', 0):.0f};{lookups:.0f};{lookup_ms:.2f};"
+                     f"{sum(t['objects_in'] for t in per_track.values()):.0f};{sum(t['objects_out'] for t in per_track.values()):.0f};"
+                     f"{sum(t['bytes_out'] for t in per_track.values()):.0f};{max([t['queue_max'] for t in per_track.values()], default=0):.0f};"
+                     f"{sum(t['groups_dropped'] for t in per_track.values()):.0f};{summary['errors']}")
+    return '\n'.join(lines) + '\n'
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Scrape a relay's /metrics")
+    parser.add_argument('--url', type=str, required=True)
+    parser.add_argument('--interval', type=float, default=0.5)
+    args = parser.parse_args()
+    poll(args.url, args.interval, sys.stdout)
@@ -0,0 +1,131 @@
+"""
+SQLite store of the trial results.
+
+Every subscriber of every trial is one row in `runs`, keyed by the trial
+time, topo, api, mode, track, host and the build hash of the binaries, with
+the same numbers the enddelays_<hour>.txt line has. Its per-frame latencies
+and frame-ids go next to it into `frames` as two int64 columns, so comparing
+sweeps is a query instead of globbing and parsing the measurement files.
+
+    store = ResultsStore()
+    store.aggregate(['topo', 'api'], mode='clock')
+"""
+
+import sqlite3
+import time
+
+import numpy as np
+
+DB = 'measurements/results.sqlite'
+
+# the key of a run first, then its numbers
+COLUMNS = [
+    ('trial_time', 'TEXT'), ('topo', 'TEXT'), ('api', 'TEXT'), ('mode', 'TEXT'),
+    ('track', 'TEXT'), ('host', 'TEXT'), ('build_hash', 'TEXT'), ('slot', 'INTEGER'),
+    ('average', 'REAL'), ('std', 'REAL'), ('median', 'REAL'), ('p99', 'REAL'),
+    ('baseline', 'REAL'), ('above_baseline', 'REAL'), ('frames', 'INTEGER'), ('ending_time', 'TEXT'),
+    ('cost', 'REAL'), ('tx_bytes', 'REAL'), ('tx_packets', 'REAL'), ('created', 'REAL'),
+    ('relay_cpu_max', 'REAL'), ('client_cpu', 'REAL'), ('relay_rss_max', 'REAL'),
+    ('api_ms', 'REAL'), ('api_p99_ms', 'REAL'), ('tree_changes', 'INTEGER'),
+    ('relay_objects_out', 'REAL'), ('relay_bytes_out', 'REAL'), ('relay_queue_max', 'REAL'), ('groups_dropped', 'REAL'),
+    ('api_lookups', 'REAL'), ('virtual_subs', 'INTEGER'), ('starved_subs', 'INTEGER'), ('sub_p99_max', 'REAL'),
+    ('warmup', 'INTEGER'), ('skew_p99', 'REAL'), ('lost_frames', 'INTEGER'),
+]
+KEY = ['trial_time', 'topo', 'api', 'mode', 'track', 'host', 'build_hash']
+NUMBERS = ['average', 'std', 'median', 'p99', 'baseline', 'above_baseline', 'frames', 'cost', 'tx_bytes', 'tx_packets',
+           'relay_cpu_max', 'client_cpu', 'relay_rss_max', 'api_ms', 'api_p99_ms', 'tree_changes',
+           'relay_objects_out', 'relay_bytes_out', 'relay_queue_max', 'groups_dropped', 'api_lookups',
+           'virtual_subs', 'starved_subs', 'sub_p99_max', 'warmup', 'skew_p99', 'lost_frames']
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    {', '.join(f'{name} {kind}' for name, kind in COLUMNS)},
+    UNIQUE ({', '.join(KEY)})
+);
+CREATE INDEX IF NOT EXISTS runs_config ON runs (topo, api, mode);
+CREATE INDEX IF NOT EXISTS runs_track ON runs (track, host);
+CREATE INDEX IF NOT EXISTS runs_time ON runs (trial_time);
+CREATE TABLE IF NOT EXISTS frames (
+    run_id INTEGER PRIMARY KEY REFERENCES runs (id) ON DELETE CASCADE,
+    latency BLOB,
+    frame BLOB
+);
+"""
+
+
+class ResultsStore:
+    def __init__(self, path=DB):
+        # parallel trials write to the same file, sqlite waits for the lock
+        self.db = sqlite3.connect(path, timeout=60)
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.execute('PRAGMA foreign_keys=ON')
+        self.db.executescript(SCHEMA)
+        # stores from before a column was added get it now, empty for the old runs
+        existing = {row[1] for row in self.db.execute('PRAGMA table_info(runs)')}
+        for name, kind in COLUMNS:
+            if name not in existing:
+                self.db.execute(f'ALTER TABLE runs ADD COLUMN {name} {kind}')
+
+    def add_run(self, latency=None, frame=None, **values):
+        """Inserts (or replaces) one run, latency and frame are the per-frame arrays."""
+        values.setdefault('created', time.time())
+        names = [name for name, _ in COLUMNS if name in values]
+        with self.db:
+            cursor = self.db.execute(
+                f"INSERT OR REPLACE INTO runs ({', '.join(names)}) VALUES ({', '.join('?' * len(names))})",
+                [values[name] for name in names])
+            run_id = cursor.lastrowid
+            if latency is not None:
+                self.db.execute("INSERT OR REPLACE INTO frames (run_id, latency, frame) VALUES (?, ?, ?)",
+                                (run_id, np.asarray(latency, dtype='<i8').tobytes(),
+                                 np.asarray(frame, dtype='<i8').tobytes()))
+        return run_id
+
+    def frames(self, run_id):
+        row = self.db.execute("SELECT latency, frame FROM frames WHERE run_id = ?", (run_id,)).fetchone()
+        if row is None:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+        return np.frombuffer(row[0], dtype='<i8'), np.frombuffer(row[1], dtype='<i8')
+
+    @staticmethod
+    def _where(filters):
+        clauses = []
+        args = []
+        for name, value in filters.items():
+            if name not in dict(COLUMNS):
+                raise ValueError(f"unknown column {name}")
+            if isinstance(value, (list, tuple)):
+                clauses.append(f"{name} IN ({', '.join('?' * len(value))})")
+                args += list(value)
+            else:
+                clauses.append(f"{name} = ?")
+                args.append(value)
+        return (' WHERE ' + ' AND '.join(clauses) if clauses else ''), args
+
+    def runs(self, **filters):
+        where, args = self._where(filters)
+        cursor = self.db.execute(f"SELECT id, {', '.join(name for name, _ in COLUMNS)} FROM runs{where} ORDER BY trial_time", args)
+        names = [column[0] for column in cursor.description]
+        return [dict(zip(names, row)) for row in cursor]
+
+    def aggregate(self, group_by, value='above_baseline', **filters):
+        """Count, mean, std, min and max of value per group, e.g. group_by=['topo', 'api']."""
+        for name in list(group_by) + [value]:
+            if name not in dict(COLUMNS):
+                raise ValueError(f"unknown column {name}")
+        where, args = self._where(filters)
+        groups = ', '.join(group_by)
+        cursor = self.db.execute(
+            f"SELECT {groups}, COUNT(*), AVG({value}), AVG({value} * {value}), MIN({value}), MAX({value}) "
+            f"FROM runs{where} GROUP BY {groups} ORDER BY {groups}", args)
+        result = []
+        for row in cursor:
+            count, mean, square, low, high = row[len(group_by):]
+            # sqlite has no stddev, the population one from the mean of squares
+            std = max(square - mean * mean, 0.0) ** 0.5 if mean is not None else None
+            result.append(dict(zip(group_by, row[:len(group_by)]), count=count, mean=mean, std=std, min=low, max=high))
+        return result
+
+    def close(self):
+        self.db.close()
@@ -0,0 +1,156 @@
+"""
+Scaling sweep over generated topologies.
+
+Generates a topo_gen.py family for every N relays x M subscribers per track,
+runs them all through good-try.py (with TEST_SET, so the_path.py stays as it
+is) and reads the results back from the sqlite store. The report has the
+mean latency above baseline, its p99 and the peak relay cpu per N x M, and
+the knee: the first N (per M) and the first M (per N) where the latency above
+baseline grew by more than --threshold over the smallest one, or a relay went
+over --cpu-limit percent. With --virtual the M subscribers are the
+subscriptions of one load generator host per track instead of M hosts, which
+gets a single relay's fan-out ceiling into reach.
+
+    sudo python3 scale_sweep.py star --relays 2,4,8,16 --subs 1,4,16
+    python3 scale_sweep.py star --relays 2,4,8,16 --subs 1,4,16 --report-only
+"""
+
+import argparse
+import datetime
+import os
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+import topo_gen
+from results_store import ResultsStore
+
+
+def numbers(text):
+    return [int(x) for x in text.split(',') if x]
+
+
+def generate_grid(args):
+    grid = {}
+    for relays in args.relays:
+        for subs in args.subs:
+            fanout = ['--subs', '1', '--virtual', str(subs), '--sessions', str(args.sessions)] if args.virtual else ['--subs', str(subs)]
+            gen_args = topo_gen.parser().parse_args([
+                args.family, '--relays', str(relays), *fanout, '--tracks', str(args.tracks),
+                '--video', args.video, '--spines', str(args.spines), '--radius', str(args.radius),
+                '--seed', str(args.seed), '--latency', str(args.latency), '--out', args.out] + (['--sparse'] if args.sparse else []))
+            path = topo_gen.generate(gen_args)
+            grid[(relays, subs)] = os.path.basename(path)
+    return grid
+
+
+def run_grid(grid, args):
+    test_set = ','.join(f"{topofile}:{args.api}:{args.mode}" for topofile in grid.values())
+    env = dict(os.environ, TEST_SET=test_set, RESULTS_DB=args.db, MODE=args.mode)
+    if args.sparse:
+        env['SPARSE'] = '1'
+    if args.tries:
+        env['NUMERO'] = str(args.tries)
+    print(f"** running {len(grid)} topologies: TEST_SET={test_set}")
+    return subprocess.call([sys.executable, 'good-try.py'], env=env)
+
+
+def summarize(grid, store, since=0.0):
+    """{(N, M): (runs, mean above baseline ms, p99 ms, relay cpu max %)} of the runs created after since."""
+    table = {}
+    for key, topofile in grid.items():
+        rows = [row for row in store.runs(topo=topofile.replace('.yaml', '')) if (row['created'] or 0) >= since]
+        above = np.array([row['above_baseline'] for row in rows if row['above_baseline'] is not None], dtype=float)
+        p99 = np.array([row['p99'] - (row['baseline'] or 0) for row in rows if row['p99'] is not None], dtype=float)
+        cpu = [row['relay_cpu_max'] for row in rows if row['relay_cpu_max'] is not None]
+        table[key] = (len(rows),
+                      above.mean() * 1000 if len(above) else np.nan,
+                      p99.mean() * 1000 if len(p99) else np.nan,
+                      max(cpu) if cpu else np.nan)
+    return table
+
+
+def degraded(value, cpu, reference, args):
+    # latencies near zero above baseline would make any jitter a knee, so there is an absolute floor too
+    if not np.isnan(cpu) and cpu > args.cpu_limit:
+        return f"relay cpu {cpu:.0f}%"
+    if not np.isnan(value) and not np.isnan(reference) and value > max(reference * (1 + args.threshold), reference + args.floor_ms):
+        return f"latency {value:.1f}ms vs {reference:.1f}ms"
+    return None
+
+
+def knees(table, args):
+    found = []
+    for subs in args.subs:
+        reference = table[(args.relays[0], subs)][1]
+        for relays in args.relays:
+            reason = degraded(table[(relays, subs)][1], table[(relays, subs)][3], reference, args)
+            if reason:
+                found.append(f"M={subs}: degrades at N={relays} ({reason})")
+                break
+        else:
+            found.append(f"M={subs}: no knee up to N={args.relays[-1]}")
+    for relays in args.relays:
+        reference = table[(relays, args.subs[0])][1]
+        for subs in args.subs:
+            reason = degraded(table[(relays, subs)][1], table[(relays, subs)][3], reference, args)
+            if reason:
+                found.append(f"N={relays}: degrades at M={subs} ({reason})")
+                break
+        else:
+            found.append(f"N={relays}: no knee up to M={args.subs[-1]}")
+    return found
+
+
+def report(grid, table, args):
+    lines = [f"{args.family} {args.api} {args.mode}, threshold {args.threshold:g} (floor {args.floor_ms:g}ms), cpu limit {args.cpu_limit:g}%",
+             "N;M;runs;above baseline ms;p99 above baseline ms;relay cpu max %;topo"]
+    for (relays, subs), (runs, above, p99, cpu) in sorted(table.items()):
+        lines.append(f"{relays};{subs};{runs};{above:.2f};{p99:.2f};{cpu:.1f};{grid[(relays, subs)]}")
+    lines += knees(table, args)
+    return '\n'.join(lines) + '\n'
+
+
+def parser():
+    parser = argparse.ArgumentParser(description='Run a family of generated topologies over N relays x M subscribers')
+    parser.add_argument('family', choices=sorted(topo_gen.FAMILIES))
+    parser.add_argument('--relays', type=numbers, default=[2, 4, 8], help='N values, comma separated and growing')
+    parser.add_argument('--subs', type=numbers, default=[1, 2, 4], help='M values, comma separated and growing')
+    parser.add_argument('--tracks', type=int, default=1)
+    parser.add_argument('--video', type=str, default='bbb-360-30')
+    parser.add_argument('--latency', type=int, default=10)
+    parser.add_argument('--spines', type=int, default=2)
+    parser.add_argument('--radius', type=float, default=15.0)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--sparse', action='store_true', help='only the underlay links, good-try.py routes over them')
+    parser.add_argument('--virtual', action='store_true', help='M subscriptions of one load generator per track (clock mode)')
+    parser.add_argument('--sessions', type=int, default=0, help='sessions of a load generator, 0 for one per subscription')
+    parser.add_argument('--api', type=str, default='opti')
+    parser.add_argument('--mode', type=str, default='clock')
+    parser.add_argument('--tries', type=int, default=0, help='NUMERO for good-try.py, its own default with 0')
+    parser.add_argument('--threshold', type=float, default=0.5, help='relative growth of the latency above baseline')
+    parser.add_argument('--floor-ms', type=float, default=5.0, help='and at least this many ms of growth')
+    parser.add_argument('--cpu-limit', type=float, default=80.0)
+    parser.add_argument('--out', type=str, default=topo_gen.DATASOURCE, help='good-try.py only finds the topologies in its DATASOURCE')
+    parser.add_argument('--db', type=str, default=os.getenv("RESULTS_DB", "measurements/results.sqlite"))
+    parser.add_argument('--report-only', action='store_true', help='only report on the runs already in the store')
+    return parser
+
+
+if __name__ == '__main__':
+    args = parser().parse_args()
+    grid = generate_grid(args)
+    since = 0.0
+    if not args.report_only:
+        since = time.time()
+        if run_grid(grid, args) != 0:
+            print("** good-try.py failed, reporting what made it into the store")
+    store = ResultsStore(args.db)
+    text = report(grid, summarize(grid, store, since), args)
+    store.close()
+    print(text, end='')
+    current_time = datetime.datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+    with open(f"measurements/{current_time}_sweep_{args.family}.txt", 'w') as file:
+        file.write(text)
@@ -0,0 +1,5 @@
+# the harness modules live in the repository root next to good-try.py
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,62 @@
+import math
+
+import pytest
+
+from adaptive import Convergence, t95
+
+
+def test_t95():
+    assert t95(1) == 12.706
+    assert t95(30) == 2.042
+    assert t95(31) == 1.96
+
+
+def test_half_width():
+    convergence = Convergence(1.0)
+    assert math.isnan(convergence.mean())
+    convergence.add(1.0)
+    assert convergence.half_width() == math.inf
+    convergence.add(3.0)
+    # std sqrt(2), n 2
+    assert convergence.mean() == 2.0
+    assert convergence.half_width() == pytest.approx(12.706 * math.sqrt(2) / math.sqrt(2))
+
+
+def test_stable_values_stop_at_min_reps():
+    convergence = Convergence(0.01, min_reps=3, max_reps=20)
+    done = []
+    for try_idx in convergence.tries(range(100)):
+        done.append(try_idx)
+        convergence.add(0.5)
+    assert done == [0, 1, 2]
+    assert convergence.converged()
+
+
+def test_noisy_values_stop_at_max_reps():
+    convergence = Convergence(0.01, min_reps=3, max_reps=6)
+    done = []
+    for try_idx in convergence.tries(range(100)):
+        done.append(try_idx)
+        convergence.add(float(try_idx % 2))
+    assert done == list(range(6))
+    assert not convergence.converged()
+    assert 'not converged' in str(convergence)
+
+
+def test_failed_tries_count_as_attempts():
+    # a try without a result still counts towards max_reps
+    convergence = Convergence(0.01, min_reps=3, max_reps=5)
+    assert list(convergence.tries(range(100))) == list(range(5))
+    assert convergence.values == []
+
+
+def test_candidates_run_out():
+    convergence = Convergence(0.01, min_reps=3, max_reps=20)
+    for _ in convergence.tries([4, 7]):
+        convergence.add(1.0)
+    assert convergence.attempts == 2 and not convergence.converged()
+
+
+def test_min_reps_is_at_least_two():
+    convergence = Convergence(10.0, min_reps=1, max_reps=1)
+    assert (convergence.min_reps, convergence.max_reps) == (2, 2)
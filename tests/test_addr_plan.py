@@ -0,0 +1,86 @@
+import ipaddress
+
+import pytest
+
+from addr_plan import MAX_SLOTS, AddressPlan, PointToPoint
+
+
+def networks(plan):
+    # every address of a slot is in one of these
+    return [ipaddress.ip_network(f"10.{plan.base + n}.0.0/16") for n in range(6)] + \
+           [ipaddress.ip_network(f"12.{4 * plan.slot + n}.0.0/16") for n in range(4)]
+
+
+def test_slots_do_not_overlap():
+    seen = []
+    for slot in range(MAX_SLOTS):
+        for network in networks(AddressPlan(slot)):
+            assert not any(network.overlaps(other) for other in seen), (slot, network)
+            seen.append(network)
+
+
+def test_slot_addresses_stay_in_their_pools():
+    for slot in range(MAX_SLOTS):
+        plan = AddressPlan(slot)
+        pools = networks(plan)
+        addresses = [plan.loopback(1), plan.loopback(65535), plan.api_ip(1), plan.docker_ip(99),
+                     *plan.relay_link(0), *plan.pub_link(100), *plan.sub_link(16383), *plan.baseline_ips()]
+        for address in addresses:
+            assert any(ipaddress.ip_address(address) in pool for pool in pools), (slot, address)
+
+
+def test_ports_and_names_are_unique():
+    plans = [AddressPlan(slot) for slot in range(MAX_SLOTS)]
+    assert len({plan.api_port for plan in plans}) == MAX_SLOTS
+    assert len({plan.redis_port for plan in plans}) == MAX_SLOTS
+    assert len({plan.host(1) for plan in plans}) == MAX_SLOTS
+    assert len({plan.switch() for plan in plans}) == MAX_SLOTS
+    # slot 0 keeps the names of the serial runs
+    assert plans[0].host(3) == 'h3' and plans[0].api_host() == 'api'
+
+
+def test_slot_out_of_range():
+    with pytest.raises(ValueError):
+        AddressPlan(MAX_SLOTS)
+    with pytest.raises(ValueError):
+        AddressPlan(-1)
+
+
+@pytest.mark.parametrize('prefixlen', [30, 31])
+def test_point_to_point_subnets(prefixlen):
+    pool = PointToPoint('10.0', prefixlen)
+    assert pool.capacity == 65536 // 2 ** (32 - prefixlen)
+    links = [pool.subnet(n) for n in range(pool.capacity)]
+    addresses = [address for link in links for address in link]
+    assert len(set(addresses)) == len(addresses)
+    for a, b in links[:300]:
+        subnet = ipaddress.ip_network(f"{a}/{prefixlen}", strict=False)
+        assert ipaddress.ip_address(b) in subnet
+        if prefixlen == 30:
+            # neither the network nor the broadcast address
+            assert ipaddress.ip_address(a) not in (subnet.network_address, subnet.broadcast_address)
+            assert ipaddress.ip_address(b) not in (subnet.network_address, subnet.broadcast_address)
+    with pytest.raises(ValueError):
+        pool.subnet(pool.capacity)
+
+
+def test_bad_prefix():
+    with pytest.raises(ValueError):
+        PointToPoint('10.0', 29)
+
+
+def test_relay_id_is_the_host_number():
+    plan = AddressPlan(5)
+    for k in (1, 255, 256, 1000, 65535):
+        assert AddressPlan.relay_id(plan.loopback(k)) == k
+    with pytest.raises(ValueError):
+        plan.loopback(0)
+    with pytest.raises(ValueError):
+        plan.loopback(65536)
+
+
+def test_relay_links_are_recognized():
+    plan = AddressPlan(2)
+    assert plan.is_relay_link(plan.relay_link(7)[0])
+    assert not plan.is_relay_link(plan.sub_link(7)[0])
+    assert not AddressPlan(3).is_relay_link(plan.relay_link(7)[0])
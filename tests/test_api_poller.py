@@ -0,0 +1,73 @@
+import json
+import math
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from api_poller import Pool, summarize
+
+
+def write(tmp_path, records):
+    path = tmp_path / 'api.jsonl'
+    path.write_text(''.join(json.dumps(record) + '\n' for record in records) + 'cut off by SIGK')
+    return str(path)
+
+
+def test_summarize(tmp_path):
+    a = [['node1', 'node2']]
+    b = [['node1', 'node3'], ['node3', 'node2']]
+    path = write(tmp_path, [
+        {'track': 't1', 'ms': 1.0, 'status': 200, 'used_links': a, 'cost': 2.0},
+        # the same links in another order are no change
+        {'track': 't1', 'ms': 2.0, 'status': 200, 'used_links': b[::-1], 'cost': 3.0},
+        {'track': 't1', 'ms': 3.0, 'status': 200, 'used_links': b, 'cost': 3.0},
+        {'track': 't1', 'ms': 4.0, 'status': 0, 'error': 'refused'},
+        {'track': 't2', 'ms': 10.0, 'status': 404},
+    ])
+    tracks, latency = summarize(path)
+    assert tracks['t1'] == {'used_links': b, 'cost': 3.0, 'changes': 1, 'polls': 4, 'errors': 1}
+    assert tracks['t2'] == {'used_links': None, 'cost': 0.0, 'changes': 0, 'polls': 1, 'errors': 1}
+    assert latency['mean'] == 4.0 and latency['max'] == 10.0 and latency['p50'] == 3.0
+
+
+def test_summarize_empty(tmp_path):
+    tracks, latency = summarize(write(tmp_path, []))
+    assert tracks == {}
+    assert all(math.isnan(value) for value in latency.values())
+
+
+class Topology(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        if self.path == '/tracks/t%2F1/topology':
+            body, status = json.dumps({'used_links': [['a', 'b']], 'cost': 1.5}).encode(), 200
+        else:
+            body, status = b'not found', 404
+        self.send_response(status)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Topology)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_pool(server):
+    pool = Pool(server, workers=2)
+    for _ in range(2):
+        found, missing = pool.round(['t/1', 'other'])
+        assert found['status'] == 200 and found['used_links'] == [['a', 'b']] and found['cost'] == 1.5
+        assert missing['status'] == 404 and 'used_links' not in missing
+    pool.close()
@@ -0,0 +1,85 @@
+import os
+
+import pytest
+
+import baseline_store
+from baseline_store import BaselineStore, baseline_key, build_hash, sample_target
+
+
+@pytest.fixture
+def binaries(tmp_path, monkeypatch):
+    relay, clock = tmp_path / 'moq-relay', tmp_path / 'moq-clock'
+    relay.write_bytes(b'relay')
+    clock.write_bytes(b'clock')
+    monkeypatch.setattr(baseline_store, 'BINARIES', {'clock': [str(relay), str(clock)], 'gst': [str(tmp_path / '*.so')]})
+    return relay
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(baseline_store.time, 'time', lambda: now[0])
+    return now
+
+
+def test_key(binaries):
+    key = baseline_key('bbb', 'clock', True)
+    assert key.startswith('bbb|clock|tls|')
+    assert baseline_key('bbb', 'clock', True) == key
+    assert len({key, baseline_key('bbb', 'clock', False), baseline_key('bbb', 'clock', True, ns=True),
+                baseline_key('bbb', 'clockr', True), baseline_key('other', 'clock', True),
+                baseline_key('bbb', 'gst', True)}) == 6
+    # ffmpeg trials share the gst baseline
+    assert baseline_key('bbb', 'ffmpeg', True) == baseline_key('bbb', 'gst', True)
+
+
+def test_rebuild_changes_the_key(binaries):
+    before = build_hash('clock')
+    binaries.write_bytes(b'rebuilt relay')
+    assert build_hash('clock') != before
+    os.utime(binaries, ns=(0, 0))
+    changed = build_hash('clock')
+    os.utime(binaries, ns=(10 ** 18, 10 ** 18))
+    assert build_hash('clock') != changed
+
+
+def test_hit_miss_and_ttl(tmp_path, clock):
+    store = BaselineStore(str(tmp_path / 'store.json'), ttl=60, target=3)
+    assert store.lookup('a') is None
+    entry = store.record('a', [1e6, 2e6, 3e6])
+    assert entry['samples'] == 3 and entry['average'] == pytest.approx(0.002)
+    assert store.lookup('a')['latencies'] == [1000000, 2000000, 3000000]
+    assert store.lookup('b') is None
+    clock[0] += 60
+    assert store.lookup('a') is not None
+    clock[0] += 1
+    # too old, measured again
+    assert store.lookup('a') is None
+    assert BaselineStore(str(tmp_path / 'store.json'), ttl=0).lookup('a') is None
+
+
+def test_short_baseline_is_topped_up(tmp_path, clock):
+    store = BaselineStore(str(tmp_path / 'store.json'), ttl=60, target=4)
+    store.record('a', [1, 2])
+    assert store.lookup('a') is None
+    clock[0] += 10
+    entry = store.record('a', [3, 4])
+    assert entry['latencies'] == [1, 2, 3, 4] and entry['measured'] == 1000.0
+    assert store.lookup('a')['samples'] == 4
+    # a full one is replaced by the next measurement
+    clock[0] += 10
+    assert store.record('a', [5])['latencies'] == [5]
+
+
+def test_corrupt_store(tmp_path):
+    path = tmp_path / 'store.json'
+    path.write_text('{"cut')
+    store = BaselineStore(str(path))
+    assert store.lookup('a') is None
+    store.record('a', [1])
+    assert BaselineStore(str(path)).lookup('a')['samples'] == 1
+
+
+def test_sample_target():
+    assert sample_target('gst') == 300 and sample_target('ffmpeg') == 300
+    assert sample_target('clockr') == 20 and sample_target('clock', 7) == 7
@@ -0,0 +1,84 @@
+import os
+import subprocess
+
+import pytest
+
+import cert_cache
+from cert_cache import cache_key, ensure_cert, still_valid
+
+
+def test_cache_key():
+    key = cache_key(['10.3.0.1', '10.3.0.2'])
+    # the order, duplicates and mkcert's own names don't make another cert
+    assert cache_key(['10.3.0.2', '10.3.0.1', '10.3.0.1', 'localhost']) == key
+    assert cache_key(['10.3.0.1', '10.3.0.2', '10.3.0.3']) != key
+    assert cache_key(['10.3.0.1']) != key
+    assert cache_key(['10.3.0.1', '10.3.0.2'], days=20) != key
+
+
+def self_signed(folder, days):
+    subprocess.run(['openssl', 'req', '-x509', '-newkey', 'ec', '-pkeyopt', 'ec_paramgen_curve:prime256v1',
+                    '-nodes', '-subj', '/CN=localhost', '-days', str(days),
+                    '-keyout', os.path.join(folder, 'localhost.key'), '-out', os.path.join(folder, 'localhost.crt')],
+                   check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+@pytest.fixture
+def baked(tmp_path, monkeypatch):
+    # mkcert stood in for by openssl, with the lifetime it was asked for
+    monkeypatch.chdir(tmp_path)
+    os.makedirs('dev')
+    calls = []
+
+    def bake(sans, folder, days=cert_cache.DAYS, go_path=''):
+        calls.append((tuple(sans), days))
+        self_signed(folder, days)
+
+    monkeypatch.setattr(cert_cache, 'bake', bake)
+    return calls
+
+
+def test_hit_and_miss_on_san_change(baked):
+    folder = ensure_cert(['10.3.0.1'], log=lambda _: None)
+    assert baked == [(('10.3.0.1',), 10)]
+    with open('dev/localhost.crt', 'rb') as installed, open(os.path.join(folder, 'localhost.crt'), 'rb') as cached:
+        assert installed.read() == cached.read()
+    # the same SANs in another order are a hit
+    assert ensure_cert(['10.3.0.1', '10.3.0.1'], log=lambda _: None) == folder
+    assert len(baked) == 1
+    # another SAN set is baked into a folder of its own
+    other = ensure_cert(['10.3.0.1', '10.3.0.2'], log=lambda _: None)
+    assert other != folder and len(baked) == 2
+    with open('dev/localhost.crt', 'rb') as installed, open(os.path.join(other, 'localhost.crt'), 'rb') as cached:
+        assert installed.read() == cached.read()
+
+
+def test_expiry(baked):
+    # a cert that expires within the margin is baked again
+    ensure_cert(['10.3.0.1'], days=1, log=lambda _: None)
+    ensure_cert(['10.3.0.1'], days=1, log=lambda _: None)
+    assert baked == [(('10.3.0.1',), 1)] * 2
+    ensure_cert(['10.3.0.1'], days=3, log=lambda _: None)
+    ensure_cert(['10.3.0.1'], days=3, log=lambda _: None)
+    assert len(baked) == 3
+
+
+def test_missing_key_is_baked_again(baked):
+    folder = ensure_cert(['10.3.0.1'], log=lambda _: None)
+    os.remove(os.path.join(folder, 'localhost.key'))
+    ensure_cert(['10.3.0.1'], log=lambda _: None)
+    assert len(baked) == 2
+
+
+def test_failed_bake(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(cert_cache, 'bake', lambda *args, **kwargs: None)
+    with pytest.raises(RuntimeError):
+        ensure_cert(['10.3.0.1'], log=lambda _: None)
+
+
+def test_still_valid(tmp_path):
+    assert not still_valid(str(tmp_path / 'none.crt'))
+    self_signed(str(tmp_path), 2)
+    crt = str(tmp_path / 'localhost.crt')
+    assert still_valid(crt) and not still_valid(crt, margin=3 * 24 * 3600)
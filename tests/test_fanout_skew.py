@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+
+from fanout_skew import align, percentiles, report, skew, window
+
+MS = 1000000
+
+
+def columns():
+    # h5 joins late and misses frame 3, h6 ends early, h4 has frame 2 twice
+    return {
+        'h4': ([10 * MS, 11 * MS, 12 * MS, 99 * MS, 13 * MS, 14 * MS, 15 * MS], [0, 1, 2, 2, 3, 4, 5]),
+        'h5': ([30 * MS, 32 * MS, 34 * MS], [2, 4, 5]),
+        'h6': ([20 * MS, 21 * MS, 22 * MS, 23 * MS, 24 * MS], [0, 1, 2, 3, 4]),
+    }
+
+
+def test_align():
+    frames, subs, matrix = align(columns())
+    assert frames.tolist() == [0, 1, 2, 3, 4, 5]
+    assert subs == ['h4', 'h5', 'h6']
+    # the first latency of a frame id
+    assert matrix[2].tolist() == [12 * MS, 30 * MS, 22 * MS]
+    assert np.isnan(matrix[0, 1]) and np.isnan(matrix[5, 2])
+
+
+def test_window():
+    _, _, matrix = align(columns())
+    # from h5's first frame to h6's last one
+    assert window(matrix).tolist() == [False, False, True, True, True, False]
+    # a subscriber without any frame leaves no window
+    assert not window(np.array([[1.0, np.nan], [2.0, np.nan]])).any()
+    assert window(np.empty((0, 2))).tolist() == []
+
+
+def test_skew():
+    result = skew(columns())
+    assert result['frames'] == 3 and result['complete'] == 2
+    # every frame at least two got, max - min
+    assert (result['spread'] / MS).tolist() == [10, 10, 18, 10, 18, 19]
+    # frames 0 and 1 are before h5 joined, 5 after h6 ended, only 3 is lost
+    assert result['lost'] == {'h4': 0, 'h5': 1, 'h6': 0}
+    assert result['lag']['h4'] < 0 < result['lag']['h5']
+    assert result['lag']['h6'] == pytest.approx(3 * MS)
+
+
+def test_single_subscriber():
+    result = skew({'h4': ([1, 2, 3], [0, 1, 2])})
+    assert len(result['spread']) == 0
+    assert result['lag'] == {'h4': None}
+    assert result['lost'] == {'h4': 0} and result['complete'] == 3
+    assert percentiles(result['spread']) == {50: None, 90: None, 99: None, 100: None}
+
+
+def test_no_subscribers():
+    result = skew({})
+    assert result['frames'] == 0 and result['subs'] == []
+
+
+def test_report():
+    lines = report({'bbb': skew(columns())}).splitlines()
+    assert lines[1].startswith('bbb;3;3;2;14.000;')
+    assert lines[1].endswith(';19.000')
+    assert 'bbb;h5;1;' in lines[-2]
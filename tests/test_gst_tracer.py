@@ -0,0 +1,74 @@
+import pytest
+
+import latency
+from gst_tracer import element_stats, parse_tracer, publisher_ns, report, stage, to_ns
+
+# what SHARK=1 leaves on the publisher's stderr, with gst's own lines in between
+PROCTIME = b"""\
+0:00:01.100000000 4242 0x5581d0 TRACE GST_TRACER :0:: proctime, element=(string)before01, time=(string)0:00:00.001000000;
+0:00:01.100200000 4242 0x5581d0 TRACE GST_TRACER :0:: proctime, element=(string)middle, time=(string)0:00:00.000500000;
+0:00:01.100300000 4242 0x5581d0 TRACE GST_TRACER :0:: proctime, element=(string)after01, time=(string)0:00:00.002000000;
+0:00:01.100400000 4242 0x5581d0 TRACE GST_TRACER :0:: proctime, element=(string)after02, time=(string)0:00:00.000300000;
+0:00:01.110000000 4242 0x5581d0 WARN  moqsink moqsink.rs:88:moqsink0 late frame
+0:00:01.133000000 4242 0x5581d0 TRACE GST_TRACER :0:: proctime, element=(string)after01, time=(string)0:00:00.004000000;
+0:00:01.133100000 4242 0x5581d0 TRACE GST_TRACER :0:: proctime, element=(string)after02, time=(string)0:00:00.0007;
+0:00:01.133200000 4242 0x5581d0 TRACE GST_TRACER :0:: proctime, element=(string)moqsink0, time=(string)0:00:01.000000000;
+"""
+
+INTERLATENCY = b"""\
+0:00:01.1 4242 0x5581d0 TRACE GST_TRACER :0:: interlatency, from_pad=(string)filesrc0_src, to_pad=(string)middle_sink, time=(string)0:00:00.010000000;
+0:00:01.1 4242 0x5581d0 TRACE GST_TRACER :0:: interlatency, from_pad=(string)filesrc0_src, to_pad=(string)moqsink0_sink, time=(string)0:00:00.013000000;
+0:00:01.2 4242 0x5581d0 TRACE GST_TRACER :0:: interlatency, from_pad=(string)filesrc0_src, to_pad=(string)middle_sink, time=(string)0:00:00.020000000;
+0:00:01.2 4242 0x5581d0 TRACE GST_TRACER :0:: interlatency, from_pad=(string)filesrc0_src, to_pad=(string)moqsink0_sink, time=(string)0:00:00.027000000;
+"""
+
+
+def parse(tmp_path, data):
+    path = tmp_path / 'baseline_bbb_h1.txt'
+    path.write_bytes(data)
+    return parse_tracer(str(path))
+
+
+def test_to_ns():
+    assert to_ns(b'1', b'02', b'03', b'5') == ((60 + 2) * 60 + 3) * 1000000000 + 500000000
+    assert to_ns(b'0', b'00', b'00', b'0000000012') == 1
+
+
+def test_proctime(tmp_path):
+    tracer = parse(tmp_path, PROCTIME)
+    assert tracer['interlatency'] == {}
+    assert tracer['proctime']['after01'].tolist() == [2000000, 4000000]
+    assert tracer['proctime']['after02'].tolist() == [300000, 700000]
+    rows, stages = element_stats(tracer)
+    assert rows[('proctime', 'after01')] == {'count': 2, 'mean': 3000000.0, 'p99': pytest.approx(3980000.0)}
+    assert stages == {'before': 1000000.0, 'middle': 500000.0, 'after': 3500000.0, 'moqsink': 1000000000.0}
+    # the encoder and muxer after the overlay
+    assert publisher_ns(tracer) == 3500000.0
+    assert 'proctime stage;after;;3.500;' in report(tracer)
+
+
+def test_interlatency(tmp_path):
+    tracer = parse(tmp_path, INTERLATENCY)
+    rows, stages = element_stats(tracer)
+    assert rows[('interlatency', 'filesrc0_src->moqsink0_sink')]['mean'] == 20000000.0
+    assert stages == {}
+    # source to sink minus source to overlay
+    assert publisher_ns(tracer) == 5000000.0
+
+
+def test_chunk_boundaries(tmp_path, monkeypatch):
+    monkeypatch.setattr(latency, 'CHUNK', 37)
+    tracer = parse(tmp_path, PROCTIME + INTERLATENCY)
+    assert sum(len(times) for times in tracer['proctime'].values()) == 7
+    assert sum(len(times) for times in tracer['interlatency'].values()) == 4
+
+
+def test_nothing_traced(tmp_path):
+    tracer = parse(tmp_path, b"0:00:01.1 4242 0x5581d0 INFO gst started\n")
+    assert publisher_ns(tracer) is None
+    assert report(tracer) == "tracer;element or pads;count;mean ms;p99 ms\n"
+
+
+def test_stage():
+    assert [stage(name) for name in ('before02', 'middle', 'after01', 'moqsink0', 'queue3')] == \
+           ['before', 'middle', 'after', 'moqsink', 'other']
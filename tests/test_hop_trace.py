@@ -0,0 +1,60 @@
+from hop_trace import Hop, chains, join, load_trace, relay_times
+
+
+def trace(tmp_path, relay, lines, cut=''):
+    path = tmp_path / f"{relay}.csv"
+    path.write_text("event,namespace,name,group,object,ns\n" + ''.join(f"{line}\n" for line in lines) + cut)
+    return load_trace(str(path))
+
+
+def chain(tmp_path):
+    # publisher -> 1 -> 2 -> 3, and 1 -> 3 directly for object 1
+    return {
+        1: trace(tmp_path, 1, ['recv,live,v,0,0,100', 'deq,live,v,0,0,110', 'send,live,v,0,0,115',
+                               'recv,live,v,0,1,200', 'deq,live,v,0,1,205', 'deq,live,v,0,1,206',
+                               'send,live,v,0,1,210', 'send,live,v,0,1,212']),
+        2: trace(tmp_path, 2, ['recv,live,v,0,0,130', 'deq,live,v,0,0,131', 'send,live,v,0,0,133',
+                               'skip,live,v,5,2,140', 'deq,live,v,0,0,900']),
+        3: trace(tmp_path, 3, ['recv,live,v,0,0,150', 'recv,live,v,0,1,230', 'send,live,v,0,0,155', 'cut,off'],
+                 cut='send,live,v,0,1,23'),
+    }
+
+
+def test_load_trace(tmp_path):
+    objects = chain(tmp_path)[1]
+    assert objects[('live', 'v', 0, 1)] == [200, [205, 206], [210, 212]]
+    # the skip line and a short line are no objects
+    assert set(chain(tmp_path)[2]) == {('live', 'v', 0, 0)}
+    # nor is a last line the relay was killed in the middle of
+    assert chain(tmp_path)[3][('live', 'v', 0, 1)] == [230, [], []]
+
+
+def test_join(tmp_path):
+    hops = join(chain(tmp_path))
+    assert hops == [
+        Hop('live', 'v', 0, 0, None, 1, None, None, None),
+        Hop('live', 'v', 0, 0, 1, 2, 10, 5, 15),
+        # relay 1 sent it before as well, relay 2's send is the last one before the recv
+        Hop('live', 'v', 0, 0, 2, 3, 1, 2, 17),
+        Hop('live', 'v', 0, 1, None, 1, None, None, None),
+        Hop('live', 'v', 0, 1, 1, 3, 6, 6, 18),
+    ]
+
+
+def test_chains(tmp_path):
+    assert chains(join(chain(tmp_path))) == {('live', 1): (1,), ('live', 2): (1, 2), ('live', 3): (1, 2, 3)}
+
+
+def test_relay_times(tmp_path):
+    times = relay_times(chain(tmp_path))
+    queue, proc = times[1]
+    assert queue.tolist() == [10, 6, 6] and proc.tolist() == [5, 4, 6]
+    # a deq after the last send doesn't count
+    assert times[2][0].tolist() == [1]
+
+
+def test_quoted_names(tmp_path):
+    # what the relay writes for names with a comma, a quote and a line break
+    objects = trace(tmp_path, 1, ['recv,"live,1","say ""hi""",0,0,100', 'send,"live,1","say ""hi""",0,0,110',
+                                  'recv,"two\nlines",v,0,0,120'], cut='recv,"cut\n')
+    assert objects == {('live,1', 'say "hi"', 0, 0): [100, [], [110]], ('two\nlines', 'v', 0, 0): [120, [], []]}
@@ -0,0 +1,104 @@
+import numpy as np
+import pytest
+
+import latency
+
+GST = (b"0:00:01.1 INFO tracer: Latency: 1500000 Frame-id: 7 pts\n"
+       b"noise without a latency\n"
+       b"0:00:01.2 INFO tracer: Latency: 2500000\n"
+       b"0:00:01.3 INFO tracer: Frame-id: 9 Latency: 3500000\n")
+
+
+def write(tmp_path, name, data):
+    path = tmp_path / name
+    path.write_bytes(data)
+    return str(path)
+
+
+def test_gst(tmp_path):
+    path = write(tmp_path, 'gst.txt', GST)
+    values, frames = latency.parse_gst(path)
+    assert values.tolist() == [1500000, 3500000]
+    assert frames.tolist() == [7, 9]
+    values, frames = latency.parse_gst(path, require_frame=False)
+    assert values.tolist() == [1500000, 2500000, 3500000]
+    assert frames.tolist() == [7, -1, 9]
+
+
+def test_clock_ms(tmp_path):
+    path = write(tmp_path, 'clock.txt', b"1200\n  980\n12\n-1\n\n15\nnot a number\n")
+    values, frames = latency.parse_clock(path)
+    # the backlog above a second is cut, the sample number is the frame-id
+    assert values.tolist() == [980000000, 12000000, -1000000, 15000000]
+    assert frames.tolist() == [0, 1, 2, 3]
+    values, _ = latency.parse_clock(path, max_ms=None)
+    assert values[0] == 1200000000
+
+
+@pytest.mark.parametrize('chunk', [1, 5, 17, 64])
+def test_chunk_boundaries(tmp_path, monkeypatch, chunk):
+    # lines split over any chunk boundary, and a last line without a newline
+    monkeypatch.setattr(latency, 'CHUNK', chunk)
+    gst = write(tmp_path, 'gst.txt', GST * 50 + b"Latency: 42 Frame-id: 1")
+    values, frames = latency.parse_gst(gst)
+    assert values.tolist() == [1500000, 3500000] * 50 + [42]
+    assert frames.tolist() == [7, 9] * 50 + [1]
+    clock = write(tmp_path, 'clock.txt', b''.join(b"%d\n" % n for n in range(3000)) + b"7")
+    values, frames = latency.parse_clock(clock)
+    assert values.tolist() == [n * 1000000 for n in range(1000)] + [7000000]
+    assert frames.tolist() == list(range(1001))
+
+
+def test_columns_grow():
+    columns = latency.Columns(0)
+    for start in range(0, 5000, 1000):
+        columns.extend(list(range(start, start + 1000)), [1] * 1000)
+    values, frames = columns.arrays()
+    assert values.tolist() == list(range(5000))
+    assert frames.sum() == 5000
+
+
+@pytest.mark.parametrize('mode', ['gst', 'clock'])
+@pytest.mark.parametrize('binary', [False, True])
+def test_save_and_load(tmp_path, mode, binary):
+    values = np.array([5, 6, 7], dtype=np.int64)
+    frames = np.array([1, 2, 4], dtype=np.int64)
+    latency.save_latencies(str(tmp_path / 'run'), mode, values, frames, binary=binary)
+    loaded, loaded_frames = latency.load_latencies(str(tmp_path / 'run'), mode)
+    assert loaded.tolist() == [5, 6, 7] and loaded_frames.tolist() == [1, 2, 4]
+
+
+@pytest.mark.filterwarnings('ignore:loadtxt')
+def test_load_empty(tmp_path):
+    latency.save_latencies(str(tmp_path / 'run'), 'gst', np.empty(0, np.int64), np.empty(0, np.int64))
+    values, frames = latency.load_latencies(str(tmp_path / 'run'), 'gst')
+    assert len(values) == 0 and len(frames) == 0
+
+
+def ns_line(group, obj, sent, recv, start=1000):
+    return b"ns group=%d object=%d sent=%d recv=%d start=%d\n" % (group, obj, sent, recv, start)
+
+
+def test_clock_ns_drops_the_backlog():
+    data = ns_line(3, 0, 400, 900) + ns_line(3, 1, 999, 1500) + ns_line(3, 2, 1000, 1002) + ns_line(4, 0, 2000, 2007)
+    values, frames = latency.clock_ns(data)
+    # sent before start is the backlog of the group the subscription joined
+    assert values == [2, 7]
+    assert frames == [3002, 4000]
+
+
+@pytest.mark.parametrize('chunk', [1, 13, 4 << 20])
+def test_clock_ns_file(tmp_path, monkeypatch, chunk):
+    monkeypatch.setattr(latency, 'CHUNK', chunk)
+    lines = [ns_line(0, obj, 500 + obj, 2000) for obj in range(5)]
+    lines += [ns_line(1, obj, 1000 + obj, 1000 + obj + 10 * obj) for obj in range(200)]
+    path = write(tmp_path, 'clock.txt', b''.join(lines))
+    assert latency.is_clock_ns(path)
+    # parse_clock finds the ns lines on its own and doesn't cut a second
+    values, frames = latency.parse_clock(path)
+    assert values.tolist() == [10 * obj for obj in range(200)]
+    assert frames.tolist() == [1000 + obj for obj in range(200)]
+
+
+def test_ms_lines_are_not_ns(tmp_path):
+    assert not latency.is_clock_ns(write(tmp_path, 'clock.txt', b"12\n13\n"))
@@ -0,0 +1,101 @@
+import os
+import signal
+import subprocess
+from time import monotonic, sleep
+
+import pytest
+
+from launcher import Launcher
+
+
+class Host:
+    """Like mininet's host.popen with mnexec -d, a session of its own."""
+
+    def popen(self, args, **kwargs):
+        return subprocess.Popen(args, start_new_session=True, **kwargs)
+
+
+def gone(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return True
+    return False
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = monotonic() + timeout
+    while not condition() and monotonic() < deadline:
+        sleep(0.02)
+    return condition()
+
+
+@pytest.fixture
+def launcher():
+    logged = []
+    launcher = Launcher(log=logged.append)
+    launcher.logged = logged
+    yield launcher
+    launcher.stop_all(sig=signal.SIGKILL)
+    launcher.wait(timeout=2)
+
+
+def test_output_goes_to_the_files(tmp_path, launcher):
+    out, err = tmp_path / 'sub.txt', tmp_path / 'sub_err.txt'
+    client = launcher.start(Host(), 'sub', 'sh -c "echo one; echo two >&2; echo three"', stdout=str(out), stderr=str(err))
+    launcher.wait()
+    assert out.read_text() == 'one\nthree\n'
+    assert err.read_text() == 'two\n'
+    # both pipes at eof and the client reaped
+    assert client.open_pipes == 0 and not client.alive()
+    assert 'sub' not in launcher.clients and not launcher.logged
+    assert wait_for(lambda: launcher.pump is None)
+
+
+def test_files_are_appended_and_grow_while_running(tmp_path, launcher):
+    out = tmp_path / 'sub.txt'
+    out.write_text('before\n')
+    launcher.start(Host(), 'sub', 'echo first; sleep 30', stdout=str(out))
+    # flushed as it comes, the readiness probes watch the file
+    assert wait_for(lambda: out.read_text() == 'before\nfirst\n')
+
+
+def test_error_exit_is_reported(launcher):
+    launcher.start(Host(), 'pub', 'sh -c "echo boom; exit 3"')
+    assert wait_for(lambda: launcher.exited('pub').check())
+    launcher.wait()
+    assert len(launcher.logged) == 1 and 'exited with 3' in launcher.logged[0] and 'boom' in launcher.logged[0]
+
+
+def test_stop_kills_the_whole_pipeline(tmp_path, launcher):
+    pid_file = tmp_path / 'pid'
+    client = launcher.start(Host(), 'sub', f'sh -c "echo \\$\\$ > {pid_file}; exec sleep 30" | cat')
+    assert wait_for(lambda: pid_file.exists() and pid_file.read_text().strip())
+    child = int(pid_file.read_text())
+    with pytest.raises(RuntimeError):
+        launcher.start(Host(), 'sub', 'true')
+    launcher.stop('sub')
+    launcher.wait()
+    assert 'sub' not in launcher.clients and not launcher.logged
+    assert client.process.returncode is not None
+    assert wait_for(lambda: gone(child))
+
+
+def test_kill_after_term_is_ignored(launcher):
+    client = launcher.start(Host(), 'sub', 'trap "" TERM; sh -c "trap \\"\\" TERM; sleep 30"')
+    sleep(0.2)
+    launcher.stop_all()
+    launcher.wait(timeout=0.5)
+    # still running, left in the launcher
+    assert client.alive() and 'sub' in launcher.clients
+    launcher.stop_all(sig=signal.SIGKILL)
+    launcher.wait()
+    assert not client.alive() and 'sub' not in launcher.clients
+
+
+def test_prefix(launcher):
+    launcher.start(Host(), 't1pub', 'sleep 30')
+    other = launcher.start(Host(), 't2pub', 'sleep 30')
+    launcher.stop_all('t1')
+    launcher.wait('t1')
+    assert list(launcher.clients) == ['t2pub'] and other.alive()
@@ -0,0 +1,113 @@
+import numpy as np
+import pytest
+
+from live_monitor import LiveMonitor, P2Quantile, RunningStats, Tail, TrialStalled
+
+
+def rank(values, estimate):
+    # where the estimate is in the samples, p for a perfect one
+    return np.mean(np.asarray(values) <= estimate)
+
+
+def estimate(p, values):
+    quantile = P2Quantile(p)
+    for value in values:
+        quantile.add(value)
+        # the markers stay in order
+        assert quantile.heights == sorted(quantile.heights)
+    return quantile.value()
+
+
+@pytest.mark.parametrize('p', [0.5, 0.9, 0.99])
+@pytest.mark.parametrize('distribution', ['normal', 'exponential', 'uniform'])
+def test_p2_against_numpy(p, distribution):
+    values = getattr(np.random.default_rng(7), distribution)(size=20000) * 1e6
+    value = estimate(p, values)
+    spread = np.percentile(values, 99.9) - np.percentile(values, 0.1)
+    assert abs(value - np.percentile(values, 100 * p)) < 0.02 * spread
+    assert rank(values, value) == pytest.approx(p, abs=0.01)
+
+
+@pytest.mark.parametrize('p', [0.5, 0.99])
+def test_p2_heavy_tail(p, monkeypatch):
+    # the parabola overshoots the neighbor markers on a heavy tail, the linear step is taken then
+    linear = []
+    step = P2Quantile._linear
+    monkeypatch.setattr(P2Quantile, '_linear', lambda self, i, d: linear.append(i) or step(self, i, d))
+    values = np.random.default_rng(7).pareto(1.0, 20000)
+    value = estimate(p, values)
+    assert linear
+    assert rank(values, value) == pytest.approx(p, abs=0.01)
+
+
+def test_p2_few_samples():
+    quantile = P2Quantile(0.5)
+    assert np.isnan(quantile.value())
+    for value in [5, 1, 3, 2]:
+        quantile.add(value)
+    # fewer than the five markers is the exact quantile
+    assert quantile.value() == np.percentile([5, 1, 3, 2], 50)
+    quantile.add(4)
+    assert quantile.heights == [1, 2, 3, 4, 5] and quantile.value() == 3
+
+
+@pytest.mark.parametrize('values', [range(1001), range(1000, -1, -1)])
+def test_p2_sorted_input(values):
+    assert abs(estimate(0.5, [float(value) for value in values]) - 500) < 10
+
+
+def test_running_stats():
+    values = np.random.default_rng(3).normal(2e7, 3e6, 5000)
+    stats = RunningStats()
+    assert np.isnan(stats.std()) and stats.ci_half_width() == float('inf')
+    for value in values:
+        stats.add(value)
+    assert stats.count == 5000
+    assert stats.mean == pytest.approx(values.mean(), rel=1e-12)
+    assert stats.std() == pytest.approx(values.std(ddof=1), rel=1e-9)
+    assert stats.ci_half_width() == pytest.approx(1.96 * values.std(ddof=1) / np.sqrt(5000))
+
+
+def test_tail(tmp_path):
+    path = tmp_path / 'sub.txt'
+    tail = Tail(str(path), 'clock', max_ms=50)
+    assert tail.read() == 0
+    path.write_bytes(b"1200\n20\n3")
+    assert tail.read() == 1
+    with open(path, 'ab') as file:
+        file.write(b"0\n60\n")
+    # the cut line is read once it is whole, 60 is above the cut off
+    assert tail.read() == 1
+    assert tail.stats.count == 2 and tail.stats.mean == 25e6
+    assert Tail(str(path), 'clock', max_ms=None).read() == 4
+
+
+def test_monitor_passes_max_ms(tmp_path):
+    path = tmp_path / 'sub.txt'
+    path.write_bytes(b"1200\n20\n")
+    monitor = LiveMonitor({'t/h1': str(path)}, 'clock', max_ms=None, log=lambda _: None)
+    assert monitor.tails['t/h1'].read() == 2
+
+
+def test_stall(tmp_path):
+    path = tmp_path / 'sub.txt'
+    path.write_bytes(b"20\n21\n")
+    logged = []
+    monitor = LiveMonitor({'t/h1': str(path)}, 'clock', stall=0.3, poll=0.05, log=logged.append)
+    with pytest.raises(TrialStalled):
+        monitor.run(10)
+    assert monitor.outcome.startswith('stalled: t/h1')
+    assert any('n=2' in line for line in logged)
+
+
+def test_converged(tmp_path):
+    path = tmp_path / 'sub.txt'
+    path.write_bytes(b''.join(b"%d\n" % (20 + n % 2) for n in range(500)))
+    monitor = LiveMonitor({'t/h1': str(path)}, 'clock', stall=5, ci_ms=1, min_samples=100, poll=0.05,
+                          log=lambda _: None)
+    assert monitor.run(10).startswith('converged')
+
+
+def test_duration(tmp_path):
+    monitor = LiveMonitor({'t/h1': str(tmp_path / 'none.txt')}, 'gst', stall=0, poll=0.05, log=lambda _: None)
+    assert monitor.run(0.2).startswith('duration')
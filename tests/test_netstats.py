@@ -0,0 +1,60 @@
+import os
+from time import sleep
+
+import numpy as np
+
+from netstats import FIELDS, NetSampler, delta, format_net_dev, parse_net_dev
+
+NET_DEV = """\
+Inter-|   Receive                                                |  Transmit
+ face |bytes    packets errs drop fifo frame compressed multicast|bytes    packets errs drop fifo colls carrier compressed
+    lo:    1200      12    0    0    0     0          0         0     1200      12    0    0    0     0       0          0
+h1-eth0: 98765432   70001    1    2    0     0          0         3 12345678    9001    0    4    0     0       0          0
+h1-eth1:0 0 0 0 0 0 0 0 5 6 0 0 0 0 0 0
+garbage: 1 2 3
+"""
+
+
+def test_parse_net_dev():
+    counters = parse_net_dev(NET_DEV)
+    assert list(counters) == ['lo', 'h1-eth0', 'h1-eth1']
+    eth0 = dict(zip(FIELDS, counters['h1-eth0']))
+    assert eth0['rx_bytes'] == 98765432 and eth0['rx_packets'] == 70001 and eth0['rx_multicast'] == 3
+    assert eth0['tx_bytes'] == 12345678 and eth0['tx_packets'] == 9001 and eth0['tx_drop'] == 4
+    # no space after the colon with wide counters
+    assert counters['h1-eth1'][FIELDS.index('tx_bytes')] == 5
+
+
+def test_delta():
+    before = parse_net_dev(NET_DEV)
+    after = {name: [value + 10 for value in values] for name, values in before.items()}
+    # a recreated interface starts again at zero
+    after['h1-eth0'] = [1] * len(FIELDS)
+    after['h1-eth2'] = [7] * len(FIELDS)
+    counters = delta(before, after)
+    assert counters['lo'] == [10] * len(FIELDS)
+    assert counters['h1-eth0'][FIELDS.index('rx_bytes')] == 1
+    assert counters['h1-eth2'] == [7] * len(FIELDS)
+    assert parse_net_dev(format_net_dev(counters)) == counters
+
+
+class Host:
+    name = 'h1'
+    pid = os.getpid()
+
+
+def test_sampler():
+    sampler = NetSampler([Host()], interval=0.02, skip=()).start()
+    sleep(0.15)
+    sampler.stop()
+    times, interfaces, counters = sampler.matrix()
+    assert len(times) >= 2 and np.all(np.diff(times) > 0)
+    assert 'h1:lo' in interfaces
+    assert counters.shape == (len(times), len(interfaces), 4)
+    assert sampler.rates().shape == (len(times) - 1, len(interfaces), 4)
+
+
+def test_sampler_without_samples():
+    sampler = NetSampler([])
+    times, interfaces, counters = sampler.matrix()
+    assert len(times) == 0 and interfaces == [] and sampler.rates().shape[0] == 0
@@ -0,0 +1,64 @@
+import subprocess
+from time import sleep
+
+import pytest
+
+import proc_profile
+from proc_profile import HZ, Process, ProcProfiler, parse_stat, parse_status
+
+# a relay whose comm has the characters that make splitting on spaces go wrong
+STAT = ("4242 (moq-relay) x)) S 4200 4242 4200 0 -1 4194560 1531 0 0 0 250 50 0 0 20 0 7 0 "
+        "417484 2703360 321 18446744073709551615 1 1 0 0 0 0 0 0 0 0 0 0 17 3 0 0 0 0 0\n")
+
+STATUS = """\
+Name:\tmoq-relay
+State:\tS (sleeping)
+VmPeak:\t  210000 kB
+VmRSS:\t   51200 kB
+Threads:\t7
+voluntary_ctxt_switches:\t1500
+nonvoluntary_ctxt_switches:\t42
+"""
+
+
+def test_parse_stat():
+    assert parse_stat(STAT) == ('moq-relay) x)', 4200, 300, 7)
+
+
+def test_parse_status():
+    assert parse_status(STATUS.splitlines(True)) == (51200, 1500, 42)
+    # a kernel thread has no VmRSS
+    assert parse_status(["Name:\tkthreadd\n", "voluntary_ctxt_switches:\t3\n"]) == (0, 3, 0)
+
+
+def test_process_summary():
+    process = Process('relay1', 4242, 'moq-relay', 10.0, 0)
+    process.sample(10.0, 0, 1024, (100, 5), 4)
+    process.sample(11.0, HZ // 2, 4096, (150, 6), 7)
+    process.sample(13.0, HZ, 2048, (160, 9), 5)
+    summary = process.summary()
+    assert summary['seconds'] == 3.0
+    assert summary['cpu_pct'] == pytest.approx(100 / 3)
+    # the busiest interval, half a second of cpu in one
+    assert summary['cpu_peak_pct'] == pytest.approx(50)
+    assert summary['rss_max_mb'] == 4.0 and summary['threads_max'] == 7
+    assert (summary['voluntary_switches'], summary['involuntary_switches']) == (60, 4)
+
+
+def test_profiler_finds_the_children(tmp_path, monkeypatch):
+    monkeypatch.setattr(proc_profile, 'WATCHED', ('sleep',))
+    root = subprocess.Popen(['sh', '-c', 'sleep 30 & sleep 30 & wait'])
+    try:
+        sleep(0.2)
+        profiler = ProcProfiler(lambda: {'relay1': root.pid}, interval=0.05).start()
+        sleep(0.3)
+        profiler.stop()
+    finally:
+        subprocess.run(['pkill', '-P', str(root.pid)])
+        root.wait()
+    rows = profiler.summarize()
+    # the two sleeps below the shell, not the shell itself
+    assert len(rows) == 2 and {row['comm'] for row in rows} == {'sleep'} and {row['label'] for row in rows} == {'relay1'}
+    assert all(row['rss_max_mb'] > 0 and row['threads_max'] == 1 for row in rows)
+    lines = open(profiler.save(str(tmp_path / 'proc.txt'))).read().splitlines()
+    assert lines[0].startswith('label;comm;pid') and len(lines) == 3
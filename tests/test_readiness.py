@@ -0,0 +1,100 @@
+from time import monotonic, sleep
+
+import pytest
+
+from readiness import (Probe, QuietProbe, Sequencer, StageTimeout, first_object, origin_announced, samples,
+                       tcp_listening)
+
+
+class Counter(Probe):
+    """Ready on its n-th call."""
+
+    def __init__(self, n):
+        super().__init__(f"ready on call {n}")
+        self.n = n
+        self.calls = 0
+
+    def check(self):
+        self.calls += 1
+        return self.calls >= self.n
+
+
+class Host:
+    name = 'h1'
+
+    def __init__(self, outputs):
+        self.outputs = list(outputs)
+        self.commands = []
+
+    def cmd(self, command):
+        self.commands.append(command)
+        return self.outputs.pop(0) if len(self.outputs) > 1 else self.outputs[0]
+
+
+def test_probe_passes_after_retries():
+    logged = []
+    sequencer = Sequencer(timeout=5, poll=0.01, log=logged.append)
+    probes = [Counter(1), Counter(4)]
+    elapsed = sequencer.stage('relay', *probes)
+    # a ready probe isn't asked again
+    assert [probe.calls for probe in probes] == [1, 4]
+    assert sequencer.stages['relay'] == elapsed and logged == [f"** stage relay ready after {elapsed:.2f}s"]
+
+
+def test_probe_never_passes():
+    sequencer = Sequencer(timeout=5, poll=0.01, log=lambda _: None)
+    never = Probe('never', lambda: False)
+    start = monotonic()
+    with pytest.raises(StageTimeout, match=r'stage api not ready after 0\.\d+s, still waiting for \[never\]'):
+        sequencer.stage('api', Counter(1), never, timeout=0.2)
+    # the stage's own budget, not the sequencer's default
+    assert 0.2 <= monotonic() - start < 2
+    assert sequencer.stages['api'] > 0.2
+    assert 'api=' in sequencer.summary()
+
+
+def test_default_timeout():
+    sequencer = Sequencer(timeout=0.1, poll=0.01, log=lambda _: None)
+    with pytest.raises(StageTimeout):
+        sequencer.stage('pub', Probe('never', lambda: False))
+
+
+def test_listening_and_announced():
+    host = Host(['', '', 'LISTEN 0 128 *:4443 *:*\n'])
+    sequencer = Sequencer(timeout=5, poll=0.01, log=lambda _: None)
+    sequencer.stage('api', tcp_listening(host, 4443))
+    assert len(host.commands) == 3 and 'sport = :4443' in host.commands[0]
+    api = Host(['HTTP404\n', 'HTTP200\n'])
+    sequencer.stage('announce', origin_announced(api, 'http://10.1.1.1:4442', 'bbb', relayid=2))
+    assert '/origin/2/bbb' in api.commands[0]
+
+
+def test_file_probes(tmp_path):
+    path = tmp_path / 'sub.txt'
+    probe = first_object(str(path), 'clock')
+    assert not probe()
+    path.write_bytes(b"2")
+    # not a whole line yet
+    assert not probe()
+    with open(path, 'ab') as file:
+        file.write(b"1\nns group=1 object=2 sent=3 recv=4 start=0\n")
+    assert probe()
+    count = samples(str(path), 'clock', 3)
+    assert not count()
+    with open(path, 'ab') as file:
+        file.write(b"22\n")
+    assert count()
+    gst = first_object(str(tmp_path / 'gst.txt'), 'gst')
+    (tmp_path / 'gst.txt').write_bytes(b"INFO Latency: 12 Frame-id: 1\n")
+    assert gst()
+
+
+def test_quiet(tmp_path):
+    path = tmp_path / 'sub.txt'
+    path.write_bytes(b"1\n")
+    probe = QuietProbe([str(path), str(tmp_path / 'none.txt')], quiet=0.1)
+    assert not probe()
+    path.write_bytes(b"1\n2\n")
+    assert not probe()
+    sleep(0.15)
+    assert probe()
@@ -0,0 +1,58 @@
+import json
+
+from relay_metrics import fanout, parse, report, split, summarize
+
+SCRAPE = '''# TYPE moq_relay_sessions gauge
+moq_relay_sessions 3
+moq_relay_sessions_total 5
+moq_relay_api_lookups_total 4
+moq_relay_api_lookup_microseconds_total 8000
+# TYPE moq_relay_objects_sent_total counter
+moq_relay_objects_sent_total{namespace="live",track="video"} 20
+moq_relay_objects_sent_total{namespace="live",track="audio"} 10
+moq_relay_objects_received_total{namespace="live",track="video"} 10
+moq_relay_bytes_sent_total{namespace="live",track="video"} 2000
+moq_relay_queue_depth_max{namespace="live",track="video"} 7
+moq_relay_groups_dropped_total{namespace="other",track="t"} 1
+'''
+
+
+def test_parse():
+    values = parse(SCRAPE + 'not a sample\n\n')
+    assert values['moq_relay_sessions'] == 3.0
+    assert values['moq_relay_objects_sent_total{namespace="live",track="audio"}'] == 10.0
+    assert len(values) == 10
+
+
+def test_split():
+    assert split('moq_relay_sessions') == ('moq_relay_sessions', {})
+    assert split('x{namespace="live",track="video"}') == ('x', {'namespace': 'live', 'track': 'video'})
+    # the relay escapes quotes and backslashes in the names
+    assert split('x{namespace="a\\\\b\\"c\\n}",track="t"}') == ('x', {'namespace': 'a\\b"c\n}', 'track': 't'})
+    assert parse('x{namespace="}",track="t"} 2') == {'x{namespace="}",track="t"}': 2.0}
+
+
+def summary(scrape):
+    return {'last': parse(scrape), 'peaks': {}, 'errors': 0}
+
+
+def test_fanout():
+    tracks = fanout({'relay1': summary(SCRAPE), 'relay2': summary(SCRAPE.replace('} 7', '} 9'))})
+    assert tracks['live'] == {'objects_in': 20.0, 'objects_out': 60.0, 'bytes_in': 0.0, 'bytes_out': 4000.0,
+                              'queue_max': 9.0, 'groups_dropped': 0.0}
+    assert tracks['other']['groups_dropped'] == 2.0
+
+
+def test_summarize(tmp_path):
+    path = tmp_path / 'relay1_metrics.jsonl'
+    records = [{'t': 1, 'ms': 1, 'metrics': {'moq_relay_sessions': 5, 'moq_relay_sessions_total': 5}},
+               {'t': 2, 'ms': 1, 'error': 'refused'},
+               {'t': 3, 'ms': 1, 'metrics': {'moq_relay_sessions': 2, 'moq_relay_sessions_total': 6}}]
+    path.write_text(''.join(json.dumps(record) + '\n' for record in records) + '{"cut')
+    result = summarize(str(path))
+    assert result['last'] == {'moq_relay_sessions': 2, 'moq_relay_sessions_total': 6}
+    # the counters have no peaks, the last value is theirs
+    assert result['peaks'] == {'moq_relay_sessions': 5}
+    assert result['errors'] == 1
+    line = report({'relay1': result}).splitlines()[1]
+    assert line.split(';')[:2] == ['relay1', '5'] and line.endswith(';1')
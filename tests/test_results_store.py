@@ -0,0 +1,64 @@
+import sqlite3
+
+import pytest
+
+from results_store import COLUMNS, ResultsStore
+
+
+def run(host, above_baseline, **values):
+    return dict(trial_time='t1', topo='topo', api='opti', mode='clock', track='bbb', host=host,
+                build_hash='abc', above_baseline=above_baseline, **values)
+
+
+def test_old_store_gets_the_new_columns(tmp_path):
+    path = str(tmp_path / 'results.sqlite')
+    # a store from before the later columns, with a run in it
+    db = sqlite3.connect(path)
+    db.execute("CREATE TABLE runs (id INTEGER PRIMARY KEY, trial_time TEXT, topo TEXT, api TEXT, mode TEXT, "
+               "track TEXT, host TEXT, build_hash TEXT, average REAL, "
+               "UNIQUE (trial_time, topo, api, mode, track, host, build_hash))")
+    db.execute("INSERT INTO runs (trial_time, topo, api, mode, track, host, build_hash, average) "
+               "VALUES ('t0', 'topo', 'opti', 'clock', 'bbb', 'h4', 'old', 0.25)")
+    db.commit()
+    db.close()
+
+    store = ResultsStore(path)
+    existing = [row[1] for row in store.db.execute('PRAGMA table_info(runs)')]
+    assert set(existing) == {'id'} | {name for name, _ in COLUMNS}
+    old, = store.runs()
+    assert old['average'] == 0.25 and old['warmup'] is None and old['skew_p99'] is None
+    store.add_run(**run('h5', 0.1, warmup=25, skew_p99=1.5, lost_frames=0))
+    assert [row['warmup'] for row in store.runs(host='h5')] == [25]
+    store.close()
+
+    # opening it again doesn't add anything twice
+    ResultsStore(path).close()
+
+
+def test_frames_and_replace(tmp_path):
+    store = ResultsStore(str(tmp_path / 'results.sqlite'))
+    run_id = store.add_run(latency=[3, 4, 5], frame=[0, 1, 3], **run('h4', 0.2))
+    latency, frame = store.frames(run_id)
+    assert latency.tolist() == [3, 4, 5] and frame.tolist() == [0, 1, 3]
+    # the same key again replaces the run and its frames
+    run_id = store.add_run(latency=[9], frame=[7], **run('h4', 0.3))
+    assert len(store.runs()) == 1
+    assert store.frames(run_id)[0].tolist() == [9]
+    assert store.frames(run_id + 100)[0].tolist() == []
+    store.close()
+
+
+def test_aggregate(tmp_path):
+    store = ResultsStore(str(tmp_path / 'results.sqlite'))
+    store.add_run(**run('h4', 1.0))
+    store.add_run(**run('h5', 3.0))
+    store.add_run(**dict(run('h4', 10.0), api='origi'))
+    rows = store.aggregate(['api'])
+    assert [(row['api'], row['count'], row['mean'], row['std']) for row in rows] == \
+           [('opti', 2, 2.0, 1.0), ('origi', 1, 10.0, 0.0)]
+    assert [row['host'] for row in store.runs(host=['h5'])] == ['h5']
+    with pytest.raises(ValueError):
+        store.aggregate(['nope'])
+    with pytest.raises(ValueError):
+        store.runs(nope=1)
+    store.close()
@@ -0,0 +1,104 @@
+import random
+
+import networkx as nx
+import pytest
+
+from addr_plan import AddressPlan
+from topo_compiler import _next_hops, compile_topo, pair
+
+
+def config(n, edges, subs=()):
+    return {
+        'nodes': [{'name': f"node{i}"} for i in range(1, n + 1)],
+        'edges': [{'node1': f"node{i}", 'node2': f"node{j}", 'attributes': {'latency': delay, 'cost': 1}}
+                  for i, j, delay in edges],
+        'first_hop_relay': [{'relayid': 'node1', 'track': 't'}],
+        'last_hop_relay': [{'relayid': f"node{i}", 'track': 't'} for i in subs],
+    }
+
+
+def sparse(n, extra, seed):
+    # a random spanning tree and a few more edges, connected but far from a full mesh
+    rng = random.Random(seed)
+    edges = {pair(i, rng.randint(1, i - 1)) for i in range(2, n + 1)}
+    while len(edges) < n - 1 + extra:
+        i, j = rng.sample(range(1, n + 1), 2)
+        edges.add(pair(i, j))
+    return [(i, j, rng.choice([0, 1, 5, 5, 20])) for i, j in sorted(edges)]
+
+
+def test_line():
+    topo = compile_topo(config(4, [(1, 2, 5), (2, 3, 5), (3, 4, 5)]), AddressPlan(0))
+    assert topo.path(1, 4) == [1, 2, 3, 4]
+    assert topo.path(4, 1) == [4, 3, 2, 1]
+    assert topo.path(2, 3) == [2, 3]
+    assert topo.forwarding == {2, 3}
+    assert topo.path_cost('node1', 'node4') == (3, 3)
+
+
+def test_faster_detour():
+    # 1-3 directly is slower than over 2, but it is an edge, so it is used as is
+    topo = compile_topo(config(4, [(1, 2, 1), (2, 3, 1), (1, 3, 50), (3, 4, 1)]), AddressPlan(0))
+    assert topo.path(1, 3) == [1, 3]
+    assert topo.path(1, 4) == [1, 2, 3, 4]
+
+
+def routed_distances(graph, j):
+    # what the routes can do at best: a neighbor of j sends to j directly, the others to any neighbor
+    distance = {i: graph[i][j]['weight'] if i in graph[j] else float('inf') for i in graph}
+    distance[j] = 0
+    changed = True
+    while changed:
+        changed = False
+        for i in graph:
+            if i == j or i in graph[j]:
+                continue
+            best = min(graph[i][v]['weight'] + distance[v] for v in graph[i])
+            if best < distance[i] - 1e-9:
+                distance[i], changed = best, True
+    return distance
+
+
+@pytest.mark.parametrize('seed', range(10))
+def test_sparse_paths_are_loop_free_and_shortest(seed):
+    n = 30
+    edges = sparse(n, 10, seed)
+    topo = compile_topo(config(n, edges), AddressPlan(0))
+    graph = nx.Graph()
+    graph.add_weighted_edges_from((i, j, delay + 0.001) for i, j, delay in edges)
+    assert all(pair(i, j) not in topo.delay for i, j in topo.next_hop)
+    for j in range(1, n + 1):
+        distance = routed_distances(graph, j)
+        for i in range(1, n + 1):
+            hops = topo.path(i, j)
+            assert hops[0] == i and hops[-1] == j
+            assert len(set(hops)) == len(hops), hops
+            assert all(b in graph[a] for a, b in zip(hops, hops[1:])), hops
+            length = sum(graph[a][b]['weight'] for a, b in zip(hops, hops[1:]))
+            assert length == pytest.approx(distance[i])
+
+
+def test_neighbor_is_not_a_detour():
+    # 2 reaches 3 over their slow edge, so 1 goes over 4 instead of 2
+    topo = compile_topo(config(4, [(1, 2, 1), (2, 3, 50), (1, 4, 5), (4, 3, 5), (2, 4, 1)]), AddressPlan(0))
+    assert topo.path(2, 3) == [2, 3]
+    assert topo.path(1, 3) == [1, 4, 3]
+
+
+def test_zero_delays_do_not_loop():
+    edges = [(1, 2, 0), (2, 3, 0), (3, 4, 0), (4, 1, 0), (2, 4, 0)]
+    hops = _next_hops(4, tuple(sorted((pair(i, j), delay) for i, j, delay in edges)))
+    assert set(hops) == {(1, 3), (3, 1)}
+    assert hops[(1, 3)] in (2, 4) and hops[(3, 1)] in (2, 4)
+
+
+def test_routes_cover_every_relay():
+    n = 12
+    topo = compile_topo(config(n, sparse(n, 2, 0), subs=[5, 12]), AddressPlan(1))
+    for i in range(1, n + 1):
+        destinations = {dst for dst, _ in topo.routes[i]}
+        assert destinations == {topo.plan.loopback(j) for j in range(1, n + 1) if j != i}
+    # one link per edge and per client, every address used once
+    assert len(topo.links) == len(topo.delay) + 3
+    addresses = [ip for link in topo.links for ip in (link.ip_a, link.ip_b)]
+    assert len(set(addresses)) == len(addresses)
@@ -0,0 +1,93 @@
+from collections import Counter
+
+import networkx as nx
+import pytest
+import yaml
+
+import scale_sweep
+import topo_gen
+from addr_plan import AddressPlan
+from topo_compiler import compile_topo
+
+FAMILIES = {
+    'line': lambda n: topo_gen.line(n),
+    'star': lambda n: topo_gen.star(n),
+    'spine-leaf': lambda n: topo_gen.spine_leaf(n, spines=2),
+    'geometric': lambda n: topo_gen.geometric(n, radius=5.0, seed=n),
+}
+
+
+def graph(config):
+    result = nx.Graph()
+    result.add_nodes_from(node['name'] for node in config['nodes'])
+    result.add_weighted_edges_from((edge['node1'], edge['node2'], edge['attributes']['latency']) for edge in config['edges'])
+    return result
+
+
+@pytest.mark.parametrize('family', sorted(FAMILIES))
+@pytest.mark.parametrize('relays', [1, 2, 3, 8, 25])
+@pytest.mark.parametrize('subs', [1, 4])
+def test_sparse_counts_and_connected(family, relays, subs):
+    nodes, links = FAMILIES[family](relays)
+    config = topo_gen.build_config(nodes, links, tracks=2, subs=subs, mesh=False)
+    underlay = graph(config)
+    assert len(config['nodes']) == relays == len(underlay)
+    assert nx.is_connected(underlay)
+    assert len(config['edges']) == len(links)
+    # one publisher per track on the first relay, subs subscribers per track spread over the others
+    assert [pub['relayid'] for pub in config['first_hop_relay']] == ['node1', 'node1']
+    assert Counter(sub['track'] for sub in config['last_hop_relay']) == {'1000_bbb-360-30': subs, '1001_bbb-360-30': subs}
+    if relays > 1:
+        assert 'node1' not in {sub['relayid'] for sub in config['last_hop_relay']}
+    # and good-try.py can compile it
+    topo = compile_topo(config, AddressPlan(0))
+    assert topo.relay_number == relays and len(topo.subs) == 2 * subs
+
+
+@pytest.mark.parametrize('family', sorted(FAMILIES))
+def test_mesh_is_the_shortest_underlay(family):
+    nodes, links = FAMILIES[family](9)
+    underlay = graph(topo_gen.build_config(nodes, links, mesh=False))
+    mesh = topo_gen.build_config(nodes, links, mesh=True)
+    assert len(mesh['edges']) == 9 * 8 // 2
+    for edge in mesh['edges']:
+        assert edge['attributes']['latency'] == nx.dijkstra_path_length(underlay, edge['node1'], edge['node2'])
+        assert edge['attributes']['underlay_length'] >= 1
+
+
+def test_geometric_links_the_parts():
+    # a radius too small for any link still gives one connected map
+    nodes, links = topo_gen.geometric(12, radius=0.01, seed=1)
+    assert len(topo_gen.components(12, links)) == 1 and len(links) == 11
+
+
+def test_virtual_subscribers():
+    config = topo_gen.build_config(*topo_gen.star(4), subs=2, virtual=100, sessions=10)
+    assert all(sub['virtual'] == 100 and sub['sessions'] == 10 for sub in config['last_hop_relay'])
+
+
+def test_sweep_grid(tmp_path):
+    args = scale_sweep.parser().parse_args(['star', '--relays', '2,4', '--subs', '1,3', '--virtual', '--sparse',
+                                            '--out', str(tmp_path)])
+    grid = scale_sweep.generate_grid(args)
+    assert sorted(grid) == [(2, 1), (2, 3), (4, 1), (4, 3)]
+    for (relays, subs), name in grid.items():
+        with open(tmp_path / name) as file:
+            config = yaml.safe_load(file)
+        assert len(config['nodes']) == relays and nx.is_connected(graph(config))
+        # --virtual makes the M subscribers one load generator per track
+        assert [sub['virtual'] for sub in config['last_hop_relay']] == [subs]
+
+
+def test_knees():
+    args = scale_sweep.parser().parse_args(['star', '--relays', '2,4,8', '--subs', '1,4'])
+    nan = float('nan')
+    table = {(2, 1): (1, 10.0, 0, 10.0), (4, 1): (1, 12.0, 0, 10.0), (8, 1): (1, 30.0, 0, 10.0),
+             (2, 4): (1, 11.0, 0, 10.0), (4, 4): (1, 11.0, 0, 95.0), (8, 4): (1, nan, 0, nan)}
+    assert scale_sweep.knees(table, args) == [
+        'M=1: degrades at N=8 (latency 30.0ms vs 10.0ms)',
+        'M=4: degrades at N=4 (relay cpu 95%)',
+        'N=2: no knee up to M=4',
+        'N=4: degrades at M=4 (relay cpu 95%)',
+        'N=8: no knee up to M=4',
+    ]
@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+
+from warmup import mser, steady
+
+
+def brute_force(latencies, batch=5, max_fraction=0.5):
+    # the rule as written, var / (n - d) of the batch means for every d
+    n = len(latencies) // batch
+    means = np.asarray(latencies[:n * batch], dtype=np.float64).reshape(n, batch).mean(axis=1)
+    statistic = [means[d:].var() / (n - d) for d in range(max(int(n * max_fraction), 1))]
+    return int(np.argmin(statistic)) * batch
+
+
+def test_finds_the_warmup():
+    rng = np.random.default_rng(1)
+    latencies = np.concatenate([np.linspace(900e6, 100e6, 40), 20e6 + rng.normal(0, 1e6, 2000)]).astype(np.int64)
+    trimmed = mser(latencies)
+    assert 40 <= trimmed <= 60
+    assert trimmed % 5 == 0
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_matches_the_rule(seed):
+    rng = np.random.default_rng(seed)
+    latencies = (rng.exponential(1e6, 503) + 1.7e18 * (seed == 0)).astype(np.int64)
+    latencies[:rng.integers(0, 100)] += 50_000_000
+    assert mser(latencies) == brute_force(latencies)
+
+
+def test_steady_series_is_not_trimmed():
+    assert mser(np.full(1000, 20_000_000)) == 0
+
+
+def test_short_series():
+    assert mser([]) == 0
+    assert mser([1, 2, 3, 4, 5, 6, 7, 8, 9]) == 0
+    # only in the first half
+    assert mser([100] * 5 + [1] * 5) == 0
+
+
+def test_steady():
+    latencies = np.array([500] * 10 + list(np.random.default_rng(0).integers(5, 15, 100)))
+    frames = np.arange(len(latencies))
+    values, steady_frames, trimmed = steady(latencies, frames)
+    # all of the warm-up, and maybe a noisy batch or two after it
+    assert 10 <= trimmed <= 30
+    assert values.tolist() == latencies[trimmed:].tolist() and steady_frames[0] == trimmed
+    assert steady(latencies)[1] is None
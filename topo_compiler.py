@@ -0,0 +1,201 @@
+"""
+Compiles a topo yaml of cdn-optimization into everything good-try.py needs
+to build the mininet: the hosts, the links with their delays and addresses,
+the loopback addresses and the routes.
+
+good-try.py used to look up the delay of every relay pair by scanning all
+edges, and node_names.index() everywhere else, which doesn't go well with
+100+ relays. Here the edges are indexed once by the (sorted) pair of relay
+indices and the mininet builder only walks the finished lists.
+
+Hosts are numbered like before: the relays are 1..n in the order of the
+nodes, then the pubs and then the subs, host k gets plan.host(k) and
+plan.loopback(k). A last_hop_relay entry with `virtual: N` (and optionally
+`sessions: S`) is still one host, running N subscriptions in one process;
+the api sees it as the one subscriber on that relay it is.
+
+Only the edges become links, so a sparse topology costs O(E) links instead
+of a full mesh. A relay reaches its neighbors directly and every other
+relay's loopback over the shortest path by latency, computed once per
+topology with networkx. The relays in the middle of such a path forward.
+"""
+
+import copy
+from collections import namedtuple
+from functools import lru_cache
+
+import networkx as nx
+import yaml
+
+DATASOURCE = '../cdn-optimization/datasource'
+
+# a and b are host numbers, delay is in ms or None for no delay
+Link = namedtuple('Link', ['a', 'b', 'ip_a', 'ip_b', 'delay'])
+# k is the host number of the client, relay the index of the relay it is connected to,
+# virtual > 0 makes it a load generator with that many subscriptions over `sessions` sessions (0 for one each)
+Client = namedtuple('Client', ['k', 'relay', 'track', 'virtual', 'sessions'], defaults=[0, 0])
+
+
+@lru_cache(maxsize=None)
+def _parse(topofile):
+    with open(f"{DATASOURCE}/{topofile}", 'r') as file:
+        return yaml.safe_load(file)
+
+
+def load_config(topofile):
+    # parsed once per process, a trial gets its own copy to write mode and api into
+    return copy.deepcopy(_parse(topofile))
+
+
+def pair(i, j):
+    return (i, j) if i < j else (j, i)
+
+
+@lru_cache(maxsize=8)
+def _next_hops(relay_number, delays):
+    """{(i, j): the neighbor i sends to for loopback j} for every pair that is not an edge."""
+    graph = nx.Graph()
+    graph.add_nodes_from(range(1, relay_number + 1))
+    # a microsecond per hop makes the shorter of two equally fast paths win, a zero delay can't loop
+    graph.add_weighted_edges_from((i, j, (delay or 0) + 0.001) for (i, j), delay in delays)
+    edges = {pair for pair, _ in delays}
+    hops = {}
+    for j in range(1, relay_number + 1):
+        # from j outwards, the predecessor of i is its next hop towards j, one tree per destination.
+        # A neighbor of j always sends to j over their edge, so it is only reached from j itself,
+        # the tree would otherwise route through it as if it took a faster detour it doesn't take.
+        neighbors = set(graph[j])
+        weight = lambda u, v, attributes: None if v in neighbors and u != j else attributes['weight']
+        predecessors, _ = nx.dijkstra_predecessor_and_distance(graph, j, weight=weight)
+        for i, before in predecessors.items():
+            if before and pair(i, j) not in edges:
+                hops[(i, j)] = min(before)
+    return hops
+
+
+class TopoPlan:
+    def __init__(self, config, plan):
+        self.plan = plan
+        self.names = [node['name'] for node in config['nodes']]
+        self.index = {name: i + 1 for i, name in enumerate(self.names)}
+        self.relay_number = len(self.names)
+
+        # edge attributes by relay pair, the first edge of a pair wins like the old search did
+        self.delay = {}
+        self.cost = {}
+        self.underlay_length = {}
+        self.neighbors = {i: set() for i in range(1, self.relay_number + 1)}
+        for edge in config['edges']:
+            i, j = self.index[edge['node1']], self.index[edge['node2']]
+            key = pair(i, j)
+            if key in self.delay or i == j:
+                continue
+            attributes = edge['attributes']
+            self.delay[key] = attributes['latency']
+            self.cost[key] = attributes.get('cost', 0)
+            self.underlay_length[key] = attributes.get('underlay_length', 1)
+            self.neighbors[i].add(j)
+            self.neighbors[j].add(i)
+
+        k = self.relay_number + 1
+        self.pubs = []
+        for item in config['first_hop_relay']:
+            self.pubs.append(Client(k, self.index[item['relayid']], item['track']))
+            k += 1
+        self.subs = []
+        for item in config['last_hop_relay']:
+            self.subs.append(Client(k, self.index[item['relayid']], item['track'], int(item.get('virtual', 0)), int(item.get('sessions', 0))))
+            k += 1
+        self.host_count = k - 1
+        self.pub_relay = {client.track: client.relay for client in self.pubs}
+
+        self.addrs = {k: [f"{plan.loopback(k)}/32"] for k in range(1, self.host_count + 1)}
+        self.links = []
+        self.routes = {k: [] for k in range(1, self.host_count + 1)}
+        self.next_hop = _next_hops(self.relay_number, tuple(sorted(self.delay.items())))
+        # the relays a multi-hop route passes through
+        self.forwarding = set(self.next_hop.values())
+        self._plan_links()
+
+    def _plan_links(self):
+        plan = self.plan
+        pubs_at = {}
+        subs_at = {}
+        for index, client in enumerate(self.pubs):
+            pubs_at.setdefault(client.relay, []).append(index)
+        for index, client in enumerate(self.subs):
+            subs_at.setdefault(client.relay, []).append(index)
+
+        # every pool has its own counter, the addresses come from addr_plan's point to point subnets
+        pub_counter = 0
+        sub_counter = 0
+        for i in range(1, self.relay_number + 1):
+            for index in pubs_at.get(i, []):
+                client_ip, relay_ip = plan.pub_link(pub_counter)
+                self.links.append(Link(self.pubs[index].k, i, client_ip, relay_ip, None))
+                self.routes[self.pubs[index].k].append((plan.loopback(i), relay_ip))
+                pub_counter += 1
+            for index in subs_at.get(i, []):
+                client_ip, relay_ip = plan.sub_link(sub_counter)
+                self.links.append(Link(self.subs[index].k, i, client_ip, relay_ip, None))
+                self.routes[self.subs[index].k].append((plan.loopback(i), relay_ip))
+                sub_counter += 1
+
+        # a link per edge, in the order of the old full mesh loops
+        relay_counter = 0
+        link_ip = {}
+        for i, j in sorted(self.delay):
+            ip1, ip2 = plan.relay_link(relay_counter)
+            self.links.append(Link(i, j, ip1, ip2, self.delay[(i, j)]))
+            self.routes[i].append((plan.loopback(j), ip2))
+            self.routes[j].append((plan.loopback(i), ip1))
+            link_ip[(i, j)], link_ip[(j, i)] = ip2, ip1
+            relay_counter += 1
+        # the others over the first hop of their shortest path
+        for (i, j), via in sorted(self.next_hop.items()):
+            self.routes[i].append((plan.loopback(j), link_ip[(i, via)]))
+
+    def ip_commands(self, k):
+        # what host k needs on top of the link addresses, as lines for ip -batch
+        return ([f"addr add {addr} dev lo" for addr in self.addrs[k]] +
+                [f"route add {dst}/32 via {via}" for dst, via in self.routes[k]])
+
+    def relay_ip(self, relayname):
+        return self.plan.loopback(self.index[relayname])
+
+    def path(self, i, j):
+        # the relays the routes go through from i to j, both included
+        hops = [i]
+        while hops[-1] != j:
+            hops.append(self.next_hop.get((hops[-1], j), j))
+        return hops
+
+    def path_cost(self, relayname1, relayname2):
+        # summed over the edges of the routed path, a single edge in a full mesh
+        hops = self.path(self.index[relayname1], self.index[relayname2])
+        keys = [pair(a, b) for a, b in zip(hops, hops[1:])]
+        return sum(self.cost.get(key, 0) for key in keys), sum(self.underlay_length.get(key, 0) for key in keys)
+
+
+def compile_topo(config, plan):
+    return TopoPlan(config, plan)
+
+
+def check_full_mesh(topofile):
+    # counting the distinct pairs is enough, no graph and no n^2 has_edge
+    config = _parse(topofile)
+    names = {node['name'] for node in config['nodes']}
+    pairs = {frozenset((edge['node1'], edge['node2'])) for edge in config['edges']
+             if edge['node1'] != edge['node2'] and edge['node1'] in names and edge['node2'] in names}
+    if len(pairs) != len(names) * (len(names) - 1) // 2:
+        raise ValueError(f"The nodes and edges do not form a full mesh in {topofile}")
+
+
+def check_connected(topofile):
+    # what a sparse topology needs instead, every relay reachable from every other
+    config = _parse(topofile)
+    graph = nx.Graph()
+    graph.add_nodes_from(node['name'] for node in config['nodes'])
+    graph.add_edges_from((edge['node1'], edge['node2']) for edge in config['edges'] if edge['node1'] != edge['node2'])
+    if len(graph) and not nx.is_connected(graph):
+        raise ValueError(f"Some relays can't reach each other in {topofile}")
@@ -0,0 +1,199 @@
+"""
+Generates topology yamls in the format of ../cdn-optimization/datasource.
+
+The families are line, star, spine-leaf and random geometric (relays
+scattered over a map, linked when they are closer than a radius, the latency
+from the distance of their `location`s). Every family gives an underlay of
+relay to relay links, and the yaml gets
+- with mesh=True (what good-try.py needs without SPARSE) an edge for every
+  relay pair with the latency and cost of the shortest underlay path and the
+  hop count as underlay_length,
+- with mesh=False only the underlay links, good-try.py routes over them with
+  SPARSE.
+One publisher per track sits on the first relay, the M subscribers of a
+track are spread round robin over the other relays. With --virtual V every
+one of them is a moq-clock load generator with V subscriptions (clock mode).
+
+good-try.py takes the video (or the clock duration) from after the
+underscore of a track name, e.g. 1000_bbb-360-30.
+
+    python topo_gen.py star --relays 8 --subs 4
+    python topo_gen.py geometric --relays 40 --radius 15 --seed 3 --sparse
+"""
+
+import argparse
+import heapq
+import math
+import os
+import random
+
+import yaml
+
+DATASOURCE = '../cdn-optimization/datasource'
+
+
+def line(n, latency=10, cost=0.01):
+    nodes = [(f"node{i+1}", [0.0, float(i)]) for i in range(n)]
+    links = [(i, i + 1, latency, cost) for i in range(n - 1)]
+    return nodes, links
+
+
+def star(n, latency=10, cost=0.01):
+    # node1 is the hub, the others are on a circle around it
+    nodes = [("node1", [0.0, 0.0])]
+    nodes += [(f"node{i+1}", [math.cos(2 * math.pi * i / (n - 1)), math.sin(2 * math.pi * i / (n - 1))]) for i in range(1, n)]
+    links = [(0, i, latency, cost) for i in range(1, n)]
+    return nodes, links
+
+
+def spine_leaf(n, spines=2, latency=5, cost=0.01):
+    # the first spines relays are the spines, every leaf is linked to every spine
+    spines = max(1, min(spines, n - 1))
+    nodes = [(f"node{i+1}", [1.0, float(i)]) for i in range(spines)]
+    nodes += [(f"node{i+1}", [0.0, float(i - spines)]) for i in range(spines, n)]
+    links = [(s, l, latency, cost) for s in range(spines) for l in range(spines, n)]
+    return nodes, links
+
+
+def geometric(n, radius=15.0, seed=0, ms_per_degree=1.0, cost_per_ms=0.001, size=40.0):
+    """Relays at random lat/long in a size x size degree box, linked below radius degrees."""
+    rng = random.Random(seed)
+    nodes = [(f"node{i+1}", [round(rng.uniform(0, size), 4), round(rng.uniform(0, size), 4)]) for i in range(n)]
+
+    def distance(a, b):
+        return math.dist(nodes[a][1], nodes[b][1])
+
+    links = []
+    for a in range(n):
+        for b in range(a + 1, n):
+            if distance(a, b) <= radius:
+                latency = max(1, round(distance(a, b) * ms_per_degree))
+                links.append((a, b, latency, round(latency * cost_per_ms, 4)))
+    # a disconnected map would leave relays unreachable, the closest pair of every two parts is linked
+    parts = components(n, links)
+    while len(parts) > 1:
+        first = parts[0]
+        a, b = min(((a, b) for a in first for part in parts[1:] for b in part), key=lambda pair: distance(*pair))
+        latency = max(1, round(distance(a, b) * ms_per_degree))
+        links.append((min(a, b), max(a, b), latency, round(latency * cost_per_ms, 4)))
+        parts = components(n, links)
+    return nodes, links
+
+
+def components(n, links):
+    parent = list(range(n))
+
+    def find(x):
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    for a, b, _, _ in links:
+        parent[find(a)] = find(b)
+    parts = {}
+    for x in range(n):
+        parts.setdefault(find(x), []).append(x)
+    return list(parts.values())
+
+
+def shortest_paths(n, links):
+    """Dijkstra by latency from every relay: {(a, b): (latency, cost, hops)} for a < b."""
+    adjacency = {i: [] for i in range(n)}
+    for a, b, latency, cost in links:
+        adjacency[a].append((b, latency, cost))
+        adjacency[b].append((a, latency, cost))
+    paths = {}
+    for source in range(n):
+        best = {source: (0, 0.0, 0)}
+        queue = [(0, 0.0, 0, source)]
+        while queue:
+            latency, cost, hops, node = heapq.heappop(queue)
+            if best[node] < (latency, cost, hops):
+                continue
+            for neighbor, link_latency, link_cost in adjacency[node]:
+                candidate = (latency + link_latency, cost + link_cost, hops + 1)
+                if neighbor not in best or candidate < best[neighbor]:
+                    best[neighbor] = candidate
+                    heapq.heappush(queue, candidate + (neighbor,))
+        for target, value in best.items():
+            if source < target:
+                paths[(source, target)] = value
+    return paths
+
+
+def build_config(nodes, links, tracks=1, subs=1, mesh=True, video='bbb-360-30', budget=1000, virtual=0, sessions=0):
+    names = [name for name, _ in nodes]
+    config = {'nodes': [{'name': name, 'location': location} for name, location in nodes]}
+    if mesh:
+        paths = shortest_paths(len(nodes), links)
+        config['edges'] = [{'node1': names[a], 'node2': names[b],
+                            'attributes': {'latency': latency, 'cost': round(cost, 4), 'underlay_length': hops}}
+                           for (a, b), (latency, cost, hops) in sorted(paths.items())]
+    else:
+        config['edges'] = [{'node1': names[a], 'node2': names[b],
+                            'attributes': {'latency': latency, 'cost': cost, 'underlay_length': 1}}
+                           for a, b, latency, cost in links]
+    config['first_hop_relay'] = []
+    config['last_hop_relay'] = []
+    # the subscribers of a single relay topology sit on the publisher's relay
+    edge_relays = names[1:] or names
+    k = 0
+    for t in range(tracks):
+        track = f"{budget + t}_{video}"
+        config['first_hop_relay'].append({'relayid': names[0], 'track': track})
+        for _ in range(subs):
+            entry = {'relayid': edge_relays[k % len(edge_relays)], 'track': track}
+            if virtual:
+                entry.update(virtual=virtual, sessions=sessions)
+            config['last_hop_relay'].append(entry)
+            k += 1
+    return config
+
+
+FAMILIES = {
+    'line': lambda args: line(args.relays, args.latency),
+    'star': lambda args: star(args.relays, args.latency),
+    'spine-leaf': lambda args: spine_leaf(args.relays, args.spines, args.latency),
+    'geometric': lambda args: geometric(args.relays, args.radius, args.seed),
+}
+
+
+def topo_name(args):
+    extra = {'spine-leaf': f"s{args.spines}", 'geometric': f"r{args.radius:g}s{args.seed}"}.get(args.family, f"l{args.latency}")
+    load = f"_v{args.virtual}" + (f"s{args.sessions}" if args.sessions else '') if args.virtual else ''
+    return f"gen_{args.family}_n{args.relays}_m{args.subs}_t{args.tracks}_{extra}{load}{'_sparse' if args.sparse else ''}.yaml"
+
+
+def generate(args):
+    nodes, links = FAMILIES[args.family](args)
+    config = build_config(nodes, links, args.tracks, args.subs, mesh=not args.sparse, video=args.video, budget=args.budget,
+                          virtual=args.virtual, sessions=args.sessions)
+    path = os.path.join(args.out, topo_name(args))
+    os.makedirs(args.out, exist_ok=True)
+    with open(path, 'w') as file:
+        yaml.safe_dump(config, file, sort_keys=False)
+    return path
+
+
+def parser():
+    parser = argparse.ArgumentParser(description='Generate topology yamls for good-try.py')
+    parser.add_argument('family', choices=sorted(FAMILIES))
+    parser.add_argument('--relays', type=int, default=4, help='N, the number of relays')
+    parser.add_argument('--subs', type=int, default=1, help='M, subscribers per track')
+    parser.add_argument('--tracks', type=int, default=1)
+    parser.add_argument('--latency', type=int, default=10, help='ms per link of line, star and spine-leaf')
+    parser.add_argument('--spines', type=int, default=2)
+    parser.add_argument('--radius', type=float, default=15.0, help='geometric: link relays closer than this many degrees')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--video', type=str, default='bbb-360-30', help='after the underscore of the track name')
+    parser.add_argument('--budget', type=int, default=1000, help='before the underscore of the track name')
+    parser.add_argument('--sparse', action='store_true', help='only the underlay links instead of a full mesh')
+    parser.add_argument('--virtual', type=int, default=0, help='subscriptions per subscriber host, a load generator (clock mode)')
+    parser.add_argument('--sessions', type=int, default=0, help='sessions of a load generator, 0 for one per subscription')
+    parser.add_argument('--out', type=str, default=DATASOURCE)
+    return parser
+
+
+if __name__ == '__main__':
+    print(generate(parser().parse_args()))
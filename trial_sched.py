@@ -0,0 +1,72 @@
+"""
+Runs good-try.py trials side by side, each in its own mininet with its own slot.
+
+Trials are only admitted while the cores they need fit in the budget, so the
+relays and clients of parallel runs don't steal cpu from each other and
+distort the latency numbers.
+"""
+
+import multiprocessing
+import os
+from collections import namedtuple
+from time import sleep
+
+from addr_plan import MAX_SLOTS
+
+# tries holds the try indices run one after the other on the trial's network
+Trial = namedtuple('Trial', ['topo_idx', 'tries', 'cores'])
+
+
+def cores_needed(config, mode):
+    # debug build relays with RUST_LOG=debug keep a core busy each,
+    # a gst client encodes or decodes so it counts as two, +1 for the api
+    clients = len(config['first_hop_relay']) + len(config['last_hop_relay'])
+    per_client = 2 if mode == 'gst' else 1
+    return len(config['nodes']) + per_client * clients + 1
+
+
+def run_parallel(trials, target, max_parallel, core_budget=None, poll=0.5):
+    """
+    Runs target(topo_idx, tries, slot) for every trial in a forked process.
+    Returns the trials whose process exited with an error.
+    """
+    if core_budget is None:
+        core_budget = os.cpu_count()
+    ctx = multiprocessing.get_context('fork')
+    pending = list(trials)
+    free_slots = list(range(min(max_parallel, MAX_SLOTS)))
+    running = {}
+    used_cores = 0
+    failed = []
+
+    while pending or running:
+        # the first trial in line goes first, smaller ones may backfill the cores left over
+        for trial in list(pending):
+            if not free_slots:
+                break
+            if used_cores + trial.cores > core_budget and running:
+                continue
+            slot = free_slots.pop(0)
+            process = ctx.Process(target=target, args=(trial.topo_idx, trial.tries, slot),
+                                  name=f"trial-{trial.topo_idx}-{trial.tries[0]}")
+            process.start()
+            print(f"** Slot {slot} runs test_set[{trial.topo_idx}] tries {trial.tries} on {trial.cores} cores")
+            running[slot] = (process, trial)
+            used_cores += trial.cores
+            pending.remove(trial)
+
+        sleep(poll)
+
+        for slot, (process, trial) in list(running.items()):
+            if process.is_alive():
+                continue
+            process.join()
+            if process.exitcode != 0:
+                print(f"** test_set[{trial.topo_idx}] tries {trial.tries} failed with exit code {process.exitcode}")
+                failed.append(trial)
+            del running[slot]
+            used_cores -= trial.cores
+            free_slots.append(slot)
+            free_slots.sort()
+
+    return failed
@@ -0,0 +1,48 @@
+"""
+Warm-up detection of a subscriber's latency series.
+
+The first latencies of a subscriber are not like the rest: moq-clock's first
+lines are the backlog of the group it joined, around a second, and gst's
+decoder and the relays' sessions take a while to settle. clockr cut off
+everything of a second and more and gst trimmed nothing, so the start still
+went into average-baseline. steady() finds the end of the warm-up with
+MSER-5 (White's marginal standard error rule on means of 5 samples): the
+truncation d that minimizes
+
+    var(Y[d:]) / (n - d)
+
+over d in the first half, which is where the standard error of the mean of
+what is left is smallest. It is computed for all d at once from the reverse
+cumulative sums, so a series of any length is one pass.
+"""
+
+import numpy as np
+
+# samples per batch mean, the rule is MSER-5
+BATCH = 5
+# the truncation point is only looked for in this first part of the batches
+MAX_FRACTION = 0.5
+
+
+def mser(latencies, batch=BATCH, max_fraction=MAX_FRACTION):
+    """The number of leading samples that are warm-up, a multiple of batch."""
+    n = len(latencies) // batch
+    if n < 2:
+        return 0
+    # around the mean, the squares of ns would cancel out in float64 otherwise
+    values = np.asarray(latencies[:n * batch], dtype=np.float64)
+    means = values.reshape(n, batch).mean(axis=1)
+    means -= means.mean()
+    # sums of the batch means from d to the end, for every d
+    s1 = np.cumsum(means[::-1])[::-1]
+    s2 = np.cumsum((means * means)[::-1])[::-1]
+    left = np.arange(n, 0, -1, dtype=np.float64)
+    statistic = (s2 - s1 * s1 / left) / (left * left)
+    last = max(int(n * max_fraction), 1)
+    return int(np.argmin(statistic[:last])) * batch
+
+
+def steady(latencies, frames=None):
+    """(latencies, frames, trimmed) of the steady state, frames is None when not given."""
+    trimmed = mser(latencies)
+    return latencies[trimmed:], frames[trimmed:] if frames is not None else None, trimmed